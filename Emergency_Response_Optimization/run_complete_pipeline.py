@@ -9,12 +9,14 @@ from src.path_planning import sumo_net_to_networkx
 from src.sumo_simulation import measure_hospital_accident_pairs
 from src.optimization import solve_optimal_assignment, solve_greedy_assignment
 from src.visualization import visualize_comparison
+from src.travel_time_table import load_or_build_table, build_time_matrix, validate_assignment_routes
+from src.config import SIMULATION_CONFIG, TRAVEL_TIME_CONFIG
 import pandas as pd
 import numpy as np
 import json
 
 def run_complete_pipeline(sumo_net_file, hospital_file, sumo_config_file,
-                          accident_spots, k_paths=5, use_gui=False):
+                          accident_spots, k_paths=5, use_gui=False, use_travel_time_table=None):
     """
     完整流程：路网→路径生成→仿真→优化
     
@@ -25,7 +27,15 @@ def run_complete_pipeline(sumo_net_file, hospital_file, sumo_config_file,
         accident_spots: 事故点edge ID列表
         k_paths: 每对计算的路径数
         use_gui: 是否使用SUMO GUI
+        use_travel_time_table: True时用行程时间表（一次背景仿真）构建时间矩阵，
+                               只对最优分配选中的路径做SUMO验证；
+                               None时使用 TRAVEL_TIME_CONFIG["enabled"]
     """
+    if use_travel_time_table is None:
+        use_travel_time_table = TRAVEL_TIME_CONFIG.get("enabled", False)
+    use_travel_time_table = use_travel_time_table and sumo_config_file is not None
+    table_routes = None
+
     os.makedirs('results', exist_ok=True)
     
     print("="*60)
@@ -75,15 +85,39 @@ def run_complete_pipeline(sumo_net_file, hospital_file, sumo_config_file,
         print(f"   ... 共{len(accident_spots)}个")
     
     # ========== 步骤3: 路径生成和仿真测量 ==========
-    print("\n【步骤3/5】路径生成 + SUMO仿真测量")
-    print("-"*60)
-    
-    routes_info, time_matrix = measure_hospital_accident_pairs(
-        G, hospitals, accident_spots, 
-        k_paths=k_paths,
-        sumo_config_file=sumo_config_file,
-        use_gui=use_gui
-    )
+    if use_travel_time_table:
+        print("\n【步骤3/5】行程时间表 + 时变最短路")
+        print("-"*60)
+        
+        table = load_or_build_table(sumo_config_file, sumo_net_file)
+        time_matrix, table_routes = build_time_matrix(
+            table, hospitals, accident_spots,
+            depart_time=SIMULATION_CONFIG["ambulance_depart_time"]
+        )
+        
+        # 每对一条路径，格式与measure_hospital_accident_pairs()一致
+        hospital_names = list(hospitals.keys())
+        routes_info = []
+        for route_id, ((h_idx, a_idx), edges) in enumerate(sorted(table_routes.items())):
+            routes_info.append({
+                'route_id': route_id,
+                'hospital_idx': h_idx,
+                'hospital_name': hospital_names[h_idx],
+                'accident_idx': a_idx,
+                'path_idx': 0,
+                'edges': edges,
+                'time': float(time_matrix[h_idx, a_idx])
+            })
+    else:
+        print("\n【步骤3/5】路径生成 + SUMO仿真测量")
+        print("-"*60)
+        
+        routes_info, time_matrix = measure_hospital_accident_pairs(
+            G, hospitals, accident_spots, 
+            k_paths=k_paths,
+            sumo_config_file=sumo_config_file,
+            use_gui=use_gui
+        )
     
     if time_matrix is None:
         print("❌ 未能生成时间矩阵")
@@ -132,6 +166,17 @@ def run_complete_pipeline(sumo_net_file, hospital_file, sumo_config_file,
     print(f"贪心算法: {greedy_time:.0f}秒")
     print(f"性能提升: {improvement:.1f}%")
     
+    # 行程时间表只是估计，最优分配选中的路径再用SUMO验证
+    validation = None
+    if table_routes is not None:
+        print("\nSUMO验证最优分配选中的路径...")
+        validation = validate_assignment_routes(table_routes, optimal_assign,
+                                                sumo_config_file, use_gui)
+        hospital_names = list(hospitals.keys())
+        for (h_idx, a_idx), (estimate, measured) in sorted(validation.items()):
+            print(f"  {hospital_names[h_idx]} → 事故点{a_idx+1}: "
+                  f"表估计 {estimate:.0f}秒, SUMO {measured:.0f}秒")
+    
     # ========== 步骤5: 生成结果报告 ==========
     print("\n【步骤5/5】生成结果报告")
     print("-"*60)
@@ -229,6 +274,14 @@ def run_complete_pipeline(sumo_net_file, hospital_file, sumo_config_file,
         
         f.write(f"\n最大响应时间: {optimal_time:.0f}秒\n")
         f.write(f"参与医院数: {len(active_hospitals_optimal)}个\n")
+        
+        if validation:
+            f.write("\n" + "-"*60 + "\n")
+            f.write("【SUMO验证】（行程时间表估计 vs 仿真测量）\n")
+            f.write("-"*60 + "\n")
+            for (h_idx, a_idx), (estimate, measured) in sorted(validation.items()):
+                f.write(f"事故点{a_idx+1} ← {hospital_list[h_idx]}: "
+                        f"估计 {estimate:.0f}秒, 仿真 {measured:.0f}秒\n")
     
     print("✅ 详细报告已保存: results/final_result.txt")
     
@@ -243,7 +296,7 @@ def run_complete_pipeline(sumo_net_file, hospital_file, sumo_config_file,
 
 
 if __name__ == "__main__":
-    from src.config import SUMO_NET_FILE, HOSPITAL_LOCATION_FILE, SIMULATION_CONFIG
+    from src.config import SUMO_NET_FILE, HOSPITAL_LOCATION_FILE
     
     # 检查配置
     print("检查配置文件...")
@@ -266,5 +319,6 @@ if __name__ == "__main__":
             sumo_config_file=sumo_config if os.path.exists(sumo_config) else None,
             accident_spots=SIMULATION_CONFIG["accident_spots"],
             k_paths=SIMULATION_CONFIG["k_paths"],
-            use_gui=False
+            use_gui=False,
+            use_travel_time_table=TRAVEL_TIME_CONFIG["enabled"]
         )
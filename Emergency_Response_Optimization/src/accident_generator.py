@@ -1,32 +1,165 @@
 """
 事故点生成器 - 在事故点周围随机生成测试案例
 """
-import sumolib
-import random
 import math
 import os
+import sys
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# 仓库根目录（共享的路网缓存模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.net_cache import load_net
 from config import SUMO_NET_FILE, SIMULATION_CONFIG, ACCIDENT_CASES_FILE
 
 
 def distance(p1, p2):
     """
     计算两点之间的欧氏距离
-    
+
     Args:
         p1: 点1坐标 (x, y)
         p2: 点2坐标 (x, y)
-    
+
     Returns:
         欧氏距离
     """
     return math.sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
 
 
-def generate_accident_cases(net_file, accident_spots, radius=1000, 
-                            num_per_accident=5, num_cases=20, output_file=None):
+def compute_edge_centroids(net_file):
+    """
+    计算所有普通道路（不含交叉口内部边）的中心点坐标
+
+    中心点取道路中间车道shape坐标的均值（车道数为偶数时取中间两条车道的平均），
+    与sumolib的edge.getShape()取中间车道作为道路形状一致。
+
+    Args:
+        net_file: SUMO路网文件路径
+
+    Returns:
+        edge_ids: edge ID列表
+        centroids: 中心点坐标，shape=(num_edges, 2)
+    """
+    net = load_net(net_file)
+    junction_xy = dict(zip(net.junction_ids, net.junction_xy.tolist()))
+
+    edge_ids = []
+    centroids = []
+    for i in net.iter_edges(skip_internal=True):
+        lanes = net.edge_lanes(i)
+        middle = len(lanes) // 2
+        lane_list = [lanes[middle]] if len(lanes) % 2 == 1 else lanes[max(middle - 1, 0):middle + 1]
+
+        means = [np.mean(shape, axis=0) for shape in (net.lane_shape(j) for j in lane_list) if shape]
+        if not means:
+            # 车道没有shape时使用起终点交叉口坐标
+            means = [junction_xy[j] for j in (net.edge_from[i], net.edge_to[i]) if j in junction_xy]
+        if not means:
+            continue
+        edge_ids.append(net.edge_ids[i])
+        centroids.append(np.mean(means, axis=0))
+
+    return edge_ids, np.array(centroids, dtype=np.float64).reshape(-1, 2)
+
+
+def find_nearby_edges(edge_ids, centroids, accident_spots, radius=1000):
+    """
+    用KD树查询每个事故点半径内的其他道路
+
+    Args:
+        edge_ids: edge ID列表
+        centroids: 中心点坐标，shape=(num_edges, 2)
+        accident_spots: 事故点edge ID列表
+        radius: 搜索半径（米）
+
+    Returns:
+        [(事故点edge ID, 附近道路下标数组)]，跳过不在路网中或附近没有道路的事故点
+    """
+    edge_index = {edge_id: i for i, edge_id in enumerate(edge_ids)}
+    tree = cKDTree(centroids)
+
+    candidates = []
+    for spot_id in accident_spots:
+        if spot_id not in edge_index:
+            print(f"⚠️ 警告：{spot_id} 在网络中未找到，跳过")
+            continue
+
+        spot = edge_index[spot_id]
+        nearby = np.array(tree.query_ball_point(centroids[spot], r=radius), dtype=np.int64)
+        nearby = np.sort(nearby[nearby != spot])
+
+        if len(nearby) == 0:
+            print(f"⚠️ {spot_id} 周围{radius}米内没有其他edge，跳过")
+            continue
+
+        candidates.append((spot_id, nearby))
+
+    return candidates
+
+
+def sample_cases(candidates, num_cases, num_per_accident=5, case_size=5, rng=None):
+    """
+    向量化批量抽样测试案例
+
+    与逐个案例的抽样过程相同：每个事故点从附近道路中不放回抽取 num_per_accident 条，
+    合并去重后再随机抽取 case_size 条作为一个案例（不足时全部保留）。
+    所有案例一次完成：用随机键的argpartition做不放回抽样，排序标记重复后去重。
+
+    Args:
+        candidates: find_nearby_edges() 的结果
+        num_cases: 案例数量
+        num_per_accident: 每个事故点附近选取的edge数量
+        case_size: 每个案例的事故点数量
+        rng: numpy随机数生成器
+
+    Returns:
+        cases: 道路下标，shape=(num_cases, case_size)，不足case_size的位置为-1
+    """
+    rng = rng or np.random.default_rng()
+
+    picks = []
+    for _, nearby in candidates:
+        k = min(num_per_accident, len(nearby))
+        keys = rng.random((num_cases, len(nearby)))
+        chosen = np.argpartition(keys, k - 1, axis=1)[:, :k] if k < len(nearby) else \
+            np.broadcast_to(np.arange(len(nearby)), (num_cases, len(nearby)))
+        picks.append(nearby[chosen])
+
+    if not picks:
+        return np.full((num_cases, case_size), -1, dtype=np.int64)
+
+    # 合并各事故点的抽样结果并去重：排序后与前一个相同的位置为重复
+    merged = np.sort(np.concatenate(picks, axis=1), axis=1)
+    duplicate = np.zeros(merged.shape, dtype=bool)
+    duplicate[:, 1:] = merged[:, 1:] == merged[:, :-1]
+
+    # 重复位置的随机键为inf，按随机键取前case_size个即为从去重集合中随机抽样
+    keys = rng.random(merged.shape)
+    keys[duplicate] = np.inf
+    width = min(case_size, merged.shape[1])
+    order = np.argsort(keys, axis=1)[:, :width]
+
+    cases = np.full((num_cases, case_size), -1, dtype=np.int64)
+    cases[:, :width] = np.where(np.isinf(np.take_along_axis(keys, order, axis=1)), -1,
+                                np.take_along_axis(merged, order, axis=1))
+    return cases
+
+
+def generate_accident_cases(net_file, accident_spots, radius=1000,
+                            num_per_accident=5, num_cases=20, output_file=None,
+                            seed=None, case_size=5, chunk_size=10000, return_cases=True):
     """
     在指定事故点周围随机生成测试案例
-    
+
+    道路中心点和KD树只构建一次；案例按chunk_size分块向量化抽样，
+    每块使用SeedSequence派生的独立随机数流（相同seed和chunk_size时结果可复现），
+    生成后立即写入输出文件，大批量时可以设置 return_cases=False 只写文件。
+
     Args:
         net_file: SUMO路网文件路径
         accident_spots: 事故点edge ID列表
@@ -34,64 +167,50 @@ def generate_accident_cases(net_file, accident_spots, radius=1000,
         num_per_accident: 每个事故点附近选取的edge数量
         num_cases: 生成的测试案例数量
         output_file: 输出文件路径
-    
+        seed: 随机种子，None时使用系统熵（会打印出来以便复现）
+        case_size: 每个案例的事故点数量
+        chunk_size: 每块抽样的案例数量
+        return_cases: 是否在内存中返回全部案例
+
     Returns:
-        案例列表，每个案例是edge ID列表
+        案例列表，每个案例是edge ID列表（return_cases=False时为空列表）
     """
-    # 加载路网
-    net = sumolib.net.readNet(net_file)
-    
+    edge_ids, centroids = compute_edge_centroids(net_file)
+    candidates = find_nearby_edges(edge_ids, centroids, accident_spots, radius)
+
+    seed_seq = np.random.SeedSequence(seed)
+    if seed is None:
+        print(f"随机种子: {seed_seq.entropy}")
+    num_chunks = max(1, math.ceil(num_cases / chunk_size))
+    chunk_seeds = seed_seq.spawn(num_chunks)
+
+    out = None
+    if output_file:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        out = open(output_file, "w")
+
     exp_cases = []
-    
-    for case_id in range(num_cases):
-        # 获取每条edge的中心点坐标
-        edge_positions = {}
-        for edge in net.getEdges():
-            shape = edge.getShape()
-            if shape:
-                x_mean = sum(p[0] for p in shape) / len(shape)
-                y_mean = sum(p[1] for p in shape) / len(shape)
-                edge_positions[edge.getID()] = (x_mean, y_mean)
-        
-        # 结果容器
-        selected_edges = set()
-        
-        # 对每个事故edge执行邻域抽样
-        for spot_id in accident_spots:
-            if spot_id not in edge_positions:
-                print(f"⚠️ 警告：{spot_id} 在网络中未找到，跳过")
-                continue
-            
-            spot_pos = edge_positions[spot_id]
-            
-            # 找到所有距离小于radius的edge
-            nearby_edges = [
-                edge_id for edge_id, pos in edge_positions.items()
-                if distance(spot_pos, pos) <= radius and edge_id != spot_id
-            ]
-            
-            if not nearby_edges:
-                print(f"⚠️ {spot_id} 周围{radius}米内没有其他edge，跳过")
-                continue
-            
-            # 随机抽取若干个
-            chosen = random.sample(nearby_edges, min(num_per_accident, len(nearby_edges)))
-            selected_edges.update(chosen)
-        
-        # 从选中的edges中随机选择5个作为本次案例
-        if len(selected_edges) >= 5:
-            exp_cases.append(random.sample(list(selected_edges), 5))
-        else:
-            exp_cases.append(list(selected_edges))
-    
-    # 输出到文件
+    try:
+        for chunk, chunk_seed in enumerate(chunk_seeds):
+            count = min(chunk_size, num_cases - chunk * chunk_size)
+            cases = sample_cases(candidates, count, num_per_accident, case_size,
+                                 rng=np.random.default_rng(chunk_seed))
+
+            chunk_cases = [[edge_ids[i] for i in row if i >= 0] for row in cases.tolist()]
+            if out is not None:
+                out.writelines(" ".join(case) + "\n" for case in chunk_cases)
+            if return_cases:
+                exp_cases.extend(chunk_cases)
+
+            if num_chunks > 1:
+                print(f"  已生成 {min((chunk + 1) * chunk_size, num_cases)}/{num_cases} 个案例")
+    finally:
+        if out is not None:
+            out.close()
+
     if output_file:
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        with open(output_file, "w") as f:
-            for case in exp_cases:
-                f.write(" ".join(case) + "\n")
-        print(f"✅ 生成了 {len(exp_cases)} 个测试案例，保存到 {output_file}")
-    
+        print(f"✅ 生成了 {num_cases} 个测试案例，保存到 {output_file}")
+
     return exp_cases
 
 
@@ -103,5 +222,6 @@ if __name__ == "__main__":
         radius=SIMULATION_CONFIG["radius"],
         num_per_accident=SIMULATION_CONFIG["num_per_accident"],
         num_cases=SIMULATION_CONFIG["num_experiments"],
-        output_file=ACCIDENT_CASES_FILE
+        output_file=ACCIDENT_CASES_FILE,
+        seed=SIMULATION_CONFIG.get("case_seed")
     )
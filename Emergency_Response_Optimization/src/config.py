@@ -25,6 +25,9 @@ ACCIDENT_CASES_FILE = os.path.join(DATA_DIR, "cases.txt")
 # 实验结果目录
 EXPERIMENT_RESULTS_DIR = os.path.join(RESULTS_DIR, "exp_res")
 
+# 仿真后端: "traci"（socket）或 "libsumo"（进程内，更快）；None 时读取环境变量 SUMO_BACKEND
+SUMO_BACKEND = None
+
 # 仿真参数
 SIMULATION_CONFIG = {
     "accident_spots": ["200042649", "200040849", "200063134", "200002421", "200040901"],
@@ -34,7 +37,18 @@ SIMULATION_CONFIG = {
     "ambulance_speed": 30,  # 救护车速度（m/s）
     "max_simulation_steps": 1200,  # 最大仿真步数
     "k_paths": 5,  # 每对医院-事故点计算的路径数
-    "num_experiments": 20  # 实验次数
+    "path_workers": 4,  # K短路并行进程数（各医院-事故点对独立计算）
+    "concurrent_measurement": False,  # True: 所有救护车同时出发、一次仿真测量全部路径（与逐条测量对比验证前默认关闭）
+    "num_experiments": 20,  # 实验次数
+    "case_seed": None  # 事故案例生成的随机种子（None时使用系统熵并打印，便于复现）
+}
+
+# 行程时间表参数（一次背景仿真的edgeData代替逐条救护车仿真）
+TRAVEL_TIME_CONFIG = {
+    "enabled": False,  # True时完整流程用行程时间表构建时间矩阵，只对选中路径做SUMO验证
+    "period": 300,  # edgeData统计时段长度（秒）
+    "end_time": 3600,  # 背景仿真结束时间（秒）
+    "table_file": os.path.join(RESULTS_DIR, "travel_time_table.npz")  # 分时段行程时间表缓存
 }
 
 # 医院配置
@@ -46,7 +60,9 @@ HOSPITAL_CONFIG = {
 # 优化算法参数
 OPTIMIZATION_CONFIG = {
     "algorithm": "hungarian",  # 匈牙利算法
-    "objective": "min_max"  # 最小化最大完成时间
+    "objective": "min_max",  # 最小化最大完成时间
+    "workers": 4,  # 批量对比时最优分配的并行进程数
+    "batch_file": None  # 堆叠时间矩阵文件，如 results/exp_res/experiments.npz（设置且存在时代替逐个CSV）
 }
 
 # 可视化参数
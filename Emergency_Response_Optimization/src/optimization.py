@@ -1,16 +1,182 @@
 """
 优化求解模块 - 使用匈牙利算法求解最优分配
 """
-from scipy.optimize import linear_sum_assignment
 import pandas as pd
 import numpy as np
 import os
-from config import EXPERIMENT_RESULTS_DIR
+import sys
+
+# 仓库根目录（共享的进程池模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.parallel import fork_map, worker_context
+from config import EXPERIMENT_RESULTS_DIR, OPTIMIZATION_CONFIG, SIMULATION_CONFIG
+
+
+class BottleneckAssignmentSolver:
+    """
+    瓶颈分配（最小化最大完成时间）求解器
+
+    可行性: 阈值T下只保留时间<=T的 (医院, 事故点) 边，若二分图最大匹配覆盖较小的一侧
+    （医院数>=事故点数时即每个事故点都分到不同医院），则T可行。
+    最优值一定是矩阵中的某个取值，因此对排序去重后的取值做二分搜索；
+    每次探测用Hopcroft-Karp求最大匹配，并从上一次探测的匹配热启动：
+    阈值升高时原匹配仍然有效，阈值降低时只删除超出阈值的匹配边。
+    """
+
+    def __init__(self, time_matrix):
+        """
+        Args:
+            time_matrix: 时间矩阵，shape=(num_hospitals, num_accidents)
+        """
+        self.time_matrix = np.asarray(time_matrix, dtype=float)
+        num_hospitals, num_accidents = self.time_matrix.shape
+
+        # 左侧取较小的一侧，需要被完全匹配
+        self.transposed = num_hospitals > num_accidents
+        self.weights = self.time_matrix.T if self.transposed else self.time_matrix
+        self.num_left, self.num_right = self.weights.shape
+
+        # 排序去重后的候选阈值
+        self.values = np.unique(self.weights)
+
+        # 每个左侧顶点的邻居按时间升序排列，阈值T下的邻接表是其前缀
+        self.order = np.argsort(self.weights, axis=1, kind="stable")
+        self.sorted_weights = np.take_along_axis(self.weights, self.order, axis=1)
+        self.order_lists = self.order.tolist()
+
+        self.match_left = [-1] * self.num_left
+        self.match_right = [-1] * self.num_right
+        self.num_matched = 0
+        self.num_probes = 0
+
+    def _adjacency(self, threshold):
+        """阈值下的邻接表（每行有序邻居的前缀）"""
+        counts = (self.sorted_weights <= threshold).sum(axis=1).tolist()
+        return [row[:count] for row, count in zip(self.order_lists, counts)]
+
+    def _drop_edges_above(self, threshold):
+        """删除超出阈值的匹配边（阈值降低时的热启动）"""
+        for u, v in enumerate(self.match_left):
+            if v >= 0 and self.weights[u, v] > threshold:
+                self.match_left[u] = -1
+                self.match_right[v] = -1
+                self.num_matched -= 1
+
+    def _hopcroft_karp(self, adj):
+        """从当前匹配出发，沿最短增广路分层增广直到最大匹配"""
+        match_left, match_right = self.match_left, self.match_right
+
+        while True:
+            # BFS：从所有未匹配左侧顶点分层
+            free = [u for u in range(self.num_left) if match_left[u] == -1]
+            if not free:
+                return
+            dist = [-1] * self.num_left
+            for u in free:
+                dist[u] = 0
+            queue = list(free)
+            found = False
+            qi = 0
+            while qi < len(queue):
+                u = queue[qi]
+                qi += 1
+                for v in adj[u]:
+                    w = match_right[v]
+                    if w == -1:
+                        found = True
+                    elif dist[w] == -1:
+                        dist[w] = dist[u] + 1
+                        queue.append(w)
+            if not found:
+                return
+
+            # DFS：沿分层图寻找不相交的增广路（迭代实现，避免递归深度限制）
+            pos = [0] * self.num_left
+            for root in free:
+                stack = [root]
+                via = []
+                while stack:
+                    u = stack[-1]
+                    if pos[u] < len(adj[u]):
+                        v = adj[u][pos[u]]
+                        pos[u] += 1
+                        w = match_right[v]
+                        if w == -1:
+                            # 沿栈翻转匹配
+                            via.append(v)
+                            for x, y in zip(stack, via):
+                                match_left[x] = y
+                                match_right[y] = x
+                            self.num_matched += 1
+                            break
+                        if dist[w] == dist[u] + 1:
+                            stack.append(w)
+                            via.append(v)
+                    else:
+                        dist[u] = -1  # 死路，本阶段不再访问
+                        stack.pop()
+                        if via:
+                            via.pop()
+
+    def is_feasible(self, threshold):
+        """
+        阈值下是否存在覆盖较小一侧的完美匹配（在当前匹配上增量求解）
+
+        Args:
+            threshold: 最大完成时间阈值
+
+        Returns:
+            bool
+        """
+        self.num_probes += 1
+        self._drop_edges_above(threshold)
+        self._hopcroft_karp(self._adjacency(threshold))
+        return self.num_matched == self.num_left
+
+    def solve(self):
+        """
+        求解瓶颈分配
+
+        Returns:
+            makespan: 最优的最大完成时间（矩阵中的精确取值）
+            assignments: 分配方案 [(事故点索引, 医院索引, 时间)]，按医院索引排序
+        """
+        # 下界：每个左侧顶点至少要用到自己的最小时间
+        lower_bound = self.sorted_weights[:, 0].max() if self.num_left > 0 else self.values[0]
+        low = int(np.searchsorted(self.values, lower_bound))
+        high = len(self.values) - 1
+        best = high
+        best_match = None
+
+        while low <= high:
+            mid = (low + high) // 2
+            if self.is_feasible(self.values[mid]):
+                best = mid
+                best_match = list(self.match_left)
+                high = mid - 1
+            else:
+                low = mid + 1
+
+        if best_match is None:
+            self.is_feasible(self.values[best])
+            best_match = list(self.match_left)
+
+        assignments = []
+        for u, v in enumerate(best_match):
+            hosp_idx, acc_idx = (v, u) if self.transposed else (u, v)
+            assignments.append((acc_idx, hosp_idx, self.time_matrix[hosp_idx, acc_idx]))
+        assignments.sort(key=lambda item: item[1])
+
+        makespan = max((t for _, _, t in assignments), default=self.values[best])
+        return makespan, assignments
 
 
 def solve_optimal_assignment(time_matrix):
     """
-    使用二分搜索+匈牙利算法求解最小最大化分配问题
+    使用二分搜索+二分图匹配求解最小最大化分配问题
     
     Args:
         time_matrix: 时间矩阵，shape=(num_hospitals, num_accidents)
@@ -22,41 +188,7 @@ def solve_optimal_assignment(time_matrix):
     time_matrix = np.array(time_matrix)
     time_matrix = np.nan_to_num(time_matrix, nan=1000)
     
-    num_hospitals, num_accidents = time_matrix.shape
-    
-    # 二分搜索最大完成时间
-    low = np.min(time_matrix)
-    high = np.max(time_matrix)
-    best_total_time = high
-    best_assignment = None
-    
-    while low <= high:
-        mid = (low + high) // 2
-        # 构建二分匹配矩阵：医院i能否在mid时间内到达事故点j
-        cost_matrix = np.where(time_matrix <= mid, 0, 1e6)
-        
-        row_ind, col_ind = linear_sum_assignment(cost_matrix)
-        
-        # 检查分配是否可行
-        if all(cost_matrix[r, c] < 1e6 for r, c in zip(row_ind, col_ind) if c < num_accidents):
-            # 可行，尝试更小的最大完成时间
-            best_total_time = mid
-            best_assignment = [col_ind.tolist(), row_ind.tolist()]
-            high = mid - 1
-        else:
-            # 不可行，需要更大的时间
-            low = mid + 1
-    
-    # 将最佳分配转换为事故点 -> 医院
-    row_ind, col_ind = linear_sum_assignment(
-        np.where(time_matrix <= best_total_time, 0, 1e6)
-    )
-    assignments = []
-    for r, c in zip(row_ind, col_ind):
-        if c < num_accidents:
-            assignments.append((c, r, time_matrix[r, c]))
-    
-    return best_total_time, assignments
+    return BottleneckAssignmentSolver(time_matrix).solve()
 
 
 def solve_greedy_assignment(time_matrix):
@@ -88,47 +220,206 @@ def solve_greedy_assignment(time_matrix):
     return makespan, assignments, hospital_workload
 
 
-def compare_algorithms(exp_results_dir, num_experiments=20):
+def solve_greedy_batch(time_matrices):
+    """
+    批量贪心分配（与solve_greedy_assignment()逐实验结果一致）
+
+    所有实验一次argmin得到每个事故点的最近医院，用bincount按 (实验, 医院)
+    累加工作量，没有按实验/事故点的Python循环。
+
+    Args:
+        time_matrices: 堆叠的时间矩阵，shape=(num_experiments, num_hospitals, num_accidents)
+
+    Returns:
+        makespans: 每个实验的并行完成时间，shape=(num_experiments,)
+        hospital_choice: 每个事故点分配的医院索引，shape=(num_experiments, num_accidents)
+        hospital_workload: 每个医院的总工作时间，shape=(num_experiments, num_hospitals)
+    """
+    time_matrices = np.asarray(time_matrices, dtype=float)
+    num_experiments, num_hospitals, _ = time_matrices.shape
+
+    hospital_choice = time_matrices.argmin(axis=1)
+    times = np.take_along_axis(time_matrices, hospital_choice[:, None, :], axis=1)[:, 0, :]
+
+    # (实验, 医院) 展平为一维桶
+    bins = hospital_choice + np.arange(num_experiments)[:, None] * num_hospitals
+    hospital_workload = np.bincount(bins.ravel(), weights=times.ravel(),
+                                    minlength=num_experiments * num_hospitals)
+    hospital_workload = hospital_workload.reshape(num_experiments, num_hospitals)
+
+    return hospital_workload.max(axis=1), hospital_choice, hospital_workload
+
+
+def _optimal_worker(idx):
+    """进程池任务：求解一个实验的最优分配（时间矩阵在fork前共享，任务只传递实验索引）"""
+    makespan, _ = solve_optimal_assignment(worker_context()[idx])
+    return makespan
+
+
+def solve_optimal_batch(time_matrices, workers=1):
+    """
+    批量求解最优分配（各实验相互独立，可在进程池中并行）
+
+    Args:
+        time_matrices: 堆叠的时间矩阵，shape=(num_experiments, num_hospitals, num_accidents)
+        workers: 并行进程数（系统不支持fork时使用单进程）
+
+    Returns:
+        makespans: 每个实验的最优最大完成时间，shape=(num_experiments,)
+    """
+    time_matrices = np.asarray(time_matrices, dtype=float)
+    makespans = fork_map(_optimal_worker, range(len(time_matrices)), workers=workers,
+                         context=time_matrices,
+                         fallback_message="警告: 当前系统不支持fork，最优分配使用单进程")
+    return np.array(makespans, dtype=float)
+
+
+def read_time_matrix_csv(csv_path):
+    """
+    读取单个实验的时间矩阵CSV（首行为事故点列名，首列为医院名）
+
+    Returns:
+        time_matrix: shape=(num_hospitals, num_accidents)，缺失值为NaN
+    """
+    data = np.genfromtxt(csv_path, delimiter=',', skip_header=1, encoding='utf-8')
+    return np.atleast_2d(data)[:, 1:]
+
+
+def save_experiment_batch(batch_file, time_matrices, experiment_ids=None):
+    """
+    将堆叠的时间矩阵保存为单个npz文件
+
+    Args:
+        batch_file: 输出路径（.npz）
+        time_matrices: shape=(num_experiments, num_hospitals, num_accidents)
+        experiment_ids: 实验编号，默认1..num_experiments
+    """
+    time_matrices = np.asarray(time_matrices, dtype=float)
+    if experiment_ids is None:
+        experiment_ids = np.arange(1, len(time_matrices) + 1)
+    np.savez_compressed(batch_file, time_matrices=time_matrices,
+                        experiment_ids=np.asarray(experiment_ids))
+
+
+def load_experiment_batch(exp_results_dir, num_experiments=20, batch_file=None):
+    """
+    加载所有实验的时间矩阵，堆叠为一个数组
+
+    batch_file存在时直接读取（save_experiment_batch()生成的单个npz文件），
+    否则读取 experiment_1..N.csv。所有实验的医院数和事故点数必须相同。
+
+    Args:
+        exp_results_dir: 实验结果目录
+        num_experiments: 实验数量（只对CSV目录生效）
+        batch_file: 堆叠时间矩阵文件（.npz），None时读取CSV
+
+    Returns:
+        experiment_ids: 实验编号，shape=(num_loaded,)
+        time_matrices: shape=(num_loaded, num_hospitals, num_accidents)，NaN已替换为1000
+    """
+    if batch_file is not None and os.path.exists(batch_file):
+        with np.load(batch_file) as data:
+            experiment_ids = data["experiment_ids"]
+            time_matrices = data["time_matrices"]
+        print(f"从批量文件加载 {len(time_matrices)} 个实验: {batch_file}")
+        return experiment_ids, np.nan_to_num(time_matrices, nan=1000)
+
+    experiment_ids = []
+    matrices = []
+    for i in range(num_experiments):
+        csv_path = os.path.join(exp_results_dir, f'experiment_{i+1}.csv')
+
+        if not os.path.exists(csv_path):
+            print(f"⚠️ 文件不存在: {csv_path}")
+            continue
+
+        experiment_ids.append(i + 1)
+        matrices.append(read_time_matrix_csv(csv_path))
+
+    if not matrices:
+        return np.array([], dtype=int), np.empty((0, 0, 0))
+
+    shapes = {m.shape for m in matrices}
+    if len(shapes) > 1:
+        raise ValueError(f"实验时间矩阵形状不一致，无法堆叠: {sorted(shapes)}")
+
+    return np.array(experiment_ids), np.nan_to_num(np.stack(matrices), nan=1000)
+
+
+def run_experiment_batch(experiment_ids, time_matrices, workers=1, output_file=None):
+    """
+    批量对比最优算法和贪心算法，结果写入一张表
+
+    Args:
+        experiment_ids: 实验编号
+        time_matrices: shape=(num_experiments, num_hospitals, num_accidents)
+        workers: 最优分配的并行进程数
+        output_file: 结果表CSV路径，None时不保存
+
+    Returns:
+        DataFrame: experiment / optimal_time / greedy_time / improvement / improvement_pct
+    """
+    greedy_times, _, _ = solve_greedy_batch(time_matrices)
+    optimal_times = solve_optimal_batch(time_matrices, workers=workers)
+
+    improvement = greedy_times - optimal_times
+    with np.errstate(divide='ignore', invalid='ignore'):
+        improvement_pct = np.where(greedy_times > 0, improvement / greedy_times * 100, 0.0)
+
+    results = pd.DataFrame({
+        "experiment": experiment_ids,
+        "optimal_time": optimal_times,
+        "greedy_time": greedy_times,
+        "improvement": improvement,
+        "improvement_pct": improvement_pct
+    })
+
+    if output_file is not None:
+        results.to_csv(output_file, index=False)
+        print(f"对比结果已保存: {output_file}（{len(results)} 个实验）")
+
+    return results
+
+
+def compare_algorithms(exp_results_dir, num_experiments=20, workers=None, batch_file=None,
+                       output_file=None, verbose=True):
     """
     比较最优算法和贪心算法的性能
     
     Args:
         exp_results_dir: 实验结果目录
         num_experiments: 实验数量
+        workers: 最优分配的并行进程数，None时读取OPTIMIZATION_CONFIG
+        batch_file: 堆叠时间矩阵文件（.npz），存在时代替逐个CSV读取
+        output_file: 结果表CSV路径，None时保存到 exp_results_dir/comparison.csv
+        verbose: 是否逐个打印实验结果
     
     Returns:
         optimal_results: 最优算法结果列表
         greedy_results: 贪心算法结果列表
     """
-    optimal_results = []
-    greedy_results = []
+    if workers is None:
+        workers = OPTIMIZATION_CONFIG.get("workers", 1)
+    if output_file is None:
+        output_file = os.path.join(exp_results_dir, "comparison.csv")
+
+    experiment_ids, time_matrices = load_experiment_batch(exp_results_dir, num_experiments,
+                                                          batch_file=batch_file)
+    if len(time_matrices) == 0:
+        return [], []
+
+    results = run_experiment_batch(experiment_ids, time_matrices, workers=workers,
+                                   output_file=output_file)
     
-    for i in range(num_experiments):
-        csv_path = os.path.join(exp_results_dir, f'experiment_{i+1}.csv')
-        
-        if not os.path.exists(csv_path):
-            print(f"⚠️ 文件不存在: {csv_path}")
-            continue
-        
-        time_matrix = pd.read_csv(csv_path)
-        time_matrix = np.array(time_matrix.iloc[:, 1:])
-        time_matrix = np.nan_to_num(time_matrix, nan=1000)
-        
-        # 最优算法
-        best_time, best_assign = solve_optimal_assignment(time_matrix)
-        optimal_results.append(best_time)
-        
-        # 贪心算法
-        greedy_time, greedy_assign, _ = solve_greedy_assignment(time_matrix)
-        greedy_results.append(greedy_time)
-        
-        print(f"实验 {i+1}:")
-        print(f"  最优算法: {best_time}s")
-        print(f"  贪心算法: {greedy_time}s")
-        print(f"  改进: {greedy_time - best_time}s ({(greedy_time - best_time) / greedy_time * 100:.2f}%)")
-        print()
-    
-    return optimal_results, greedy_results
+    if verbose:
+        for row in results.itertuples(index=False):
+            print(f"实验 {row.experiment}:")
+            print(f"  最优算法: {row.optimal_time}s")
+            print(f"  贪心算法: {row.greedy_time}s")
+            print(f"  改进: {row.improvement}s ({row.improvement_pct:.2f}%)")
+            print()
+    
+    return results["optimal_time"].tolist(), results["greedy_time"].tolist()
 
 
 def print_comparison_statistics(optimal_results, greedy_results):
@@ -163,7 +454,8 @@ if __name__ == "__main__":
     # 运行对比实验
     optimal_res, greedy_res = compare_algorithms(
         exp_results_dir=EXPERIMENT_RESULTS_DIR,
-        num_experiments=20
+        num_experiments=SIMULATION_CONFIG["num_experiments"],
+        batch_file=OPTIMIZATION_CONFIG.get("batch_file")
     )
     
     # 打印统计信息
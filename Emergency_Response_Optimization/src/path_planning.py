@@ -2,14 +2,27 @@
 路径规划模块 - 使用A*和K短路算法计算救护车路径
 """
 from networkx.algorithms.simple_paths import shortest_simple_paths
-import xml.etree.ElementTree as ET
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 import networkx as nx
+import numpy as np
+import hashlib
 import math
+import os
+import sys
+
+# 仓库根目录（共享的路网缓存模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.net_cache import load_net, net_file_hash, get_cache_dir
+from common.parallel import fork_map, worker_context
 
 
 def sumo_net_to_networkx(net_file_path):
     """
-    将SUMO路网转换为NetworkX有向图
+    将SUMO路网转换为NetworkX有向图（路网解析结果使用磁盘缓存）
     
     Args:
         net_file_path: SUMO路网文件路径
@@ -17,41 +30,36 @@ def sumo_net_to_networkx(net_file_path):
     Returns:
         G: NetworkX有向图对象
     """
-    tree = ET.parse(net_file_path)
-    root = tree.getroot()
+    net = load_net(net_file_path)
     G = nx.DiGraph()
     junction_positions = {}
     
     # 解析junction节点
-    for junction in root.findall("junction"):
-        node_id = junction.get("id")
-        x = float(junction.get("x"))
-        y = float(junction.get("y"))
+    for node_id, (x, y) in zip(net.junction_ids, net.junction_xy.tolist()):
         junction_positions[node_id] = (x, y)
     
     # 解析边
     edge_info = {}
-    for edge in root.findall("edge"):
-        edge_id = edge.get("id")
-        if edge.get("from") is None or edge.get("to") is None:
+    edge_ids, edge_from, edge_to = net.edge_ids, net.edge_from, net.edge_to
+    for i in range(net.num_edges):
+        edge_id = edge_ids[i]
+        if not edge_from[i] or not edge_to[i]:
             continue
         from_node = f"{edge_id}_out"
         to_node = f"{edge_id}_in"
-        lane = edge.find("lane")
-        length = float(lane.get("length")) if lane is not None else 0.0
+        lane = net.first_lane(i)
+        length = float(net.lane_length[lane]) if lane is not None else 0.0
         edge_info[edge_id] = (from_node, to_node, length)
         G.add_edge(from_node, to_node, edge_id=edge_id, length=length)
     
     # 解析连接关系
-    for conn in root.findall("connection"):
-        from_edge = conn.get("from")
-        to_edge = conn.get("to")
+    for from_edge, to_edge, turn_dir in zip(net.conn_from, net.conn_to, net.conn_dir):
         if from_edge in edge_info and to_edge in edge_info:
             G.add_edge(
                 f"{from_edge}_in",
                 f"{to_edge}_out",
                 edge_id=f"{from_edge}_in_{to_edge}_out",
-                turn_type=conn.get("dir", "unknown"),
+                turn_type=turn_dir or "unknown",
             )
     
     # 添加节点位置信息
@@ -65,9 +73,46 @@ def sumo_net_to_networkx(net_file_path):
             if junc_id in junction_positions:
                 G.nodes[node]["pos"] = junction_positions[junc_id]
     
+    # edge ID -> (u, v) 索引，K短路查询起终点时直接使用
+    build_edge_index(G)
+    
     return G
 
 
+def build_edge_index(G):
+    """
+    构建 edge ID -> (u, v) 索引并缓存在 G.graph['edge_index']
+    
+    Args:
+        G: NetworkX图对象
+    
+    Returns:
+        索引字典 {edge_id: (u, v)}
+    """
+    edge_index = {}
+    for u, v, edge_id in G.edges(data="edge_id"):
+        if edge_id is not None and edge_id not in edge_index:
+            edge_index[edge_id] = (u, v)
+    G.graph["edge_index"] = edge_index
+    return edge_index
+
+
+def get_edge_index(G):
+    """
+    获取图的 edge ID 索引（不存在或边数变化时重建）
+    
+    Args:
+        G: NetworkX图对象
+    
+    Returns:
+        索引字典 {edge_id: (u, v)}
+    """
+    edge_index = G.graph.get("edge_index")
+    if edge_index is None or len(edge_index) != G.number_of_edges():
+        edge_index = build_edge_index(G)
+    return edge_index
+
+
 def heuristic(u, v, G):
     """
     A*算法的启发式函数（欧氏距离）
@@ -100,28 +145,20 @@ def find_k_shortest_paths(G, start_edge_id, end_edge_id=None, k=5):
     Returns:
         路径列表，每条路径是edge ID的列表
     """
-    # 获取起始edge对应的节点
-    start_from, start_to = None, None
-    for u, v, data in G.edges(data=True):
-        if data.get("edge_id") == start_edge_id:
-            start_from, start_to = u, v
-            break
+    edge_index = get_edge_index(G)
     
-    if not start_from:
+    # 获取起始edge对应的节点
+    if start_edge_id not in edge_index:
         raise ValueError(f"Edge ID {start_edge_id} not found!")
+    start_from, start_to = edge_index[start_edge_id]
     
     if end_edge_id is None:
         return [[start_edge_id]]
     
     # 获取目标edge对应的节点
-    end_from, end_to = None, None
-    for u, v, data in G.edges(data=True):
-        if data.get("edge_id") == end_edge_id:
-            end_from, end_to = u, v
-            break
-    
-    if not end_from:
+    if end_edge_id not in edge_index:
         raise ValueError(f"Edge ID {end_edge_id} not found!")
+    end_from, end_to = edge_index[end_edge_id]
     
     # 使用K短路算法
     paths = []
@@ -140,6 +177,215 @@ def find_k_shortest_paths(G, start_edge_id, end_edge_id=None, k=5):
     return paths
 
 
+def _k_paths_worker(task):
+    """
+    进程池任务：计算一对起终点的K短路
+    
+    Args:
+        task: (任务序号, 起始edge ID, 目标edge ID)
+    
+    Returns:
+        (任务序号, 路径列表, 错误信息)
+    """
+    idx, start_edge_id, end_edge_id = task
+    G, k = worker_context()
+    try:
+        return idx, find_k_shortest_paths(G, start_edge_id, end_edge_id, k=k), None
+    except Exception as e:
+        return idx, None, str(e)
+
+
+def find_k_shortest_paths_batch(G, pairs, k=5, workers=1):
+    """
+    批量计算多对起终点的K短路（各对相互独立，可在进程池中并行）
+    
+    图作为共享上下文在fork前写入（common.parallel），子进程直接继承，每个任务只传递edge ID。
+    
+    Args:
+        G: NetworkX图对象
+        pairs: 起终点列表 [(start_edge_id, end_edge_id), ...]
+        k: 每对返回的路径数量
+        workers: 并行进程数（系统不支持fork时使用单进程）
+    
+    Returns:
+        与pairs顺序一致的列表，每项为 (路径列表, 错误信息)；成功时错误信息为None
+    """
+    get_edge_index(G)  # 在fork前建好索引，子进程直接继承
+    tasks = [(idx, start, end) for idx, (start, end) in enumerate(pairs)]
+    results = fork_map(_k_paths_worker, tasks, workers=workers, context=(G, k),
+                       fallback_message="警告: 当前系统不支持fork，K短路使用单进程")
+    return [(paths, error) for _, paths, error in sorted(results, key=lambda r: r[0])]
+
+
+class HospitalPathTrees:
+    """
+    以医院为根的最短路径树
+
+    医院位置固定，每个医院在 sumo_net_to_networkx() 的图上只做一次单源Dijkstra
+    （权重与K短路相同：路段长度，连接边按networkx默认权重1），保存前驱和距离数组。
+    之后任意事故点的最短路径和距离只需沿前驱回溯，耗时与路径长度成正比。
+    树按路网文件内容哈希和医院集合保存到磁盘，路网文件变化后自动重建。
+    """
+
+    def __init__(self, G, hospital_edges, nodes, predecessors, distances):
+        """
+        Args:
+            G: NetworkX图对象
+            hospital_edges: 医院所在edge ID列表（与树的顺序一致）
+            nodes: 节点列表（数组下标 -> 节点名）
+            predecessors: 前驱节点下标，shape=(num_hospitals, num_nodes)，-1表示无
+            distances: 到各节点的最短距离，shape=(num_hospitals, num_nodes)
+        """
+        self.G = G
+        self.edge_index = get_edge_index(G)
+        self.hospital_edges = list(hospital_edges)
+        self.hospital_index = {edge_id: i for i, edge_id in enumerate(self.hospital_edges)}
+        self.nodes = list(nodes)
+        self.node_index = {node: i for i, node in enumerate(self.nodes)}
+        self.predecessors = predecessors
+        self.distances = distances
+        # 回溯时逐个访问前驱，Python列表比numpy逐元素索引快得多
+        self._predecessor_lists = [row.tolist() for row in predecessors]
+
+    @classmethod
+    def build(cls, G, hospital_edges):
+        """
+        为每个医院计算最短路径树（scipy稀疏图Dijkstra，一次调用完成所有医院）
+
+        Args:
+            G: NetworkX图对象
+            hospital_edges: 医院所在edge ID列表
+
+        Returns:
+            HospitalPathTrees
+        """
+        edge_index = get_edge_index(G)
+        nodes = list(G.nodes())
+        node_index = {node: i for i, node in enumerate(nodes)}
+
+        rows, cols, weights = [], [], []
+        for u, v, length in G.edges(data="length", default=1):
+            rows.append(node_index[u])
+            cols.append(node_index[v])
+            weights.append(length)
+        graph = csr_matrix((np.array(weights, dtype=float), (rows, cols)),
+                           shape=(len(nodes), len(nodes)))
+
+        sources = []
+        for edge_id in hospital_edges:
+            if edge_id not in edge_index:
+                raise ValueError(f"Edge ID {edge_id} not found!")
+            sources.append(node_index[edge_index[edge_id][0]])
+
+        distances, predecessors = dijkstra(graph, directed=True, indices=sources,
+                                           return_predecessors=True)
+        predecessors = np.where(predecessors < 0, -1, predecessors).astype(np.int32)
+
+        return cls(G, hospital_edges, nodes, np.atleast_2d(predecessors),
+                   np.atleast_2d(distances))
+
+    @staticmethod
+    def cache_file(net_file, hospital_edges, cache_dir=None):
+        """缓存文件路径：路网内容哈希 + 医院集合摘要"""
+        cache_dir = get_cache_dir(cache_dir)
+        hospitals_key = hashlib.blake2b("\0".join(hospital_edges).encode("utf-8"),
+                                        digest_size=8).hexdigest()
+        return os.path.join(cache_dir, f"hospital_trees-{net_file_hash(net_file, cache_dir)}"
+                                       f"-{hospitals_key}.npz")
+
+    def save(self, path):
+        """保存前驱和距离数组"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, hospital_edges=np.array(self.hospital_edges),
+                            nodes=np.array(self.nodes), predecessors=self.predecessors,
+                            distances=self.distances)
+
+    @classmethod
+    def load_or_build(cls, G, net_file, hospital_edges, cache_dir=None):
+        """
+        加载缓存的最短路径树，不存在或与图不一致时重新计算并保存
+
+        Args:
+            G: sumo_net_to_networkx(net_file) 得到的图
+            net_file: SUMO路网文件（内容哈希作为缓存键）
+            hospital_edges: 医院所在edge ID列表
+            cache_dir: 缓存目录（默认与路网解析缓存相同）
+
+        Returns:
+            HospitalPathTrees
+        """
+        hospital_edges = list(hospital_edges)
+        path = cls.cache_file(net_file, hospital_edges, cache_dir)
+
+        if os.path.exists(path):
+            with np.load(path) as data:
+                nodes = data["nodes"].tolist()
+                if len(nodes) == G.number_of_nodes() and data["hospital_edges"].tolist() == hospital_edges:
+                    print(f"加载医院最短路径树: {path}")
+                    return cls(G, hospital_edges, nodes, data["predecessors"], data["distances"])
+
+        print(f"计算 {len(hospital_edges)} 个医院的最短路径树...")
+        trees = cls.build(G, hospital_edges)
+        trees.save(path)
+        print(f"✅ 最短路径树已保存: {path}")
+        return trees
+
+    def shortest_path(self, hospital_edge, accident_edge):
+        """
+        查询医院到事故点的最短路径（沿前驱回溯）
+
+        路径格式与 find_k_shortest_paths() 返回的第一条路径相同（含连接边）。
+
+        Args:
+            hospital_edge: 医院所在edge ID
+            accident_edge: 事故点edge ID
+
+        Returns:
+            (路径edge ID列表, 距离)；不可达时为 (None, inf)
+        """
+        tree = self.hospital_index[hospital_edge]
+        if accident_edge not in self.edge_index:
+            raise ValueError(f"Edge ID {accident_edge} not found!")
+        target = self.node_index[self.edge_index[accident_edge][1]]
+
+        distance = float(self.distances[tree, target])
+        if not math.isfinite(distance):
+            return None, math.inf
+
+        predecessors = self._predecessor_lists[tree]
+        node_path = [target]
+        while predecessors[node_path[-1]] >= 0:
+            node_path.append(predecessors[node_path[-1]])
+        node_path.reverse()
+
+        nodes, G = self.nodes, self.G
+        path = [G[nodes[u]][nodes[v]]["edge_id"] for u, v in zip(node_path, node_path[1:])]
+        return path, distance
+
+    def query(self, accident_edges, speed=None):
+        """
+        查询所有医院到一组事故点的最短路径
+
+        Args:
+            accident_edges: 事故点edge ID列表
+            speed: 救护车速度（m/s），给定时返回行驶时间矩阵，否则返回距离矩阵
+
+        Returns:
+            matrix: shape=(num_hospitals, num_accidents)，不可达为inf
+            paths: {(hospital_idx, accident_idx): [edge1, edge2, ...]}
+        """
+        matrix = np.full((len(self.hospital_edges), len(accident_edges)), np.inf)
+        paths = {}
+        for i, hospital_edge in enumerate(self.hospital_edges):
+            for j, accident_edge in enumerate(accident_edges):
+                path, distance = self.shortest_path(hospital_edge, accident_edge)
+                if path is None:
+                    continue
+                matrix[i, j] = distance / speed if speed else distance
+                paths[(i, j)] = path
+        return matrix, paths
+
+
 def filter_internal_edges(path):
     """
     过滤掉路径中的内部连接边（包含_in_和_out的边）
@@ -1,19 +1,29 @@
 """
 SUMO仿真模块 - 在仿真环境中测量救护车到达时间
 """
-import traci
 import numpy as np
 import os
+import sys
+from collections import Counter
 from pathlib import Path
 
+# 仓库根目录（共享的仿真后端模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
 
-def setup_sumo_simulation(sumo_config_file, use_gui=False):
+from common.sim_backend import traci, select_backend
+from config import SUMO_BACKEND, SIMULATION_CONFIG
+
+
+def setup_sumo_simulation(sumo_config_file, use_gui=False, backend=None):
     """
     启动SUMO仿真
     
     Args:
         sumo_config_file: SUMO配置文件路径
         use_gui: 是否使用图形界面
+        backend: 仿真后端 traci/libsumo（默认使用 config.SUMO_BACKEND）
     
     Returns:
         True if successful
@@ -29,6 +39,7 @@ def setup_sumo_simulation(sumo_config_file, use_gui=False):
     ]
     
     try:
+        select_backend(backend or SUMO_BACKEND)
         traci.start(sumo_cmd)
         return True
     except Exception as e:
@@ -36,6 +47,89 @@ def setup_sumo_simulation(sumo_config_file, use_gui=False):
         return False
 
 
+class ArrivalTracker:
+    """
+    救护车到达跟踪器
+
+    每步只消费一次 simulation.getArrivedIDList()（可选再加上到达停靠点的车辆），
+    不再逐车轮询 getIDList/getRoadID；按组维护完成计数，
+    每组至少一辆到达即可判定提前结束，单步开销与车队规模无关。
+    """
+
+    def __init__(self, vehicle_groups, track_stops=False):
+        """
+        Args:
+            vehicle_groups: {车辆ID: 组键}，如 (医院, 事故点)；同组任一车辆到达即该组完成
+            track_stops: 是否把到达停靠点（getStopStartingVehiclesIDList）也视为到达
+        """
+        self.vehicle_groups = dict(vehicle_groups)
+        self.group_sizes = Counter(self.vehicle_groups.values())
+        self.group_finished = {group: 0 for group in self.group_sizes}
+        self.arrival_time = {}  # 车辆ID -> 到达时间
+        self.num_groups_done = 0
+        self.track_stops = track_stops
+
+    def update(self, current_time=None):
+        """
+        读取本步的到达事件（每个仿真步后调用一次）
+
+        Args:
+            current_time: 记录的到达时间，None时使用当前仿真时间
+
+        Returns:
+            本步新到达的跟踪车辆ID列表
+        """
+        if current_time is None:
+            current_time = traci.simulation.getTime()
+
+        events = list(traci.simulation.getArrivedIDList())
+        if self.track_stops:
+            events.extend(traci.simulation.getStopStartingVehiclesIDList())
+
+        return [vehicle_id for vehicle_id in events if self.mark(vehicle_id, current_time)]
+
+    def mark(self, vehicle_id, time):
+        """
+        记录一辆车到达（未跟踪或已记录的车辆忽略）
+
+        Returns:
+            是否为新记录的到达
+        """
+        group = self.vehicle_groups.get(vehicle_id)
+        if group is None or vehicle_id in self.arrival_time:
+            return False
+
+        self.arrival_time[vehicle_id] = time
+        self.group_finished[group] += 1
+        if self.group_finished[group] == 1:
+            self.num_groups_done += 1
+        return True
+
+    @property
+    def num_finished(self):
+        """已到达车辆数"""
+        return len(self.arrival_time)
+
+    @property
+    def num_unfinished(self):
+        """未到达车辆数"""
+        return len(self.vehicle_groups) - len(self.arrival_time)
+
+    @property
+    def all_arrived(self):
+        """所有跟踪车辆均已到达"""
+        return len(self.arrival_time) == len(self.vehicle_groups)
+
+    @property
+    def all_groups_done(self):
+        """每组都至少有一辆车到达"""
+        return self.num_groups_done == len(self.group_finished)
+
+    def unfinished(self):
+        """未到达的车辆ID列表"""
+        return [vehicle_id for vehicle_id in self.vehicle_groups if vehicle_id not in self.arrival_time]
+
+
 def measure_route_time(route_edges, vehicle_id="ambulance_test", 
                        max_steps=2000, depart_time=100):
     """
@@ -51,16 +145,14 @@ def measure_route_time(route_edges, vehicle_id="ambulance_test",
         到达时间（秒），如果失败返回None
     """
     try:
-        # 构建路由字符串
-        route_str = " ".join(route_edges)
-        
-        # 添加救护车到仿真
+        # 添加救护车到仿真（arrivalPos="0": 驶入目标edge即到达）
         traci.route.add(f"route_{vehicle_id}", route_edges)
         traci.vehicle.add(
             vehicle_id,
             f"route_{vehicle_id}",
             typeID="ambulance",
-            depart=str(depart_time)
+            depart=str(depart_time),
+            arrivalPos="0"
         )
         
         # 设置救护车参数
@@ -68,37 +160,95 @@ def measure_route_time(route_edges, vehicle_id="ambulance_test",
         traci.vehicle.setSpeed(vehicle_id, 30)  # 设置速度30m/s
         traci.vehicle.setColor(vehicle_id, (255, 0, 0))  # 红色
         
-        arrival_time = None
-        start_step = traci.simulation.getTime()
+        tracker = ArrivalTracker({vehicle_id: vehicle_id})
         
         # 仿真直到车辆到达
         for step in range(max_steps):
             traci.simulationStep()
-            current_time = traci.simulation.getTime()
-            
-            # 检查车辆是否还在仿真中
-            if vehicle_id not in traci.vehicle.getIDList():
-                # 车辆已经到达或消失
-                arrival_time = current_time - depart_time
-                break
-            
-            # 检查车辆是否到达目标edge
-            current_edge = traci.vehicle.getRoadID(vehicle_id)
-            if current_edge == route_edges[-1]:
-                # 到达目标edge
-                arrival_time = current_time - depart_time
-                # 移除车辆
-                traci.vehicle.remove(vehicle_id)
-                break
+            if tracker.update():
+                return tracker.arrival_time[vehicle_id] - depart_time
         
-        return arrival_time
+        # 超时，移出路网
+        traci.vehicle.remove(vehicle_id)
+        return None
     
     except Exception as e:
         print(f"⚠️  测量失败: {e}")
         return None
 
 
-def batch_measure_routes(routes_dict, sumo_config_file, use_gui=False):
+def measure_routes_concurrently(routes_dict, depart_time=100, max_steps=2000,
+                                vehicle_prefix="ambulance_", speed=30):
+    """
+    在同一次仿真中并发测量多条路径的行驶时间
+
+    所有救护车在同一出发时间请求插入，arrivalPos="0" 使车辆驶入目标edge即到达，
+    每步只读取一次 simulation.getDepartedIDList()/getArrivedIDList()；全部到达或超时后结束。
+    同一起点edge上的车辆由SUMO逐辆插入，departLane="best" 让它们分散到各车道，
+    行驶时间按每辆车实际进入路网的时刻计算，不包含插入排队的等待时间。
+
+    Args:
+        routes_dict: 路径字典 {route_id: [edge1, edge2, ...]}
+        depart_time: 出发时间（秒）
+        max_steps: 出发后的最大仿真步数（超时视为失败）
+        vehicle_prefix: 救护车ID前缀
+        speed: 救护车速度（m/s）
+
+    Returns:
+        时间字典 {route_id: time_seconds}，失败或超时的路径为None
+    """
+    depart_time = max(depart_time, traci.simulation.getTime())
+    results = {route_id: None for route_id in routes_dict}
+    inserted = {}  # 车辆ID -> route_id
+
+    for route_id, edges in routes_dict.items():
+        vehicle_id = f"{vehicle_prefix}{route_id}"
+        try:
+            traci.route.add(f"route_{vehicle_id}", edges)
+            traci.vehicle.add(
+                vehicle_id,
+                f"route_{vehicle_id}",
+                typeID="ambulance",
+                depart=str(depart_time),
+                departLane="best",
+                arrivalPos="0"
+            )
+            traci.vehicle.setSpeedMode(vehicle_id, 0)  # 关闭速度限制
+            traci.vehicle.setSpeed(vehicle_id, speed)
+            traci.vehicle.setColor(vehicle_id, (255, 0, 0))  # 红色
+            inserted[vehicle_id] = route_id
+        except Exception as e:
+            print(f"  ⚠️  路径 {route_id} 无法插入: {e}")
+
+    tracker = ArrivalTracker({vehicle_id: vehicle_id for vehicle_id in inserted})
+    actual_depart = {}  # 车辆ID -> 实际进入路网的时间
+    end_time = depart_time + max_steps
+
+    while not tracker.all_arrived and traci.simulation.getTime() < end_time:
+        traci.simulationStep()
+        current_time = traci.simulation.getTime()
+        for vehicle_id in traci.simulation.getDepartedIDList():
+            if vehicle_id in inserted:
+                actual_depart[vehicle_id] = current_time
+        tracker.update(current_time)
+
+        if current_time % 100 == 0:
+            print(f"  仿真时间 {current_time:.0f}s: 已到达 {tracker.num_finished}/{len(inserted)}")
+
+    for vehicle_id, time in tracker.arrival_time.items():
+        results[inserted[vehicle_id]] = time - actual_depart.get(vehicle_id, depart_time)
+
+    # 超时车辆移出路网
+    for vehicle_id in tracker.unfinished():
+        try:
+            traci.vehicle.remove(vehicle_id)
+        except Exception:
+            pass
+
+    return results
+
+
+def batch_measure_routes(routes_dict, sumo_config_file, use_gui=False, concurrent=None):
     """
     批量测量多条路径的时间
     
@@ -106,29 +256,49 @@ def batch_measure_routes(routes_dict, sumo_config_file, use_gui=False):
         routes_dict: 路径字典 {route_id: [edge1, edge2, ...]}
         sumo_config_file: SUMO配置文件
         use_gui: 是否使用GUI
+        concurrent: True时所有救护车同时出发、一次仿真测完；False时逐条测量；
+                    None时使用 SIMULATION_CONFIG["concurrent_measurement"]
     
     Returns:
         时间字典 {route_id: time_seconds}
     """
+    if concurrent is None:
+        concurrent = SIMULATION_CONFIG.get("concurrent_measurement", False)
+    
     if not setup_sumo_simulation(sumo_config_file, use_gui):
         return {}
     
     results = {}
     total = len(routes_dict)
     
-    print(f"\n开始测量 {total} 条路径...")
-    
-    for i, (route_id, edges) in enumerate(routes_dict.items(), 1):
-        if i % 10 == 0 or i == 1:
-            print(f"  进度: {i}/{total}")
+    if concurrent:
+        print(f"\n开始并发测量 {total} 条路径...")
         
-        time = measure_route_time(edges, vehicle_id=f"ambulance_{route_id}")
+        times = measure_routes_concurrently(
+            routes_dict,
+            depart_time=SIMULATION_CONFIG["ambulance_depart_time"],
+            speed=SIMULATION_CONFIG["ambulance_speed"]
+        )
+        for route_id, time in times.items():
+            if time is not None:
+                results[route_id] = time
+            else:
+                print(f"  ⚠️  路径 {route_id} 测量失败")
+                results[route_id] = 9999  # 使用一个大值表示失败
+    else:
+        print(f"\n开始测量 {total} 条路径...")
         
-        if time is not None:
-            results[route_id] = time
-        else:
-            print(f"  ⚠️  路径 {route_id} 测量失败")
-            results[route_id] = 9999  # 使用一个大值表示失败
+        for i, (route_id, edges) in enumerate(routes_dict.items(), 1):
+            if i % 10 == 0 or i == 1:
+                print(f"  进度: {i}/{total}")
+            
+            time = measure_route_time(edges, vehicle_id=f"ambulance_{route_id}")
+            
+            if time is not None:
+                results[route_id] = time
+            else:
+                print(f"  ⚠️  路径 {route_id} 测量失败")
+                results[route_id] = 9999  # 使用一个大值表示失败
     
     traci.close()
     print(f"✅ 完成！成功测量 {len([t for t in results.values() if t < 9999])}/{total} 条路径")
@@ -137,7 +307,7 @@ def batch_measure_routes(routes_dict, sumo_config_file, use_gui=False):
 
 
 def measure_hospital_accident_pairs(G, hospitals, accidents, k_paths=5, 
-                                    sumo_config_file=None, use_gui=False):
+                                    sumo_config_file=None, use_gui=False, workers=None):
     """
     为所有医院-事故点对测量K条路径的时间
     
@@ -148,12 +318,16 @@ def measure_hospital_accident_pairs(G, hospitals, accidents, k_paths=5,
         k_paths: 每对计算的路径数
         sumo_config_file: SUMO配置文件
         use_gui: 是否使用GUI
+        workers: K短路并行进程数，None时使用 SIMULATION_CONFIG["path_workers"]
     
     Returns:
         routes_info: 路径信息列表
         time_matrix: 时间矩阵
     """
-    from path_planning import find_k_shortest_paths, filter_internal_edges
+    from path_planning import find_k_shortest_paths_batch, filter_internal_edges
+    
+    if workers is None:
+        workers = SIMULATION_CONFIG.get("path_workers", 1)
     
     routes_to_measure = {}
     routes_info = []
@@ -165,34 +339,34 @@ def measure_hospital_accident_pairs(G, hospitals, accidents, k_paths=5,
     
     hospital_list = list(hospitals.items())
     
+    # 所有医院-事故点对的K短路相互独立，批量并行计算
+    pairs = [(hosp_edge, acc_edge) for _, hosp_edge in hospital_list for acc_edge in accidents]
+    print(f"  计算 {len(pairs)} 对医院-事故点的K短路（{workers} 个进程）...")
+    pair_results = find_k_shortest_paths_batch(G, pairs, k=k_paths, workers=workers)
+    
     for i, (hosp_name, hosp_edge) in enumerate(hospital_list):
         for j, acc_edge in enumerate(accidents):
-            try:
-                # 计算K短路
-                paths = find_k_shortest_paths(G, hosp_edge, acc_edge, k=k_paths)
+            paths, error = pair_results[i * len(accidents) + j]
+            if error is not None:
+                print(f"  ⚠️  {hosp_name} → 事故点{j+1} 路径计算失败: {error}")
+                continue
+            
+            for path_idx, path in enumerate(paths):
+                # 过滤内部边
+                filtered_path = filter_internal_edges(path)
                 
-                for path_idx, path in enumerate(paths):
-                    # 过滤内部边
-                    filtered_path = filter_internal_edges(path)
-                    
-                    route_info = {
-                        'route_id': route_id,
-                        'hospital_idx': i,
-                        'hospital_name': hosp_name,
-                        'accident_idx': j,
-                        'path_idx': path_idx,
-                        'edges': filtered_path
-                    }
-                    
-                    routes_info.append(route_info)
-                    routes_to_measure[route_id] = filtered_path
-                    route_id += 1
+                route_info = {
+                    'route_id': route_id,
+                    'hospital_idx': i,
+                    'hospital_name': hosp_name,
+                    'accident_idx': j,
+                    'path_idx': path_idx,
+                    'edges': filtered_path
+                }
                 
-                if (i * len(accidents) + j + 1) % 5 == 0:
-                    print(f"  已生成 {i * len(accidents) + j + 1}/{len(hospitals) * len(accidents)} 对的路径")
-            
-            except Exception as e:
-                print(f"  ⚠️  {hosp_name} → 事故点{j+1} 路径计算失败: {e}")
+                routes_info.append(route_info)
+                routes_to_measure[route_id] = filtered_path
+                route_id += 1
     
     print(f"✅ 共生成 {len(routes_to_measure)} 条路径")
     
@@ -0,0 +1,480 @@
+"""
+行程时间表模块 - 一次背景交通仿真得到分时段的路段行程时间，代替逐条救护车仿真
+
+流程:
+1. 背景交通只仿真一次，通过 edgeData（meandata）附加文件按 period 输出各路段的平均行程时间
+2. 流式解析 edgeData 输出为分时段数组 times[时段, 路段]，无车辆经过的路段使用自由流时间
+3. 在分时段数组上做时变Dijkstra，得到医院→事故点的时间矩阵和对应路径
+4. 只有最终分配选中的路径需要再用SUMO验证（validate_assignment_routes）
+"""
+import heapq
+import json
+import math
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# 仓库根目录（共享的路网缓存和仿真后端模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.net_cache import load_net, net_file_hash
+from common.sim_backend import traci, select_backend
+from config import SUMO_BACKEND, TRAVEL_TIME_CONFIG
+
+
+def write_edgedata_additional(additional_file, edgedata_file, period=300):
+    """
+    生成输出edgeData的附加文件
+
+    Args:
+        additional_file: 附加文件输出路径
+        edgedata_file: edgeData输出路径（相对路径时SUMO按附加文件所在目录解析）
+        period: 统计时段长度（秒）
+
+    Returns:
+        附加文件路径
+    """
+    root = ET.Element("additional")
+    ET.SubElement(root, "edgeData", {
+        "id": "travel_time",
+        "file": os.path.abspath(edgedata_file),
+        "period": str(period),
+        "excludeEmpty": "true"
+    })
+    ET.ElementTree(root).write(additional_file, encoding="utf-8", xml_declaration=True)
+    return additional_file
+
+
+def config_additional_files(sumo_config_file):
+    """
+    读取SUMO配置文件中 <input><additional-files value="..."/> 引用的附加文件
+
+    Args:
+        sumo_config_file: SUMO配置文件
+
+    Returns:
+        list: 附加文件路径（相对路径按配置文件所在目录解析），未配置时为空列表
+    """
+    config_dir = os.path.dirname(os.path.abspath(sumo_config_file))
+    node = ET.parse(sumo_config_file).getroot().find("input/additional-files")
+    if node is None:
+        return []
+    return [os.path.join(config_dir, path)
+            for path in node.get("value", "").replace(",", " ").split()]
+
+
+def run_edgedata_simulation(sumo_config_file, edgedata_file, period=300, end_time=3600,
+                            additional_files=None):
+    """
+    运行一次背景交通仿真并输出各时段的路段行程时间
+
+    命令行的 --additional-files 会覆盖配置文件中的同名设置，
+    因此配置文件已有的附加文件与edgeData附加文件合并后一并传入。
+
+    Args:
+        sumo_config_file: SUMO配置文件
+        edgedata_file: edgeData输出路径
+        period: 统计时段长度（秒）
+        end_time: 仿真结束时间（秒）
+        additional_files: 配置文件中原有的附加文件列表，None时从配置文件读取
+
+    Returns:
+        edgeData输出路径
+    """
+    if additional_files is None:
+        additional_files = config_additional_files(sumo_config_file)
+    additional_file = os.path.splitext(edgedata_file)[0] + ".add.xml"
+    write_edgedata_additional(additional_file, edgedata_file, period)
+
+    select_backend(SUMO_BACKEND)
+    traci.start([
+        "sumo",
+        "-c", sumo_config_file,
+        "--additional-files", ",".join(list(additional_files or []) + [additional_file]),
+        "--end", str(end_time),
+        "--no-warnings", "true"
+    ])
+
+    print(f"背景交通仿真: 0-{end_time}s, 统计时段 {period}s")
+    step = 0
+    while traci.simulation.getMinExpectedNumber() > 0 and traci.simulation.getTime() < end_time:
+        traci.simulationStep()
+        step += 1
+        if step % 600 == 0:
+            print(f"  仿真进度: {traci.simulation.getTime():.0f}/{end_time}s, "
+                  f"当前车辆数: {traci.vehicle.getIDCount()}")
+
+    # 关闭仿真时SUMO写出最后一个时段
+    traci.close()
+    print(f"✅ edgeData已保存: {edgedata_file}")
+    return edgedata_file
+
+
+class TravelTimeTable:
+    """
+    分时段路段行程时间表
+
+    路段按路网文件中的边顺序编号；times[s, e] 为第s个时段进入路段e时的行程时间（秒），
+    时段 s 覆盖 [begin + s*period, begin + (s+1)*period)，超出范围时使用首/末时段。
+    """
+
+    def __init__(self, edge_ids, free_flow, times, begin, period, successors, cache_key=None):
+        """
+        Args:
+            edge_ids: 路段ID列表
+            free_flow: 自由流行程时间，shape=(num_edges,)
+            times: 分时段行程时间，shape=(num_slices, num_edges)
+            begin: 第一个时段的开始时间（秒）
+            period: 时段长度（秒）
+            successors: 路段后继 CSR 表 (indptr, indices)
+            cache_key: 构建该表的输入摘要（见table_cache_key()），用于判断缓存是否过期
+        """
+        self.edge_ids = list(edge_ids)
+        self.edge_index = {edge_id: i for i, edge_id in enumerate(self.edge_ids)}
+        self.free_flow = np.asarray(free_flow, dtype=np.float32)
+        self.times = np.asarray(times, dtype=np.float32)
+        self.begin = float(begin)
+        self.period = float(period)
+        self.indptr, self.indices = successors
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self.cache_key = cache_key
+
+    @property
+    def num_slices(self):
+        return len(self.times)
+
+    @staticmethod
+    def _network_arrays(net_file):
+        """从路网缓存得到路段ID、长度、自由流时间和后继CSR表（忽略交叉口内部边）"""
+        net = load_net(net_file)
+        edge_ids = net.edge_ids
+
+        lengths = np.zeros(net.num_edges, dtype=np.float32)
+        free_flow = np.full(net.num_edges, np.inf, dtype=np.float32)
+        internal = np.zeros(net.num_edges, dtype=bool)
+        for i in range(net.num_edges):
+            internal[i] = net.is_internal(i)
+            lane = net.first_lane(i)
+            if lane is None:
+                continue
+            lengths[i] = net.lane_length[lane]
+            if net.lane_speed[lane] > 0:
+                free_flow[i] = net.lane_length[lane] / net.lane_speed[lane]
+
+        edge_index = {edge_id: i for i, edge_id in enumerate(edge_ids)}
+        pairs = set()
+        for from_edge, to_edge in zip(net.conn_from, net.conn_to):
+            u, v = edge_index.get(from_edge), edge_index.get(to_edge)
+            if u is None or v is None or internal[u] or internal[v]:
+                continue
+            pairs.add((u, v))
+
+        pairs = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+        indptr = np.zeros(net.num_edges + 1, dtype=np.int64)
+        np.add.at(indptr, pairs[:, 0] + 1, 1)
+        indptr = np.cumsum(indptr)
+
+        return edge_ids, lengths, free_flow, (indptr, pairs[:, 1].copy())
+
+    @classmethod
+    def from_edgedata(cls, edgedata_file, net_file):
+        """
+        流式解析edgeData输出
+
+        每处理完一个 <interval> 就释放其子元素，内存只保留分时段数组。
+        路段优先使用 traveltime 属性，缺失时用 length/speed 估计；
+        时段内无车辆经过的路段（excludeEmpty）使用自由流时间。
+
+        Args:
+            edgedata_file: run_edgedata_simulation() 的输出
+            net_file: SUMO路网文件
+
+        Returns:
+            TravelTimeTable
+        """
+        edge_ids, lengths, free_flow, successors = cls._network_arrays(net_file)
+        edge_index = {edge_id: i for i, edge_id in enumerate(edge_ids)}
+
+        slices = []
+        begins = []
+        period = None
+        current = None
+
+        for event, elem in ET.iterparse(edgedata_file, events=("start", "end")):
+            if event == "start":
+                if elem.tag == "interval":
+                    current = free_flow.copy()
+                    begin, end = float(elem.get("begin")), float(elem.get("end"))
+                    begins.append(begin)
+                    if period is None:
+                        period = end - begin
+                continue
+
+            if elem.tag == "edge" and current is not None:
+                i = edge_index.get(elem.get("id"))
+                if i is not None:
+                    traveltime = elem.get("traveltime")
+                    speed = elem.get("speed")
+                    if traveltime is not None:
+                        current[i] = float(traveltime)
+                    elif speed is not None and float(speed) > 0:
+                        current[i] = lengths[i] / float(speed)
+                elem.clear()
+            elif elem.tag == "interval":
+                slices.append(current)
+                current = None
+                elem.clear()
+
+        if not slices:
+            print(f"⚠️ edgeData中没有时段，使用自由流时间: {edgedata_file}")
+            return cls(edge_ids, free_flow, free_flow[None, :], 0, math.inf, successors)
+
+        order = np.argsort(begins, kind="stable")
+        times = np.stack([slices[k] for k in order])
+        print(f"✅ 行程时间表: {len(edge_ids)} 条路段 × {len(slices)} 个时段（{period:.0f}s）")
+        return cls(edge_ids, free_flow, times, begins[order[0]], period, successors)
+
+    def save(self, table_file):
+        """保存为npz文件"""
+        np.savez_compressed(
+            table_file,
+            edge_ids=np.array(self.edge_ids),
+            free_flow=self.free_flow,
+            times=self.times,
+            begin=self.begin,
+            period=self.period,
+            indptr=self.indptr,
+            indices=self.indices,
+            cache_key=self.cache_key or ""
+        )
+        print(f"行程时间表已保存: {table_file}")
+
+    @classmethod
+    def load(cls, table_file):
+        """从save()生成的npz文件加载"""
+        with np.load(table_file) as data:
+            cache_key = str(data["cache_key"]) if "cache_key" in data.files else None
+            return cls(data["edge_ids"].tolist(), data["free_flow"], data["times"],
+                       float(data["begin"]), float(data["period"]),
+                       (data["indptr"], data["indices"]), cache_key=cache_key or None)
+
+    def slice_index(self, t):
+        """时刻t所在的时段编号"""
+        if not math.isfinite(self.period):
+            return 0
+        s = int((t - self.begin) // self.period)
+        return min(max(s, 0), self.num_slices - 1)
+
+    def edge_time(self, edge, t):
+        """
+        在时刻t进入路段时的行程时间
+
+        Args:
+            edge: 路段ID或编号
+            t: 进入时刻（秒）
+        """
+        if isinstance(edge, str):
+            edge = self.edge_index[edge]
+        return float(self.times[self.slice_index(t), edge])
+
+    def shortest_paths(self, source_edge, depart_time, target_edges=None):
+        """
+        时变Dijkstra：从source_edge起点出发，到各路段起点的最早到达时刻
+
+        进入路段e的时刻为τ时，通过该路段耗时 times[slice(τ), e]。
+        到达目标路段即停止（与救护车到达目标路段起点的测量口径一致），
+        所有目标都确定后提前结束。
+
+        Args:
+            source_edge: 出发路段ID
+            depart_time: 出发时刻（秒）
+            target_edges: 目标路段ID列表，None时遍历全网
+
+        Returns:
+            entry_time: 到达各目标路段起点的时刻 {edge_id: time}，不可达的目标不出现
+            predecessors: 前驱数组（路段编号），用于 path_to() 回溯路径
+        """
+        source = self.edge_index[source_edge]
+        targets = None
+        if target_edges is not None:
+            targets = {self.edge_index[e] for e in target_edges if e in self.edge_index}
+
+        num_edges = len(self.edge_ids)
+        entry = [math.inf] * num_edges
+        predecessors = [-1] * num_edges
+        settled = [False] * num_edges
+        indptr, indices = self._indptr, self._indices
+        times = self.times
+
+        entry[source] = depart_time
+        heap = [(depart_time, source)]
+        while heap:
+            t, u = heapq.heappop(heap)
+            if settled[u]:
+                continue
+            settled[u] = True
+
+            if targets is not None:
+                targets.discard(u)
+                if not targets:
+                    break
+
+            travel = times[self.slice_index(t), u]
+            if not math.isfinite(travel):
+                continue
+            t_out = t + float(travel)
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                if t_out < entry[v]:
+                    entry[v] = t_out
+                    predecessors[v] = u
+                    heapq.heappush(heap, (t_out, v))
+
+        wanted = target_edges if target_edges is not None else self.edge_ids
+        entry_time = {}
+        for edge_id in wanted:
+            i = self.edge_index.get(edge_id)
+            if i is not None and settled[i]:
+                entry_time[edge_id] = entry[i]
+        return entry_time, predecessors
+
+    def path_to(self, predecessors, target_edge):
+        """根据前驱数组回溯到target_edge的路段ID序列"""
+        i = self.edge_index[target_edge]
+        path = []
+        while i != -1:
+            path.append(self.edge_ids[i])
+            i = predecessors[i]
+        return path[::-1]
+
+
+def build_time_matrix(table, hospitals, accidents, depart_time=100.0, unreachable_time=9999):
+    """
+    在行程时间表上计算医院→事故点的时间矩阵
+
+    每个医院做一次时变Dijkstra，同时得到到所有事故点的时间和路径。
+
+    Args:
+        table: TravelTimeTable
+        hospitals: 医院字典 {name: edge_id}
+        accidents: 事故点列表 [edge_id1, edge_id2, ...]
+        depart_time: 救护车出发时刻（秒）
+        unreachable_time: 不可达时填入的时间
+
+    Returns:
+        time_matrix: shape=(num_hospitals, num_accidents)
+        routes: {(hospital_idx, accident_idx): [edge1, edge2, ...]}
+    """
+    hospital_list = list(hospitals.items())
+    time_matrix = np.full((len(hospital_list), len(accidents)), float(unreachable_time))
+    routes = {}
+
+    for i, (hosp_name, hosp_edge) in enumerate(hospital_list):
+        if hosp_edge not in table.edge_index:
+            print(f"  ⚠️  {hosp_name} 所在路段不在路网中: {hosp_edge}")
+            continue
+
+        entry_time, predecessors = table.shortest_paths(hosp_edge, depart_time, accidents)
+        for j, acc_edge in enumerate(accidents):
+            if acc_edge not in entry_time:
+                print(f"  ⚠️  {hosp_name} → 事故点{j+1} 不可达")
+                continue
+            time_matrix[i, j] = entry_time[acc_edge] - depart_time
+            routes[(i, j)] = table.path_to(predecessors, acc_edge)
+
+    return time_matrix, routes
+
+
+def table_cache_key(sumo_config_file, net_file, period, end_time, additional_files=None):
+    """
+    行程时间表的缓存键：路网、SUMO配置和附加文件的内容哈希，加上统计时段和仿真时长
+
+    配置文件引用的路由文件不在键中，修改背景交通需求后需要删除缓存或换用新的配置文件。
+
+    Returns:
+        str: JSON字符串
+    """
+    key = {
+        "net": net_file_hash(net_file),
+        "sumo_config": net_file_hash(sumo_config_file),
+        "additional_files": [net_file_hash(path) for path in (additional_files or [])],
+        "period": float(period),
+        "end_time": float(end_time)
+    }
+    return json.dumps(key, sort_keys=True)
+
+
+def load_or_build_table(sumo_config_file, net_file, table_file=None, period=None, end_time=None,
+                        additional_files=None):
+    """
+    获取行程时间表：table_file存在且缓存键一致时直接加载，否则运行一次背景仿真并保存
+
+    路网/SUMO配置/附加文件内容或 period、end_time 变化时缓存键不同，自动重新构建。
+
+    Args:
+        sumo_config_file: SUMO配置文件
+        net_file: SUMO路网文件
+        table_file: 行程时间表路径（默认 TRAVEL_TIME_CONFIG["table_file"]）
+        period: 统计时段长度（默认 TRAVEL_TIME_CONFIG["period"]）
+        end_time: 背景仿真结束时间（默认 TRAVEL_TIME_CONFIG["end_time"]）
+        additional_files: 配置文件中原有的附加文件列表，None时从配置文件读取
+
+    Returns:
+        TravelTimeTable
+    """
+    table_file = table_file or TRAVEL_TIME_CONFIG["table_file"]
+    period = period or TRAVEL_TIME_CONFIG["period"]
+    end_time = end_time or TRAVEL_TIME_CONFIG["end_time"]
+    if additional_files is None:
+        additional_files = config_additional_files(sumo_config_file)
+
+    cache_key = table_cache_key(sumo_config_file, net_file, period, end_time, additional_files)
+
+    if os.path.exists(table_file):
+        table = TravelTimeTable.load(table_file)
+        if table.cache_key == cache_key:
+            print(f"加载行程时间表: {table_file}")
+            return table
+        print(f"行程时间表与当前路网/配置不一致，重新构建: {table_file}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(table_file)), exist_ok=True)
+    edgedata_file = os.path.splitext(table_file)[0] + ".edgedata.xml"
+    run_edgedata_simulation(sumo_config_file, edgedata_file, period, end_time, additional_files)
+
+    table = TravelTimeTable.from_edgedata(edgedata_file, net_file)
+    table.cache_key = cache_key
+    table.save(table_file)
+    return table
+
+
+def validate_assignment_routes(routes, assignments, sumo_config_file, use_gui=False):
+    """
+    只对最终分配选中的路径做SUMO验证
+
+    Args:
+        routes: build_time_matrix() 返回的路径字典
+        assignments: 分配方案 [(事故点索引, 医院索引, 时间)]
+        sumo_config_file: SUMO配置文件
+        use_gui: 是否使用GUI
+
+    Returns:
+        {(hospital_idx, accident_idx): (表估计时间, SUMO测量时间)}
+    """
+    from sumo_simulation import batch_measure_routes
+
+    chosen = {}
+    estimates = {}
+    for acc_idx, hosp_idx, t in assignments:
+        key = (int(hosp_idx), int(acc_idx))
+        if key in routes:
+            chosen[f"{key[0]}_{key[1]}"] = routes[key]
+            estimates[key] = t
+
+    measured = batch_measure_routes(chosen, sumo_config_file, use_gui)
+    return {key: (estimates[key], measured.get(f"{key[0]}_{key[1]}", 9999))
+            for key in estimates}
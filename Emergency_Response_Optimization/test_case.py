@@ -5,16 +5,19 @@
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # 仓库根目录（共享模块 common/）
 
 import pandas as pd
 import json
 import numpy as np
-import traci
 import xml.etree.ElementTree as ET
 from datetime import datetime
 
 from optimization import solve_optimal_assignment, solve_greedy_assignment
 from visualization import visualize_comparison
+from config import SUMO_BACKEND
+from sumo_simulation import ArrivalTracker
+from common.sim_backend import traci, select_backend
 
 # 创建时间戳结果目录
 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -68,59 +71,52 @@ ambulance_df = pd.DataFrame(ambulance_data)
 ambulance_df = ambulance_df.set_index('ambulance_id').sort_index()
 print(f"已加载 {len(ambulance_df)} 辆救护车的路径信息\n")
 
-# 辅助函数
-def is_vehicle_finished(vehicle_id, edge_id):
-    current_road = traci.vehicle.getRoadID(vehicle_id)
-    return current_road == edge_id
-
 # ========== SUMO模拟 ==========
 print("="*60)
 print("开始SUMO模拟...")
 print("="*60)
 
-# 确定要测试的救护车ID
+# 确定要测试的救护车ID（按 (医院, 事故点) 分组）
 test_ambulances = []
+vehicle_groups = {}
 for h in range(hospital_num):
     for new_a, orig_a in enumerate(accident_mapping):
         start = (h * 5 + orig_a) * path_num + 1
         end = start + path_num
         test_ambulances.extend(range(start, end))
+        for amb in range(start, end):
+            vehicle_groups[f"ambulance_{amb}"] = (h, new_a)
 
 print(f"测试救护车: {len(test_ambulances)} 辆\n")
 
 # 启动SUMO
+select_backend(SUMO_BACKEND)
 traci.start(['sumo', '-c', SUMO_CONFIG, '--no-warnings'])
 
-arrival_time = {}
-unfinished_ambulance_lst = list(test_ambulances)
-finished_ambulance_lst = []
+# 到达判定与test3一致：车辆驶入路径最后一条edge即视为到达（不等到驶完整条事故edge）
+# 跟踪车辆出发时订阅所在道路（出发列表由 VAR_DEPARTED_VEHICLES_IDS 订阅得到），
+# 每10步读取一次道路订阅结果，按组计数
+target_edges = {
+    f"ambulance_{amb}": ambulance_df.loc[amb, 'path'].split(" ")[-1]
+    for amb in test_ambulances if amb in ambulance_df.index
+}
+tracker = ArrivalTracker(vehicle_groups)
+tc = traci.constants
+traci.simulation.subscribe([tc.VAR_DEPARTED_VEHICLES_IDS])
 current_step = 0
 
 print("模拟进行中...")
 while current_step < MAX_SIMULATION_TIME:
-    # 每100步检查是否可以提前退出
     if current_step % 100 == 0:
-        print(f"  步骤 {current_step}: 已完成 {len(finished_ambulance_lst)}, 剩余 {len(unfinished_ambulance_lst)}")
-        
-        # 检查每组是否至少有一辆完成
-        all_groups_have = True
-        for h in range(hospital_num):
-            for new_a, orig_a in enumerate(accident_mapping):
-                start = (h * 5 + orig_a) * path_num + 1
-                end = start + path_num
-                has_one = any(f"ambulance_{j}" in arrival_time for j in range(start, end))
-                if not has_one:
-                    all_groups_have = False
-                    break
-            if not all_groups_have:
-                break
-        
-        if all_groups_have:
-            print("  每组都至少有一条路径完成！提前结束。")
-            break
+        print(f"  步骤 {current_step}: 已完成 {tracker.num_finished}, 剩余 {tracker.num_unfinished}")
     
     traci.simulationStep()
     current_step += 1
+
+    # 新出发的跟踪车辆：订阅所在道路
+    for vehicle_id in traci.simulation.getSubscriptionResults()[tc.VAR_DEPARTED_VEHICLES_IDS]:
+        if vehicle_id in target_edges:
+            traci.vehicle.subscribe(vehicle_id, [tc.VAR_ROAD_ID])
     
     # step 101设置速度（参照test3）
     if current_step == 101:
@@ -131,26 +127,24 @@ while current_step < MAX_SIMULATION_TIME:
             except:
                 pass
     
-    # 每10步检查一次（参照test3）
+    # 每10步检查一次（参照test3）；只有已出发且仍在路网中的车辆有订阅结果
     if current_step >= 101 and current_step % 10 == 0:
-        for amb in list(unfinished_ambulance_lst):
-            try:
-                # 参照test3: ambulance_df['path'][amb - 1].split(" ")[-1]
-                # amb是1-based，用.loc[amb]访问
-                target_edge = ambulance_df.loc[amb, 'path'].split(" ")[-1]
-                
-                if is_vehicle_finished(f"ambulance_{amb}", target_edge):
-                    arrival_time[f"ambulance_{amb}"] = current_step
-                    unfinished_ambulance_lst.remove(amb)
-                    finished_ambulance_lst.append(amb)
-            except:
-                continue
+        for vehicle_id, values in traci.vehicle.getAllSubscriptionResults().items():
+            if values[tc.VAR_ROAD_ID] == target_edges[vehicle_id]:
+                tracker.mark(vehicle_id, current_step)
+    
+    # 每组都至少有一辆完成即提前结束
+    if tracker.all_groups_done:
+        print(f"  步骤 {current_step}: 每组都至少有一条路径完成！提前结束。")
+        break
 
 traci.close()
 
+arrival_time = dict(tracker.arrival_time)
+
 print(f"\n模拟完成!")
-print(f"  成功到达: {len(finished_ambulance_lst)} 辆 ({len(finished_ambulance_lst)/len(test_ambulances)*100:.1f}%)")
-print(f"  未完成: {len(unfinished_ambulance_lst)} 辆\n")
+print(f"  成功到达: {tracker.num_finished} 辆 ({tracker.num_finished/len(test_ambulances)*100:.1f}%)")
+print(f"  未完成: {tracker.num_unfinished} 辆\n")
 
 # 填充超时车辆
 for amb in test_ambulances:
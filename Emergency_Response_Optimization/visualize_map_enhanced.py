@@ -9,30 +9,30 @@ import sys
 import os
 import argparse
 
+# 仓库根目录（共享的路网缓存模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.net_cache import load_net
+
 def load_edge_coordinates(net_file):
-    """加载边的坐标信息（从SUMO网络文件）"""
-    import xml.etree.ElementTree as ET
-    
-    tree = ET.parse(net_file)
-    root = tree.getroot()
+    """加载边的坐标信息（从SUMO网络文件，解析结果使用磁盘缓存）"""
+    net = load_net(net_file)
     
     edge_coords = {}
     all_edges = []
     
-    for edge in root.findall('edge'):
-        edge_id = edge.get('id')
+    edge_ids = net.edge_ids
+    for i in range(net.num_edges):
+        edge_id = edge_ids[i]
         if ':' in edge_id:  # 跳过junction内部边
             continue
         
-        lane = edge.find('lane')
+        lane = net.first_lane(i)
         if lane is not None:
-            shape = lane.get('shape')
-            if shape:
-                # 解析坐标点 "x1,y1 x2,y2 ..."
-                points = []
-                for point_str in shape.split():
-                    x, y = map(float, point_str.split(','))
-                    points.append((x, y))
+            points = net.lane_shape(lane)
+            if points:
                 edge_coords[edge_id] = points
                 all_edges.append(points)
     
@@ -0,0 +1,7 @@
+"""
+各子项目共享的基础模块
+
+- net_cache: SUMO .net.xml 解析结果的持久化磁盘缓存
+- sim_backend: SUMO 仿真后端选择（traci / libsumo）
+- parallel: fork 进程池与共享上下文（各子项目的批量并行任务）
+"""
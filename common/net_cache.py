@@ -0,0 +1,496 @@
+"""
+SUMO 路网解析缓存
+
+多个子项目都会用 ElementTree 从头解析同一个 .net.xml。本模块只解析一次，
+将边、车道、交叉口、连接关系和形状坐标写成可内存映射的 .npy 数组
+（字符串和坐标均以"扁平数据 + 偏移量表"存储），按文件内容哈希保存在缓存目录，
+之后的运行直接以 mmap 方式加载。
+
+缓存目录默认为 ~/.cache/sumo_net_cache，可通过环境变量 SUMO_NET_CACHE_DIR 修改；
+设置 SUMO_NET_CACHE_DISABLE=1 时不读写缓存，每次重新解析。
+
+用法:
+    from common.net_cache import load_net
+
+    net = load_net('data/map.net.xml')
+    for i in net.iter_edges(skip_internal=True):
+        edge_id = net.edge_ids[i]
+        lane = net.first_lane(i)
+        length = net.lane_length[lane]
+        shape = net.lane_shape(lane)
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+CACHE_FORMAT_VERSION = 1
+CACHE_DIR_ENV = 'SUMO_NET_CACHE_DIR'
+CACHE_DISABLE_ENV = 'SUMO_NET_CACHE_DISABLE'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'sumo_net_cache')
+
+# 字符串字段：以 '\0' 连接的 UTF-8 字节数组 + 字节偏移量表存储
+STRING_FIELDS = (
+    'edge_id', 'edge_from', 'edge_to', 'edge_function',
+    'lane_id',
+    'junction_id', 'junction_type',
+    'conn_from', 'conn_to', 'conn_dir',
+)
+# 坐标表字段：(N, 2) 扁平坐标 + 每个元素的偏移量表
+SHAPE_FIELDS = ('edge_shape', 'lane_shape')
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+# ============================================================
+# 解析
+# ============================================================
+
+def _append_shape(coords: array, shape_str: Optional[str]) -> int:
+    """解析 "x1,y1 x2,y2 ..." 形式的坐标串并追加到扁平坐标缓冲区（三维坐标只保留x/y），返回点数"""
+    if not shape_str:
+        return 0
+    count = 0
+    for point in shape_str.split():
+        parts = point.split(',')
+        if len(parts) >= 2:
+            coords.append(float(parts[0]))
+            coords.append(float(parts[1]))
+            count += 1
+    return count
+
+
+def _to_float(value: Optional[str]) -> float:
+    """属性值转浮点数，缺失时为 NaN"""
+    return float(value) if value is not None else np.nan
+
+
+class _StringColumn:
+    """字符串列：UTF-8 字节缓冲区 + 偏移量，避免为大路网保存大量Python字符串对象"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('q', [0])
+
+    def append(self, value: str):
+        self.data += value.encode('utf-8')
+        self.data += b'\0'
+        self.offsets.append(len(self.data))
+
+    def to_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        data = self.data[:-1] if self.data else self.data
+        return np.frombuffer(bytes(data), dtype=np.uint8).copy(), np.frombuffer(self.offsets, dtype=np.int64).copy()
+
+
+class _NetBuilder:
+    """
+    按元素累积路网数据，最后转换为数组
+
+    数值和坐标使用 array 模块的紧凑缓冲区，内存占用与最终数组大小同量级。
+    """
+
+    def __init__(self):
+        self.strings = {name: _StringColumn() for name in STRING_FIELDS}
+        self.shapes = {name: (array('d'), array('q', [0])) for name in SHAPE_FIELDS}
+        self.edge_priority = array('d')
+        self.edge_lane_offsets = array('q', [0])
+        self.lane_length = array('d')
+        self.lane_speed = array('d')
+        self.junction_xy = array('d')
+        self.conn_from_lane = array('i')
+        self.conn_to_lane = array('i')
+        self.location = None
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_priority)
+
+    def _add_shape(self, name: str, shape_str: Optional[str]):
+        coords, offsets = self.shapes[name]
+        count = _append_shape(coords, shape_str)
+        offsets.append(offsets[-1] + count)
+
+    def add(self, elem: ET.Element):
+        """处理一个 <net> 的直接子元素"""
+        tag = elem.tag
+        if tag == 'edge':
+            self._add_edge(elem)
+        elif tag == 'junction':
+            s = self.strings
+            s['junction_id'].append(elem.get('id', ''))
+            s['junction_type'].append(elem.get('type', ''))
+            self.junction_xy.append(_to_float(elem.get('x')))
+            self.junction_xy.append(_to_float(elem.get('y')))
+        elif tag == 'connection':
+            s = self.strings
+            s['conn_from'].append(elem.get('from', ''))
+            s['conn_to'].append(elem.get('to', ''))
+            s['conn_dir'].append(elem.get('dir', ''))
+            self.conn_from_lane.append(int(elem.get('fromLane', -1)))
+            self.conn_to_lane.append(int(elem.get('toLane', -1)))
+        elif tag == 'location':
+            self.location = dict(elem.attrib)
+
+    def _add_edge(self, elem: ET.Element):
+        s = self.strings
+        s['edge_id'].append(elem.get('id', ''))
+        s['edge_from'].append(elem.get('from', ''))
+        s['edge_to'].append(elem.get('to', ''))
+        s['edge_function'].append(elem.get('function', ''))
+        self.edge_priority.append(_to_float(elem.get('priority')))
+        self._add_shape('edge_shape', elem.get('shape'))
+
+        for lane in elem.findall('lane'):
+            s['lane_id'].append(lane.get('id', ''))
+            self.lane_length.append(_to_float(lane.get('length')))
+            self.lane_speed.append(_to_float(lane.get('speed')))
+            self._add_shape('lane_shape', lane.get('shape'))
+        self.edge_lane_offsets.append(len(self.lane_length))
+
+    def finish(self) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """转换为数组字典和元数据"""
+        arrays = {}
+        for name, column in self.strings.items():
+            arrays[f'{name}_bytes'], arrays[f'{name}_offsets'] = column.to_arrays()
+
+        for name, (coords, offsets) in self.shapes.items():
+            arrays[f'{name}_coords'] = np.frombuffer(coords, dtype=np.float64).reshape(-1, 2).copy()
+            arrays[f'{name}_offsets'] = np.frombuffer(offsets, dtype=np.int64).copy()
+
+        arrays['edge_priority'] = np.frombuffer(self.edge_priority, dtype=np.float64).copy()
+        arrays['edge_lane_offsets'] = np.frombuffer(self.edge_lane_offsets, dtype=np.int64).copy()
+        arrays['lane_length'] = np.frombuffer(self.lane_length, dtype=np.float64).copy()
+        arrays['lane_speed'] = np.frombuffer(self.lane_speed, dtype=np.float64).copy()
+        arrays['junction_xy'] = np.frombuffer(self.junction_xy, dtype=np.float64).reshape(-1, 2).copy()
+        arrays['conn_from_lane'] = np.frombuffer(self.conn_from_lane, dtype=np.int32).copy()
+        arrays['conn_to_lane'] = np.frombuffer(self.conn_to_lane, dtype=np.int32).copy()
+
+        meta = {
+            'version': CACHE_FORMAT_VERSION,
+            'location': self.location,
+            'num_edges': len(self.edge_priority),
+            'num_lanes': len(self.lane_length),
+            'num_junctions': len(self.junction_xy) // 2,
+            'num_connections': len(self.conn_from_lane),
+        }
+        return arrays, meta
+
+
+def parse_net_file(net_file: str, verbose: bool = False,
+                   progress_interval: int = 100000) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """
+    流式解析 .net.xml 为数组字典
+
+    使用 iterparse 单次遍历文件，每处理完一个 <net> 的直接子元素（edge/junction/
+    connection/...）就将其从树中释放，峰值内存不随文件大小增长为整棵DOM。
+
+    Args:
+        net_file: 路网文件路径
+        verbose: 是否打印解析进度和吞吐量（edges/s）
+        progress_interval: 每解析多少条边打印一次进度
+
+    Returns:
+        (数组字典, 元数据)，元数据中包含 parse_seconds 和 edges_per_second
+    """
+    builder = _NetBuilder()
+    start_time = time.time()
+    next_report = progress_interval
+
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(net_file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+
+        # <net> 的直接子元素已完整读入：提取数据后释放
+        builder.add(elem)
+        elem.clear()
+        root.clear()
+
+        if verbose and builder.num_edges >= next_report:
+            elapsed = max(time.time() - start_time, 1e-9)
+            print(f"    已解析 {builder.num_edges} 条边 ({builder.num_edges / elapsed:,.0f} edges/s)")
+            next_report += progress_interval
+
+    arrays, meta = builder.finish()
+    elapsed = max(time.time() - start_time, 1e-9)
+    meta['parse_seconds'] = round(elapsed, 3)
+    meta['edges_per_second'] = round(meta['num_edges'] / elapsed, 1)
+    if verbose:
+        print(f"    解析完成: {meta['num_edges']} 条边, {meta['num_lanes']} 条车道, "
+              f"用时 {elapsed:.2f}s ({meta['edges_per_second']:,.0f} edges/s)")
+    return arrays, meta
+
+
+# ============================================================
+# 解析结果
+# ============================================================
+
+class ParsedNet:
+    """
+    解析后的路网数据（数组可能是只读 mmap）
+
+    边、车道、交叉口、连接关系均按文件中的出现顺序编号；
+    第 i 条边的车道为 edge_lanes(i)，坐标通过 edge_shape(i) / lane_shape(j) 获取。
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict, source: Optional[str] = None):
+        self.arrays = arrays
+        self.meta = meta
+        self.source = source
+        self.location = meta.get('location')
+        self._string_cache = {}
+
+        self.edge_priority = arrays['edge_priority']
+        self.edge_lane_offsets = arrays['edge_lane_offsets']
+        self.lane_length = arrays['lane_length']
+        self.lane_speed = arrays['lane_speed']
+        self.junction_xy = arrays['junction_xy']
+        self.conn_from_lane = arrays['conn_from_lane']
+        self.conn_to_lane = arrays['conn_to_lane']
+
+    def strings(self, name: str) -> List[str]:
+        """解码字符串字段为列表（首次访问时解码并缓存）"""
+        values = self._string_cache.get(name)
+        if values is None:
+            offsets = self.arrays[f'{name}_offsets']
+            if len(offsets) <= 1:
+                values = []
+            else:
+                values = self.arrays[f'{name}_bytes'].tobytes().decode('utf-8').split('\0')
+            self._string_cache[name] = values
+        return values
+
+    # 常用字符串字段
+    edge_ids = property(lambda self: self.strings('edge_id'))
+    edge_from = property(lambda self: self.strings('edge_from'))
+    edge_to = property(lambda self: self.strings('edge_to'))
+    edge_function = property(lambda self: self.strings('edge_function'))
+    lane_ids = property(lambda self: self.strings('lane_id'))
+    junction_ids = property(lambda self: self.strings('junction_id'))
+    junction_types = property(lambda self: self.strings('junction_type'))
+    conn_from = property(lambda self: self.strings('conn_from'))
+    conn_to = property(lambda self: self.strings('conn_to'))
+    conn_dir = property(lambda self: self.strings('conn_dir'))
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_priority)
+
+    @property
+    def num_lanes(self) -> int:
+        return len(self.lane_length)
+
+    def is_internal(self, i: int) -> bool:
+        """是否为交叉口内部边（function="internal" 或ID以":"开头）"""
+        return self.edge_function[i] == 'internal' or self.edge_ids[i].startswith(':')
+
+    def iter_edges(self, skip_internal: bool = False):
+        """按文件顺序遍历边编号"""
+        if not skip_internal:
+            yield from range(self.num_edges)
+            return
+        edge_ids = self.edge_ids
+        functions = self.edge_function
+        for i in range(self.num_edges):
+            if functions[i] == 'internal' or edge_ids[i].startswith(':'):
+                continue
+            yield i
+
+    def edge_lanes(self, i: int) -> range:
+        """第 i 条边的车道编号范围"""
+        return range(int(self.edge_lane_offsets[i]), int(self.edge_lane_offsets[i + 1]))
+
+    def first_lane(self, i: int) -> Optional[int]:
+        """第 i 条边的第一条车道编号（无车道时为None）"""
+        start, end = self.edge_lane_offsets[i], self.edge_lane_offsets[i + 1]
+        return int(start) if end > start else None
+
+    def _shape(self, name: str, i: int) -> List[Tuple[float, float]]:
+        offsets = self.arrays[f'{name}_offsets']
+        start, end = offsets[i], offsets[i + 1]
+        if end <= start:
+            return []
+        return [tuple(pt) for pt in self.arrays[f'{name}_coords'][start:end].tolist()]
+
+    def edge_shape(self, i: int) -> List[Tuple[float, float]]:
+        """边自身的shape属性坐标（未设置时为空列表）"""
+        return self._shape('edge_shape', i)
+
+    def lane_shape(self, j: int) -> List[Tuple[float, float]]:
+        """车道shape坐标"""
+        return self._shape('lane_shape', j)
+
+
+# ============================================================
+# 磁盘缓存
+# ============================================================
+
+def get_cache_dir(cache_dir: Optional[str] = None) -> str:
+    """缓存目录（参数 > 环境变量 > 默认值）"""
+    return cache_dir or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+
+
+def _cache_disabled() -> bool:
+    return os.environ.get(CACHE_DISABLE_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def net_file_hash(net_file: str, cache_dir: Optional[str] = None) -> str:
+    """
+    计算路网文件内容哈希
+
+    按 (绝对路径, 大小, 修改时间) 记录在缓存目录的 index.json 中，
+    文件未变化时不重复读取整个文件。
+    """
+    cache_dir = get_cache_dir(cache_dir)
+    path = os.path.abspath(net_file)
+    stat = os.stat(path)
+    index_file = os.path.join(cache_dir, 'index.json')
+
+    index = {}
+    if os.path.exists(index_file):
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+
+    entry = index.get(path)
+    if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+        return entry['hash']
+
+    file_hash = _hash_file(path)
+    index[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': file_hash}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_file)
+    except OSError:
+        pass
+    return file_hash
+
+
+def _entry_dir(cache_dir: str, file_hash: str) -> str:
+    return os.path.join(cache_dir, f'{file_hash}-v{CACHE_FORMAT_VERSION}')
+
+
+def _load_array(path: str) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # 空数组无法mmap
+        return np.load(path)
+
+
+def _read_entry(entry_dir: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+    meta_file = os.path.join(entry_dir, 'meta.json')
+    if not os.path.exists(meta_file):
+        return None
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        arrays = {name: _load_array(os.path.join(entry_dir, f'{name}.npy')) for name in meta['arrays']}
+        return arrays, meta
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _write_entry(cache_dir: str, entry_dir: str, arrays: Dict[str, np.ndarray], meta: Dict):
+    """先写入临时目录再整体重命名，避免并发进程读到写了一半的缓存"""
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+        meta = dict(meta, arrays=sorted(arrays))
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # 其他进程已写入同一缓存
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def load_net(net_file: str, cache_dir: Optional[str] = None, use_cache: Optional[bool] = None,
+             verbose: bool = True) -> ParsedNet:
+    """
+    加载路网（优先读取缓存，未命中时解析并写入缓存）
+
+    Args:
+        net_file: 路网文件路径
+        cache_dir: 缓存目录（默认见模块说明）
+        use_cache: 是否使用缓存（None 表示由环境变量 SUMO_NET_CACHE_DISABLE 决定）
+        verbose: 是否打印加载信息
+
+    Returns:
+        ParsedNet
+    """
+    if not os.path.exists(net_file):
+        raise FileNotFoundError(f"路网文件不存在: {net_file}")
+
+    if use_cache is None:
+        use_cache = not _cache_disabled()
+
+    start_time = time.time()
+
+    if not use_cache:
+        arrays, meta = parse_net_file(net_file, verbose=verbose)
+        return ParsedNet(arrays, meta, source=net_file)
+
+    cache_dir = get_cache_dir(cache_dir)
+    file_hash = net_file_hash(net_file, cache_dir)
+    entry_dir = _entry_dir(cache_dir, file_hash)
+
+    entry = _read_entry(entry_dir)
+    if entry is not None:
+        arrays, meta = entry
+        if verbose:
+            print(f"  路网缓存命中 {net_file}: {meta['num_edges']} 条边, 用时 {time.time() - start_time:.3f}s")
+        return ParsedNet(arrays, meta, source=net_file)
+
+    if verbose:
+        print(f"  路网缓存未命中，流式解析 {net_file} ...")
+    arrays, meta = parse_net_file(net_file, verbose=verbose)
+    meta['source'] = os.path.abspath(net_file)
+    meta['source_hash'] = file_hash
+    try:
+        _write_entry(cache_dir, entry_dir, arrays, meta)
+        entry = _read_entry(entry_dir)
+        if entry is not None:
+            arrays, meta = entry
+    except OSError as e:
+        print(f"  警告: 无法写入路网缓存 {cache_dir}: {e}")
+
+    if verbose:
+        print(f"  解析路网并写入缓存 {net_file}: {meta['num_edges']} 条边, 用时 {time.time() - start_time:.2f}s")
+    return ParsedNet(arrays, meta, source=net_file)
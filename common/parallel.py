@@ -0,0 +1,124 @@
+"""
+fork 进程池的公共封装
+
+各子项目的批量任务（K短路、最优分配、积雪/排水场景、遗传算法子代评估）都使用同一模式：
+fork 前把只读的大对象（图、时间矩阵、仿真配置）写入模块全局变量，子进程直接继承，
+任务只传递下标或小参数；系统不支持 fork 时退回单进程。
+
+用法:
+    from common.parallel import fork_map, worker_context
+
+    def _worker(idx):
+        G, k = worker_context()
+        ...
+
+    results = fork_map(_worker, range(n), workers=4, context=(G, k),
+                       fallback_message="警告: 当前系统不支持fork，K短路使用单进程")
+"""
+
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+# fork 前写入的共享上下文，子进程通过 worker_context() 读取
+_WORKER_CONTEXT = None
+
+
+def worker_context():
+    """返回当前进程池的共享上下文（在子进程和单进程回退中都可用）"""
+    return _WORKER_CONTEXT
+
+
+@contextmanager
+def shared_context(context):
+    """在 with 块内设置共享上下文，退出时（包括异常）清空，避免长期持有大对象"""
+    global _WORKER_CONTEXT
+    _WORKER_CONTEXT = context
+    try:
+        yield context
+    finally:
+        _WORKER_CONTEXT = None
+
+
+def fork_available():
+    """当前系统是否支持 fork 启动方式"""
+    return 'fork' in multiprocessing.get_all_start_methods()
+
+
+def effective_workers(workers, num_tasks, fallback_message=None):
+    """
+    计算实际使用的进程数
+
+    Args:
+        workers: 请求的进程数（None 视为 1）
+        num_tasks: 任务数量，进程数不超过任务数
+        fallback_message: 不支持 fork 而退回单进程时打印的提示，None 时不打印
+
+    Returns:
+        int: 实际进程数（至少为 1）
+    """
+    workers = max(1, min(workers or 1, num_tasks))
+    if workers > 1 and not fork_available():
+        if fallback_message:
+            print(fallback_message)
+        workers = 1
+    return workers
+
+
+def fork_pool(workers):
+    """创建使用 fork 启动方式的进程池（调用方负责关闭，建议配合 with 使用）"""
+    return ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context('fork'))
+
+
+@contextmanager
+def fork_executor(workers, num_tasks, context=None, fallback_message=None):
+    """
+    在 with 块内提供 fork 进程池，实际进程数为 1 时提供 None（调用方在当前进程执行）
+
+    共享上下文在进程池创建前写入，退出时（包括异常）先关闭进程池再清空上下文，
+    适合需要在多轮之间复用进程池的场景（如遗传算法每代分发子代任务）。
+
+    Args:
+        workers: 请求的进程数
+        num_tasks: 每轮的任务数量，进程数不超过任务数
+        context: 共享上下文，可通过 worker_context() 读取
+        fallback_message: 不支持 fork 时打印的提示
+
+    Yields:
+        ProcessPoolExecutor 或 None
+    """
+    workers = effective_workers(workers, num_tasks, fallback_message)
+    with shared_context(context):
+        if workers == 1:
+            yield None
+        else:
+            with fork_pool(workers) as executor:
+                yield executor
+
+
+def fork_map(func, tasks, workers=1, context=None, chunksize=None, fallback_message=None):
+    """
+    在 fork 进程池中按顺序执行 func(task)，workers 为 1 时在当前进程执行
+
+    Args:
+        func: 模块级任务函数，通过 worker_context() 读取共享上下文
+        tasks: 任务参数序列
+        workers: 请求的进程数
+        context: 共享上下文，执行期间可通过 worker_context() 读取
+        chunksize: 每次分发的任务数，None 时为 任务数 / (进程数 * 4)
+        fallback_message: 不支持 fork 时打印的提示
+
+    Returns:
+        list: 与 tasks 顺序一致的结果
+    """
+    tasks = list(tasks)
+    workers = effective_workers(workers, len(tasks), fallback_message)
+
+    with fork_executor(workers, len(tasks), context) as executor:
+        if executor is None:
+            return [func(task) for task in tasks]
+
+        if chunksize is None:
+            chunksize = max(1, len(tasks) // (workers * 4))
+        return list(executor.map(func, tasks, chunksize=chunksize))
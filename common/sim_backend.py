@@ -0,0 +1,149 @@
+"""
+SUMO仿真后端选择
+
+各子项目的评估脚本都通过TraCI控制SUMO。本模块提供一个与 traci 模块
+接口相同的代理对象，底层可以是：
+
+- traci:   通过socket连接独立的SUMO进程（默认，支持sumo-gui）
+- libsumo: SUMO以动态库形式运行在当前进程内，API与traci相同，
+           没有socket往返，逐步/逐车调用密集的评估可以明显加速
+
+后端选择顺序：select_backend(name) 显式指定（通常来自配置文件）
+> 环境变量 SUMO_BACKEND > 默认 traci。libsumo 不可用时自动回退到 traci。
+
+用法（脚本只需替换 import，其余 traci.xxx 调用保持不变）:
+    from common.sim_backend import traci, select_backend
+    select_backend(config['sumo_config'].get('backend'))
+    traci.start(["sumo", "-c", sumo_cfg])
+    traci.simulationStep()
+"""
+
+import os
+from types import SimpleNamespace
+from typing import List, Optional
+
+# 环境变量：traci 或 libsumo
+BACKEND_ENV = "SUMO_BACKEND"
+BACKENDS = ("traci", "libsumo")
+DEFAULT_BACKEND = "traci"
+
+
+def _import_module(name: str):
+    """导入后端模块"""
+    if name == "libsumo":
+        import libsumo
+        return libsumo
+    import traci
+    return traci
+
+
+class SimBackend:
+    """
+    traci/libsumo 代理
+
+    未定义的属性（vehicle、edge、simulationStep、close 等）全部转发给
+    当前选中的后端模块；首次使用时若尚未选择，则按环境变量/默认值选择。
+    """
+
+    def __init__(self):
+        self._name = None
+        self._module = None
+
+    def select(self, name: Optional[str] = None) -> str:
+        """
+        选择仿真后端
+
+        Args:
+            name: 'traci' 或 'libsumo'；None 时使用环境变量 SUMO_BACKEND，否则为 traci
+
+        Returns:
+            实际使用的后端名称
+        """
+        name = (name or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND).strip().lower()
+        if name not in BACKENDS:
+            raise ValueError(f"未知的仿真后端: {name}（可选: {', '.join(BACKENDS)}）")
+
+        if name == "libsumo":
+            try:
+                module = _import_module("libsumo")
+            except ImportError:
+                print("警告: libsumo 不可用，回退到 traci")
+                name, module = "traci", _import_module("traci")
+        else:
+            module = _import_module("traci")
+
+        self._name, self._module = name, module
+        return name
+
+    @property
+    def name(self) -> str:
+        """当前后端名称"""
+        if self._module is None:
+            self.select()
+        return self._name
+
+    @property
+    def module(self):
+        """当前后端模块"""
+        if self._module is None:
+            self.select()
+        return self._module
+
+    def start(self, cmd: List[str], **kwargs):
+        """
+        启动仿真（参数同 traci.start）
+
+        libsumo 无法运行 sumo-gui，此时本次仿真改用 traci。
+        """
+        if self.name == "libsumo" and cmd and os.path.basename(str(cmd[0])).startswith("sumo-gui"):
+            print("提示: libsumo 不支持图形界面，本次仿真使用 traci")
+            self.select("traci")
+        return self.module.start(cmd, **kwargs)
+
+    @property
+    def constants(self):
+        """TraCI常量（libsumo 未导出时使用 traci 的常量模块）"""
+        module = self.module
+        if hasattr(module, "constants"):
+            return module.constants
+        from traci import constants
+        return constants
+
+    @property
+    def exceptions(self):
+        """异常类型，兼容 traci.exceptions.TraCIException 的写法"""
+        module = self.module
+        if hasattr(module, "exceptions"):
+            return module.exceptions
+        return SimpleNamespace(
+            TraCIException=module.TraCIException,
+            FatalTraCIError=getattr(module, "FatalTraCIError", module.TraCIException),
+        )
+
+    def __getattr__(self, attr):
+        # 只有实例上不存在的属性才会进入这里
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self.module, attr)
+
+    def __repr__(self) -> str:
+        return f"<SimBackend {self._name or '未选择'}>"
+
+
+# 全局代理：替代 `import traci`
+traci = SimBackend()
+
+
+def select_backend(name: Optional[str] = None) -> str:
+    """
+    选择全局仿真后端（在 traci.start 之前调用）
+
+    Args:
+        name: 'traci' 或 'libsumo'；None 时使用环境变量 SUMO_BACKEND，否则为 traci
+
+    Returns:
+        实际使用的后端名称
+    """
+    backend = traci.select(name)
+    print(f"仿真后端: {backend}")
+    return backend
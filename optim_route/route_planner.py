@@ -6,6 +6,7 @@ import sys
 import argparse
 import json
 import time
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Tuple, Dict, Optional
 import numpy as np
 from datetime import datetime
@@ -15,15 +16,226 @@ from ortools.constraint_solver import pywrapcp, routing_enums_pb2
 
 # 本地模块导入
 from utils import OSMDataProcessor, NetDataProcessor, setup_matplotlib_for_plotting, calculate_route_metrics
+from utils import get_path_service, get_segment_cache, get_edge_arrays
+from common.parallel import fork_executor, worker_context
 import osmnx as ox
 import networkx as nx
 import matplotlib.pyplot as plt
 
+class BatchFitnessEvaluator:
+    """
+    批量适应度评估器
+
+    将种群中的每条路径编码为边槽位索引数组（按最长路径补齐），
+    一次性用NumPy计算整个种群的距离、拥堵加权和适应度，
+    计算结果与 GeneticOptimizer.evaluate_fitness 的逐个体计算保持一致。
+    """
+
+    # 槽位0为补齐用的空边（长度和拥堵权重均为0）
+    PAD_SLOT = 0
+    # 路径编码缓存上限，超过后清空
+    MAX_CACHED_PATHS = 20000
+
+    def __init__(self, G: nx.MultiDiGraph, congestion_scores: Optional[Dict] = None):
+        """
+        初始化评估器
+
+        Args:
+            G: 路网图
+            congestion_scores: 拥堵系数字典 {(u, v): score}（None时直接使用边属性数组中的拥堵系数）
+        """
+        self.G = G
+        self.congestion_scores = congestion_scores
+
+        # 槽位 = 边下标 + 1，边长度和拥堵加权长度直接取自边属性数组
+        edge_arrays = get_edge_arrays(G)
+        self._edge_index = edge_arrays.edge_index
+        lengths = np.where(np.isnan(edge_arrays.length), 100.0, edge_arrays.length)
+        if congestion_scores is None:
+            scores = edge_arrays.congestion
+        else:
+            scores = np.fromiter((congestion_scores.get(pair, 0.5) for pair in edge_arrays.pairs),
+                                 dtype=np.float64, count=len(edge_arrays))
+        self._base_lengths = np.concatenate([[0.0], lengths])
+        self._base_weighted = np.concatenate([[0.0], scores * lengths])
+
+        # 图中不存在的节点对（无效边）追加在边槽位之后
+        self._invalid_slots = {}
+        self._arrays_size = 0
+        self._length_array = None
+        self._weighted_array = None
+        self._path_cache = {}
+
+    def _get_slot(self, u, v) -> int:
+        """获取 (u, v) 相邻节点对的边槽位，无效边按 calculate_route_metrics 的规则单独登记"""
+        idx = self._edge_index.get((u, v))
+        if idx is not None:
+            return idx + 1
+
+        # 无效边：与标量路径一致，计入1000米惩罚距离，不计拥堵
+        slot = self._invalid_slots.get((u, v))
+        if slot is None:
+            slot = len(self._base_lengths) + len(self._invalid_slots)
+            self._invalid_slots[(u, v)] = slot
+        return slot
+
+    def encode(self, path: List[int]) -> np.ndarray:
+        """将路径编码为边槽位索引数组"""
+        key = tuple(path)
+        encoded = self._path_cache.get(key)
+        if encoded is None:
+            if len(self._path_cache) >= self.MAX_CACHED_PATHS:
+                self._path_cache.clear()
+            encoded = np.fromiter((self._get_slot(path[i], path[i + 1]) for i in range(len(path) - 1)),
+                                  dtype=np.int32, count=max(len(path) - 1, 0))
+            self._path_cache[key] = encoded
+        return encoded
+
+    def _slot_arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """返回槽位属性数组（新增无效边槽位时重新生成）"""
+        size = len(self._base_lengths) + len(self._invalid_slots)
+        if self._arrays_size != size:
+            extra = len(self._invalid_slots)
+            self._length_array = np.concatenate([self._base_lengths, np.full(extra, 1000.0)])
+            self._weighted_array = np.concatenate([self._base_weighted, np.zeros(extra)])
+            self._arrays_size = size
+        return self._length_array, self._weighted_array
+
+    def route_metrics(self, population: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量计算种群中每条路径的总距离和平均拥堵系数
+
+        Args:
+            population: 种群路径列表
+
+        Returns:
+            (总距离数组, 平均拥堵系数数组)
+        """
+        encoded = [self.encode(path) for path in population]
+        max_edges = max((len(e) for e in encoded), default=0)
+
+        # 形状为 (最大边数, 种群大小)：沿 axis=0 求和时逐边顺序累加，与标量循环的累加顺序一致
+        index_matrix = np.full((max_edges, len(population)), self.PAD_SLOT, dtype=np.int32)
+        for col, edges in enumerate(encoded):
+            index_matrix[:len(edges), col] = edges
+
+        lengths, weighted = self._slot_arrays()
+        total_distance = lengths[index_matrix].sum(axis=0)
+        congestion_sum = weighted[index_matrix].sum(axis=0)
+
+        avg_congestion = np.zeros(len(population), dtype=np.float64)
+        positive = total_distance > 0
+        avg_congestion[positive] = congestion_sum[positive] / total_distance[positive]
+        return total_distance, avg_congestion
+
+    def evaluate(self, population: List[List[int]], target_distance: Optional[float] = None,
+                 start_node: int = None, end_node: int = None,
+                 intermediate_nodes: List[int] = None) -> np.ndarray:
+        """
+        批量计算种群适应度
+
+        Args:
+            population: 种群路径列表
+            target_distance: 目标距离
+            start_node: 起始节点（用于约束验证）
+            end_node: 结束节点（用于约束验证）
+            intermediate_nodes: 中间必经节点列表（用于约束验证）
+
+        Returns:
+            适应度数组（越高越好）
+        """
+        fitness = np.zeros(len(population), dtype=np.float64)
+        check_constraints = start_node is not None and end_node is not None and intermediate_nodes is not None
+
+        # 硬约束检查（与 evaluate_fitness 相同），只对通过检查的个体做向量化计算
+        valid_indices = []
+        for idx, individual in enumerate(population):
+            if len(individual) < 2:
+                continue
+            if check_constraints:
+                if individual[0] != start_node or individual[-1] != end_node:
+                    fitness[idx] = 0.001
+                    continue
+                current_index = 0
+                missing = False
+                for waypoint in intermediate_nodes:
+                    try:
+                        current_index = individual.index(waypoint, current_index)
+                    except ValueError:
+                        missing = True
+                        break
+                if missing:
+                    fitness[idx] = 0.001
+                    continue
+            valid_indices.append(idx)
+
+        if not valid_indices:
+            return fitness
+
+        total_distance, avg_congestion = self.route_metrics([population[i] for i in valid_indices])
+
+        # 距离适应度：高斯函数，正偏差允许30%，负偏差允许10%
+        if target_distance is not None:
+            distance_ratio = (total_distance - target_distance) / target_distance
+            # 高斯项按个体逐个计算（每个体仅一次）：数组版 square/exp 与标量 pow/exp 可能相差1ulp
+            distance_score = np.array([
+                np.exp(-0.5 * (ratio / (0.3 if ratio >= 0 else 0.1)) ** 2)
+                for ratio in distance_ratio.tolist()
+            ], dtype=np.float64)
+        else:
+            distance_score = np.ones(len(valid_indices), dtype=np.float64)
+
+        # 拥堵适应度：低拥堵 = 高适应度
+        congestion_normalized = np.where(total_distance > 0, 1.0 - avg_congestion, 0.5)
+
+        # 自适应权重
+        weight_distance = np.select([avg_congestion < 0.3, avg_congestion < 0.5], [0.6, 0.4], default=0.3)
+        weight_congestion = np.select([avg_congestion < 0.3, avg_congestion < 0.5], [0.4, 0.6], default=0.7)
+
+        fitness[valid_indices] = distance_score * weight_distance + congestion_normalized * weight_congestion
+        return fitness
+
+
+def _ga_offspring_worker(task: Tuple[int, List[int], List[int], int]) -> Tuple[List[int], List[int]]:
+    """
+    进程池任务：由一对父代生成两个子代（交叉 + 变异）
+
+    Args:
+        task: (随机种子, 父代1, 父代2, 停滞代数)
+
+    Returns:
+        (子代1, 子代2)
+    """
+    seed, parent1, parent2, stagnation_count = task
+    # 图、优化器和途经点约束在fork前写入共享上下文，子进程直接继承，不随任务pickle
+    optimizer, G, start_node, end_node, intermediate_nodes = worker_context()
+
+    # 每个任务独立播种，结果与调度顺序和进程数无关
+    np.random.seed(seed)
+    child1, child2 = optimizer.crossover(parent1, parent2,
+                                         start_node=start_node,
+                                         end_node=end_node,
+                                         intermediate_nodes=intermediate_nodes,
+                                         G=G)
+    child1 = optimizer.mutate(child1, G,
+                              start_node=start_node,
+                              end_node=end_node,
+                              intermediate_nodes=intermediate_nodes,
+                              stagnation_count=stagnation_count)
+    child2 = optimizer.mutate(child2, G,
+                              start_node=start_node,
+                              end_node=end_node,
+                              intermediate_nodes=intermediate_nodes,
+                              stagnation_count=stagnation_count)
+    return child1, child2
+
+
 class GeneticOptimizer:
     """遗传算法优化器"""
     
     def __init__(self, population_size: int = 50, generations: int = 100,
-                 mutation_rate: float = 0.1, elite_size: int = 10, record_interval: int = 50):
+                 mutation_rate: float = 0.1, elite_size: int = 10, record_interval: int = 50,
+                 batch_fitness: bool = True, workers: int = 1, seed: Optional[int] = None):
         """
         初始化遗传算法参数
 
@@ -33,12 +245,19 @@ class GeneticOptimizer:
             mutation_rate: 变异概率
             elite_size: 精英数量
             record_interval: 详细路径记录间隔（每多少代记录一次）
+            batch_fitness: 是否使用批量向量化适应度评估（结果与逐个体评估一致）
+            workers: 子代生成（交叉+变异）的并行进程数，1为单进程
+            seed: 子代生成的基础随机种子，设置后无论进程数多少都按派生种子生成子代，
+                  结果可复现且与进程数无关（None时单进程沿用全局随机状态，并行时从中抽取）
         """
         self.population_size = population_size
         self.generations = generations
         self.mutation_rate = mutation_rate
         self.elite_size = elite_size
         self.record_interval = record_interval
+        self.batch_fitness = batch_fitness
+        self.workers = workers
+        self.seed = seed
         self.optimization_history = []
         self._last_recorded_path = None  # 上一次记录的路径
         
@@ -102,6 +321,7 @@ class GeneticOptimizer:
         """
         # 构建完整的途经点列表：起点 + 中间点 + 终点
         all_waypoints = [start_node] + intermediate_nodes + [end_node]
+        segment_cache = get_segment_cache(G)
 
         complete_path = []
 
@@ -111,8 +331,8 @@ class GeneticOptimizer:
             next_point = all_waypoints[i + 1]
 
             try:
-                # 计算两点间的最短路径
-                segment_path = nx.shortest_path(G, current_point, next_point, weight='length')
+                # 计算两点间的最短路径（LRU路径段缓存，未命中时复用途经点最短路服务的前驱数组）
+                segment_path = segment_cache.path(current_point, next_point, weight='length')
 
                 # 避免重复添加连接点
                 if complete_path:
@@ -499,134 +719,128 @@ class GeneticOptimizer:
         stagnation_count = 0
         early_stop_generation = None
 
-        for generation in range(self.generations):
-            # 评估适应度
-            fitness_scores = []
-            for individual in population:
-                fitness = self.evaluate_fitness(individual, G, congestion_scores, target_distance,
-                                              start_node=start_node,
-                                              end_node=end_node,
-                                              intermediate_nodes=intermediate_nodes)
-                fitness_scores.append(fitness)
-
-                if fitness > best_fitness:
-                    best_fitness = fitness
-                    best_individual = individual.copy()
-
-            # 计算平均适应度和距离
-            avg_fitness = np.mean(fitness_scores)
-            best_distance = self.calculate_route_distance(best_individual, G)
-
-            # 记录历史
-            history_entry = {
-                'generation': generation,
-                'best_fitness': best_fitness,
-                'avg_fitness': avg_fitness,
-                'best_distance': best_distance
-            }
-
-            # 按固定间隔记录详细路径信息（只有路径发生变化才记录）
-            path_changed = self._is_path_changed(best_individual)
-            should_record = (generation % self.record_interval == 0 or generation == self.generations - 1) and (path_changed)
-
-            # 关键逻辑：到了固定间隔记录点时，只有路径发生变化才记录
-            if should_record:
-                # 使用通用函数计算路径统计
-                route_stats = calculate_route_metrics(best_individual, G, congestion_scores)
-
-                # 添加详细路径信息
-                history_entry.update({
-                    'detailed_path': {
-                        'nodes': best_individual.copy(),
-                        'node_count': len(best_individual),
-                        'edge_count': route_stats['edge_count'],
-                        'total_distance_m': round(best_distance, 2),
-                        'total_distance_km': round(best_distance / 1000, 3),
-                        'congestion_percentage': round(route_stats['congestion_percentage'], 2),
-                        'avg_congestion_score': round(route_stats['avg_congestion_score'], 4)
-                    }
-                })
-
-                # 如果提供了节点坐标，记录坐标信息
-                if node_coordinates:
-                    coords = []
-                    for node in best_individual:
-                        if node in node_coordinates:
-                            lat, lon = node_coordinates[node]
-                            coords.append({
-                                'node_id': node,
-                                'lat': round(lat, 6),
-                                'lon': round(lon, 6)
-                            })
-                    history_entry['detailed_path']['coordinates'] = coords
-
-                # 更新上一次记录的路径
-                self._last_recorded_path = best_individual.copy()
-
-            generation_history.append(history_entry)
-
-            # 早停检测：连续10代适应度无明显改善
-            best_fitness_history.append(best_fitness)
-            if len(best_fitness_history) >= 10:
-                recent_improvement = best_fitness_history[-1] - best_fitness_history[-10]
-                if recent_improvement < 0.001:
-                    stagnation_count += 1
+        # 批量评估器：路径编码和边属性在整个优化过程中复用
+        batch_evaluator = BatchFitnessEvaluator(G, congestion_scores) if self.batch_fitness else None
+
+        # 设置种子或并行时，子代由 (基础种子, 代数, 序号) 派生的独立种子生成，结果与进程数无关；
+        # 并行时任务分发到fork进程池，退出（包括异常）时关闭进程池并清空共享上下文
+        seeded_offspring = self.seed is not None or self.workers > 1
+        base_seed = None
+        if seeded_offspring:
+            base_seed = self.seed if self.seed is not None else int(np.random.randint(0, 2**31 - 1))
+
+        with fork_executor(self.workers, self.population_size,
+                           context=(self, G, start_node, end_node, intermediate_nodes),
+                           fallback_message="警告: 当前系统不支持fork，遗传算法使用单进程") as executor:
+            if verbose and seeded_offspring:
+                print(f"子代生成: {self.workers if executor is not None else 1} 个进程, 基础种子 {base_seed}")
+
+            for generation in range(self.generations):
+                # 评估适应度
+                if batch_evaluator is not None:
+                    fitness_array = batch_evaluator.evaluate(population, target_distance,
+                                                             start_node=start_node,
+                                                             end_node=end_node,
+                                                             intermediate_nodes=intermediate_nodes)
+                    fitness_scores = fitness_array.tolist()
+
+                    # argmax 返回第一个最大值，与逐个体严格大于比较的结果一致
+                    best_idx = int(np.argmax(fitness_array))
+                    if fitness_scores[best_idx] > best_fitness:
+                        best_fitness = fitness_scores[best_idx]
+                        best_individual = population[best_idx].copy()
                 else:
-                    stagnation_count = 0
-
-                if stagnation_count >= 10 and generation >= 50:  # 至少50代后才允许早停
-                    early_stop_generation = generation
-                    if verbose:
-                        print(f"早停：第 {generation} 代收敛（连续{10}代无明显改善）")
-                    break
-
-            if verbose and generation % 20 == 0:
-                print(f"第 {generation} 代: 最佳适应度={best_fitness:.4f}, 平均适应度={avg_fitness:.4f}, 距离={best_distance/1000:.2f}km")
-
-            # 选择父母（锦标赛选择 + 自适应选择压力）
-            parents = self.select_parents(population, fitness_scores,
-                                         generation=generation,
-                                         total_generations=self.generations)
-
-            # 生成新种群
-            new_population = []
-
-            # 保留精英
-            elite_count = min(self.elite_size, len(population))
-            elite_indices = np.argsort(fitness_scores)[-elite_count:]
-            for idx in elite_indices:
-                new_population.append(population[idx].copy())
-
-            # 交叉和变异
-            while len(new_population) < self.population_size:
-                parent1, parent2 = parents[np.random.randint(0, len(parents))], \
-                                  parents[np.random.randint(0, len(parents))]
-
-                # 传递必要参数以保护途经点约束
-                child1, child2 = self.crossover(parent1, parent2,
-                                               start_node=start_node,
-                                               end_node=end_node,
-                                               intermediate_nodes=intermediate_nodes,
-                                               G=G)
-                # 使用自适应变异率
-                child1 = self.mutate(child1, G,
-                                    start_node=start_node,
-                                    end_node=end_node,
-                                    intermediate_nodes=intermediate_nodes,
-                                    stagnation_count=stagnation_count)
-                child2 = self.mutate(child2, G,
-                                    start_node=start_node,
-                                    end_node=end_node,
-                                    intermediate_nodes=intermediate_nodes,
-                                    stagnation_count=stagnation_count)
-
-                new_population.extend([child1, child2])
-
-            # 截断到指定大小
-            population = new_population[:self.population_size]
+                    fitness_scores = []
+                    for individual in population:
+                        fitness = self.evaluate_fitness(individual, G, congestion_scores, target_distance,
+                                                      start_node=start_node,
+                                                      end_node=end_node,
+                                                      intermediate_nodes=intermediate_nodes)
+                        fitness_scores.append(fitness)
+
+                        if fitness > best_fitness:
+                            best_fitness = fitness
+                            best_individual = individual.copy()
+
+                # 计算平均适应度和距离
+                avg_fitness = np.mean(fitness_scores)
+                best_distance = self.calculate_route_distance(best_individual, G)
+
+                # 记录历史（按固定间隔附带详细路径信息）
+                history_entry = self._make_history_entry(generation, best_individual, best_fitness,
+                                                         avg_fitness, best_distance, G,
+                                                         congestion_scores, node_coordinates)
+
+                generation_history.append(history_entry)
+
+                # 早停检测：连续10代适应度无明显改善
+                best_fitness_history.append(best_fitness)
+                if len(best_fitness_history) >= 10:
+                    recent_improvement = best_fitness_history[-1] - best_fitness_history[-10]
+                    if recent_improvement < 0.001:
+                        stagnation_count += 1
+                    else:
+                        stagnation_count = 0
+
+                    if stagnation_count >= 10 and generation >= 50:  # 至少50代后才允许早停
+                        early_stop_generation = generation
+                        if verbose:
+                            print(f"早停：第 {generation} 代收敛（连续{10}代无明显改善）")
+                        break
+
+                if verbose and generation % 20 == 0:
+                    print(f"第 {generation} 代: 最佳适应度={best_fitness:.4f}, 平均适应度={avg_fitness:.4f}, 距离={best_distance/1000:.2f}km")
+
+                # 选择父母（锦标赛选择 + 自适应选择压力）
+                parents = self.select_parents(population, fitness_scores,
+                                             generation=generation,
+                                             total_generations=self.generations)
+
+                # 生成新种群
+                new_population = []
+
+                # 保留精英
+                elite_count = min(self.elite_size, len(population))
+                elite_indices = np.argsort(fitness_scores)[-elite_count:]
+                for idx in elite_indices:
+                    new_population.append(population[idx].copy())
+
+                # 交叉和变异
+                if seeded_offspring:
+                    new_population.extend(self._seeded_offspring(
+                        executor, parents, self.population_size - len(new_population),
+                        base_seed, generation, stagnation_count))
+
+                while len(new_population) < self.population_size:
+                    parent1, parent2 = parents[np.random.randint(0, len(parents))], \
+                                      parents[np.random.randint(0, len(parents))]
+
+                    # 传递必要参数以保护途经点约束
+                    child1, child2 = self.crossover(parent1, parent2,
+                                                   start_node=start_node,
+                                                   end_node=end_node,
+                                                   intermediate_nodes=intermediate_nodes,
+                                                   G=G)
+                    # 使用自适应变异率
+                    child1 = self.mutate(child1, G,
+                                        start_node=start_node,
+                                        end_node=end_node,
+                                        intermediate_nodes=intermediate_nodes,
+                                        stagnation_count=stagnation_count)
+                    child2 = self.mutate(child2, G,
+                                        start_node=start_node,
+                                        end_node=end_node,
+                                        intermediate_nodes=intermediate_nodes,
+                                        stagnation_count=stagnation_count)
+
+                    new_population.extend([child1, child2])
+
+                # 截断到指定大小
+                population = new_population[:self.population_size]
 
         if verbose:
             print(f"遗传算法优化完成，最佳适应度: {best_fitness:.4f}")
+            print(f"路径段缓存: {get_segment_cache(G).stats()}")
 
         # 强制确保路径有效性（完整验证）
         int_nodes = intermediate_nodes if intermediate_nodes else []
@@ -652,6 +866,114 @@ class GeneticOptimizer:
         self.optimization_history = generation_history
         return best_individual, generation_history
     
+    def _make_history_entry(self, generation: int, best_individual: List[int], best_fitness: float,
+                            avg_fitness: float, best_distance: float, G: nx.MultiDiGraph,
+                            congestion_scores: Dict,
+                            node_coordinates: Optional[Dict[int, Tuple[float, float]]] = None) -> Dict:
+        """
+        生成一代的优化历史记录（到达记录间隔且路径变化时附带详细路径信息）
+
+        Args:
+            generation: 当前代数
+            best_individual: 当前最优路径
+            best_fitness: 当前最优适应度
+            avg_fitness: 平均适应度
+            best_distance: 当前最优路径距离
+            G: 路网图
+            congestion_scores: 拥堵系数
+            node_coordinates: 节点坐标字典（可选）
+
+        Returns:
+            历史记录字典
+        """
+        history_entry = {
+            'generation': generation,
+            'best_fitness': best_fitness,
+            'avg_fitness': avg_fitness,
+            'best_distance': best_distance
+        }
+
+        # 按固定间隔记录详细路径信息（只有路径发生变化才记录）
+        path_changed = self._is_path_changed(best_individual)
+        should_record = (generation % self.record_interval == 0 or generation == self.generations - 1) and (path_changed)
+
+        # 关键逻辑：到了固定间隔记录点时，只有路径发生变化才记录
+        if should_record:
+            # 使用通用函数计算路径统计
+            route_stats = calculate_route_metrics(best_individual, G, congestion_scores)
+
+            # 添加详细路径信息
+            history_entry.update({
+                'detailed_path': {
+                    'nodes': best_individual.copy(),
+                    'node_count': len(best_individual),
+                    'edge_count': route_stats['edge_count'],
+                    'total_distance_m': round(best_distance, 2),
+                    'total_distance_km': round(best_distance / 1000, 3),
+                    'congestion_percentage': round(route_stats['congestion_percentage'], 2),
+                    'avg_congestion_score': round(route_stats['avg_congestion_score'], 4)
+                }
+            })
+
+            # 如果提供了节点坐标，记录坐标信息
+            if node_coordinates:
+                coords = []
+                for node in best_individual:
+                    if node in node_coordinates:
+                        lat, lon = node_coordinates[node]
+                        coords.append({
+                            'node_id': node,
+                            'lat': round(lat, 6),
+                            'lon': round(lon, 6)
+                        })
+                history_entry['detailed_path']['coordinates'] = coords
+
+            # 更新上一次记录的路径
+            self._last_recorded_path = best_individual.copy()
+
+        return history_entry
+
+    def _seeded_offspring(self, executor: Optional[ProcessPoolExecutor], parents: List[List[int]],
+                          count: int, base_seed: int, generation: int,
+                          stagnation_count: int) -> List[List[int]]:
+        """
+        按派生种子生成子代（进程池为None时在当前进程执行同样的任务）
+
+        父代配对在主进程中抽取，每对父代的交叉和变异作为一个任务，
+        使用由 (基础种子, 代数, 任务序号) 派生的独立种子，
+        因此相同种子下结果可复现，且与进程数无关。
+
+        Args:
+            executor: 进程池，None时在当前进程执行
+            parents: 父代列表
+            count: 需要的子代数量
+            base_seed: 基础随机种子
+            generation: 当前代数
+            stagnation_count: 停滞代数（用于自适应变异率）
+
+        Returns:
+            子代列表（按任务顺序）
+        """
+        tasks = []
+        for k in range((count + 1) // 2):
+            parent1 = parents[np.random.randint(0, len(parents))]
+            parent2 = parents[np.random.randint(0, len(parents))]
+            seed = int(np.random.SeedSequence([base_seed, generation, k]).generate_state(1)[0])
+            tasks.append((seed, parent1, parent2, stagnation_count))
+
+        if executor is not None:
+            results = list(executor.map(_ga_offspring_worker, tasks))
+        else:
+            # 任务会重新播种全局随机状态，执行后恢复，使主进程的父代抽取与并行时一致
+            rng_state = np.random.get_state()
+            results = [_ga_offspring_worker(task) for task in tasks]
+            np.random.set_state(rng_state)
+
+        offspring = []
+        for child1, child2 in results:
+            offspring.extend([child1, child2])
+        return offspring
+
     def calculate_route_distance(self, route: List[int], G: nx.MultiDiGraph) -> float:
         """计算路线总距离"""
         total_distance = 0
@@ -665,6 +987,309 @@ class GeneticOptimizer:
                 total_distance += 1000  # 惩罚距离
         return total_distance
 
+
+def _island_epoch_worker(task: Tuple[int, Dict, int, int, int]) -> Tuple[int, Dict, List[Dict]]:
+    """
+    进程池任务：一个岛屿独立进化一个迁移周期
+
+    Args:
+        task: (岛屿编号, 岛屿状态, 起始代数, 代数, 随机种子)
+
+    Returns:
+        (岛屿编号, 更新后的岛屿状态, 每代统计列表)
+    """
+    island_id, state, generation_start, num_generations, seed = task
+    # 图、评估器和约束在fork前写入共享上下文，子进程直接继承
+    optimizer, context = worker_context()
+    np.random.seed(seed)
+    state, stats = optimizer._evolve_island(island_id, state, generation_start, num_generations, **context)
+    return island_id, state, stats
+
+
+class IslandGeneticOptimizer(GeneticOptimizer):
+    """
+    岛屿模型遗传算法优化器
+
+    多个子种群（岛屿）各自独立进化，每 migration_interval 代按环形拓扑
+    把每个岛屿的精英个体迁移到下一个岛屿，替换其末尾的非精英个体。
+    各岛屿在一个迁移周期内互不依赖，可分布到多个进程上并行执行；
+    每个岛屿每个周期使用由 (基础种子, 周期, 岛屿编号) 派生的独立种子，
+    相同种子下结果可复现，且与进程数无关。
+    """
+
+    def __init__(self, num_islands: int = 4, migration_interval: int = 10,
+                 migration_size: int = 2, **kwargs):
+        """
+        Args:
+            num_islands: 岛屿数量（每个岛屿的种群大小为 population_size）
+            migration_interval: 迁移间隔（代）
+            migration_size: 每次迁移的精英个体数
+            **kwargs: 传给 GeneticOptimizer 的参数（workers 为岛屿并行进程数）
+        """
+        super().__init__(**kwargs)
+        self.num_islands = num_islands
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+
+    def _score_population(self, population: List[List[int]], G: nx.MultiDiGraph,
+                          congestion_scores: Dict, target_distance: Optional[float],
+                          start_node: int, end_node: int, intermediate_nodes: List[int],
+                          batch_evaluator: Optional[BatchFitnessEvaluator]) -> List[float]:
+        """评估整个种群的适应度"""
+        if batch_evaluator is not None:
+            return batch_evaluator.evaluate(population, target_distance,
+                                            start_node=start_node,
+                                            end_node=end_node,
+                                            intermediate_nodes=intermediate_nodes).tolist()
+        return [self.evaluate_fitness(individual, G, congestion_scores, target_distance,
+                                      start_node=start_node,
+                                      end_node=end_node,
+                                      intermediate_nodes=intermediate_nodes)
+                for individual in population]
+
+    def _evolve_island(self, island_id: int, state: Dict, generation_start: int, num_generations: int,
+                       G: nx.MultiDiGraph, congestion_scores: Dict, target_distance: Optional[float],
+                       start_node: int, end_node: int, intermediate_nodes: List[int],
+                       initial_path: Optional[List[int]],
+                       batch_evaluator: Optional[BatchFitnessEvaluator]) -> Tuple[Dict, List[Dict]]:
+        """
+        单个岛屿进化若干代
+
+        Args:
+            island_id: 岛屿编号
+            state: 岛屿状态（population/best_individual/best_fitness/fitness_history/
+                   stagnation_count/elites），population为None时先创建初始种群
+            generation_start: 起始代数
+            num_generations: 本周期进化代数
+            其余参数同 optimize
+
+        Returns:
+            (更新后的岛屿状态, 每代统计列表)，每代统计附带该代的最优个体副本，
+            使汇总的历史记录中适应度与路径、距离对应同一个体
+        """
+        population = state['population']
+        if population is None:
+            population = self.create_population(start_node, end_node, intermediate_nodes, G, initial_path)
+
+        best_individual = state['best_individual']
+        best_fitness = state['best_fitness']
+        fitness_history = state['fitness_history']
+        stagnation_count = state['stagnation_count']
+        elites = state['elites']
+        stats = []
+
+        for generation in range(generation_start, generation_start + num_generations):
+            fitness_scores = self._score_population(population, G, congestion_scores, target_distance,
+                                                    start_node, end_node, intermediate_nodes,
+                                                    batch_evaluator)
+            best_idx = int(np.argmax(fitness_scores))
+            if fitness_scores[best_idx] > best_fitness:
+                best_fitness = fitness_scores[best_idx]
+                best_individual = population[best_idx].copy()
+
+            stats.append({
+                'island': island_id,
+                'generation': generation,
+                'best_fitness': best_fitness,
+                'best_individual': best_individual.copy() if best_individual is not None else None,
+                'avg_fitness': float(np.mean(fitness_scores))
+            })
+
+            # 岛屿内部的停滞计数（驱动自适应变异率）
+            fitness_history.append(best_fitness)
+            if len(fitness_history) >= 10:
+                if fitness_history[-1] - fitness_history[-10] < 0.001:
+                    stagnation_count += 1
+                else:
+                    stagnation_count = 0
+
+            parents = self.select_parents(population, fitness_scores,
+                                          generation=generation,
+                                          total_generations=self.generations)
+
+            # 保留精英（同时作为迁移候选）
+            elite_count = min(self.elite_size, len(population))
+            elite_indices = np.argsort(fitness_scores)[-elite_count:]
+            new_population = [population[idx].copy() for idx in elite_indices]
+            elites = [population[idx].copy() for idx in elite_indices[::-1][:self.migration_size]]
+
+            while len(new_population) < self.population_size:
+                parent1, parent2 = parents[np.random.randint(0, len(parents))], \
+                                  parents[np.random.randint(0, len(parents))]
+                child1, child2 = self.crossover(parent1, parent2,
+                                                start_node=start_node,
+                                                end_node=end_node,
+                                                intermediate_nodes=intermediate_nodes,
+                                                G=G)
+                child1 = self.mutate(child1, G,
+                                     start_node=start_node,
+                                     end_node=end_node,
+                                     intermediate_nodes=intermediate_nodes,
+                                     stagnation_count=stagnation_count)
+                child2 = self.mutate(child2, G,
+                                     start_node=start_node,
+                                     end_node=end_node,
+                                     intermediate_nodes=intermediate_nodes,
+                                     stagnation_count=stagnation_count)
+                new_population.extend([child1, child2])
+
+            population = new_population[:self.population_size]
+
+        state = {
+            'population': population,
+            'best_individual': best_individual,
+            'best_fitness': best_fitness,
+            'fitness_history': fitness_history,
+            'stagnation_count': stagnation_count,
+            'elites': elites
+        }
+        return state, stats
+
+    def _migrate(self, states: List[Dict]):
+        """
+        环形迁移：岛屿 i 的精英替换岛屿 i+1 种群末尾的个体（末尾为子代，不含精英）
+        """
+        migrants = [state['elites'] for state in states]
+        for i, state in enumerate(states):
+            incoming = migrants[(i - 1) % len(states)]
+            if not incoming or state['population'] is None:
+                continue
+            population = state['population']
+            count = min(len(incoming), max(0, len(population) - self.elite_size))
+            for k in range(count):
+                population[len(population) - 1 - k] = incoming[k].copy()
+
+    def optimize(self, start_node: int, end_node: int, intermediate_nodes: List[int],
+                G: nx.MultiDiGraph, congestion_scores: Dict, target_distance: Optional[float] = None,
+                initial_path: List[int] = None, verbose: bool = True,
+                node_coordinates: Optional[Dict[int, Tuple[float, float]]] = None) -> Tuple[List[int], Dict]:
+        """
+        执行岛屿模型遗传算法优化（参数与返回值同 GeneticOptimizer.optimize）
+
+        优化历史每代记录全局最优，并在 'islands' 字段中记录各岛屿的
+        最优/平均适应度，用于观察各岛屿的收敛情况。
+        """
+        self._last_recorded_path = None
+        intermediate_nodes = intermediate_nodes if intermediate_nodes else []
+
+        base_seed = self.seed if self.seed is not None else int(np.random.randint(0, 2**31 - 1))
+        batch_evaluator = BatchFitnessEvaluator(G, congestion_scores) if self.batch_fitness else None
+        context = {
+            'G': G,
+            'congestion_scores': congestion_scores,
+            'target_distance': target_distance,
+            'start_node': start_node,
+            'end_node': end_node,
+            'intermediate_nodes': intermediate_nodes,
+            'initial_path': initial_path,
+            'batch_evaluator': batch_evaluator
+        }
+
+        states = [{
+            'population': None,
+            'best_individual': None,
+            'best_fitness': 0,
+            'fitness_history': [],
+            'stagnation_count': 0,
+            'elites': []
+        } for _ in range(self.num_islands)]
+
+        best_individual = None
+        best_fitness = 0
+        generation_history = []
+        best_fitness_history = []
+        stagnation_count = 0
+        early_stopped = False
+
+        generation = 0
+        epoch = 0
+
+        # 各岛屿一个迁移周期内相互独立，分发到fork进程池；退出（包括异常）时关闭进程池并清空共享上下文
+        with fork_executor(self.workers, self.num_islands, context=(self, context),
+                           fallback_message="警告: 当前系统不支持fork，岛屿按顺序进化") as executor:
+            if verbose:
+                print(f"开始岛屿模型遗传算法优化: {self.num_islands} 个岛屿 x {self.population_size} 个体, "
+                      f"每 {self.migration_interval} 代迁移 {self.migration_size} 个精英, "
+                      f"并行进程 {self.workers if executor is not None else 1}, 基础种子 {base_seed}")
+
+            while generation < self.generations and not early_stopped:
+                num_generations = min(self.migration_interval, self.generations - generation)
+                tasks = [(i, states[i], generation, num_generations,
+                          int(np.random.SeedSequence([base_seed, epoch, i]).generate_state(1)[0]))
+                         for i in range(self.num_islands)]
+
+                if executor is not None:
+                    results = list(executor.map(_island_epoch_worker, tasks))
+                else:
+                    results = []
+                    for island_id, state, gen_start, n_gens, seed in tasks:
+                        np.random.seed(seed)
+                        state, stats = self._evolve_island(island_id, state, gen_start, n_gens, **context)
+                        results.append((island_id, state, stats))
+
+                island_stats = []
+                for island_id, state, stats in results:
+                    states[island_id] = state
+                    island_stats.append(stats)
+
+                # 汇总每一代的全局最优和各岛屿统计
+                for offset in range(num_generations):
+                    gen_stats = [stats[offset] for stats in island_stats]
+                    for island_id, stats in enumerate(gen_stats):
+                        if stats['best_fitness'] > best_fitness:
+                            best_fitness = stats['best_fitness']
+                            best_individual = stats['best_individual']
+                    avg_fitness = float(np.mean([stats['avg_fitness'] for stats in gen_stats]))
+                    best_distance = self.calculate_route_distance(best_individual, G)
+
+                    history_entry = self._make_history_entry(generation + offset, best_individual, best_fitness,
+                                                             avg_fitness, best_distance, G,
+                                                             congestion_scores, node_coordinates)
+                    history_entry['islands'] = [{
+                        'island': stats['island'],
+                        'best_fitness': stats['best_fitness'],
+                        'avg_fitness': stats['avg_fitness']
+                    } for stats in gen_stats]
+                    generation_history.append(history_entry)
+
+                    # 全局早停：与单种群相同的判定规则
+                    best_fitness_history.append(best_fitness)
+                    if len(best_fitness_history) >= 10:
+                        if best_fitness_history[-1] - best_fitness_history[-10] < 0.001:
+                            stagnation_count += 1
+                        else:
+                            stagnation_count = 0
+                        if stagnation_count >= 10 and generation + offset >= 50:
+                            early_stopped = True
+                            if verbose:
+                                print(f"早停：第 {generation + offset} 代收敛（连续{10}代无明显改善）")
+                            break
+
+                generation += num_generations
+                epoch += 1
+
+                if verbose:
+                    island_best = ", ".join(f"{state['best_fitness']:.4f}" for state in states)
+                    print(f"第 {generation} 代: 全局最佳适应度={best_fitness:.4f}, 各岛屿最佳=[{island_best}]")
+
+                # 环形迁移精英
+                if not early_stopped and generation < self.generations and self.num_islands > 1:
+                    self._migrate(states)
+
+        if verbose:
+            print(f"岛屿模型遗传算法优化完成，最佳适应度: {best_fitness:.4f}")
+            print(f"路径段缓存（主进程）: {get_segment_cache(G).stats()}")
+
+        # 强制确保路径有效性
+        if best_individual is None or len(best_individual) < 2 or \
+                not self._validate_path(G, best_individual, start_node, end_node, intermediate_nodes):
+            print("警告: 最优路径无效，重新生成...")
+            best_individual = self.create_individual(start_node, end_node, intermediate_nodes, G)
+
+        self.optimization_history = generation_history
+        return best_individual, generation_history
+
+
 class RoutePlanner:
     """智能路线规划器"""
 
@@ -674,6 +1299,7 @@ class RoutePlanner:
         self.net_processor = NetDataProcessor()  # Net路网处理器
         self.genetic_optimizer = GeneticOptimizer()
         self._net_mode = False  # 是否使用Net模式
+        self.workers = 1  # 并行进程数
 
     def parse_arguments(self):
         """解析命令行参数"""
@@ -689,6 +1315,13 @@ class RoutePlanner:
         parser.add_argument('--record-interval', type=int, default=50, help='详细路径记录间隔（每多少代记录一次）')
         parser.add_argument('--local-map', help='本地地图 XML 文件名 (data 目录下)')
         parser.add_argument('--data-dir', default='data', help='本地数据目录路径')
+        parser.add_argument('--net-file', help='Net路网文件路径（.net.xml）')
+        parser.add_argument('--compact-graph', action='store_true', help='Net模式下使用紧凑CSR路网表示及scipy csgraph最短路内核')
+        parser.add_argument('--workers', type=int, default=1, help='并行进程数（途经点最短路搜索和遗传算法子代生成）')
+        parser.add_argument('--seed', type=int, help='随机种子（设置后结果可复现，与进程数无关）')
+        parser.add_argument('--islands', type=int, default=1, help='岛屿模型的岛屿数量（>1时启用，各岛屿并行进化）')
+        parser.add_argument('--migration-interval', type=int, default=10, help='岛屿间精英迁移间隔（代）')
+        parser.add_argument('--migration-size', type=int, default=2, help='每次迁移的精英个体数')
 
         return parser.parse_args()
     
@@ -698,7 +1331,8 @@ class RoutePlanner:
                      margin_km: float = 1.0,
                      local_xml_file: str = None,
                      data_dir: str = "data",
-                     net_file: str = None) -> nx.MultiDiGraph:
+                     net_file: str = None,
+                     compact_graph: bool = False) -> nx.MultiDiGraph:
         """
         加载路网数据
 
@@ -713,6 +1347,7 @@ class RoutePlanner:
             local_xml_file: 本地 OSM XML 文件名（可选）
             data_dir: 本地数据目录路径
             net_file: Net路网文件路径（.net.xml可选）
+            compact_graph: Net模式下是否构建紧凑CSR表示（最短路径查询自动使用其内核）
 
         Returns:
             路网图
@@ -724,7 +1359,7 @@ class RoutePlanner:
         if net_file:
             print(f"使用Net路网模式: {net_file}")
             self._net_mode = True
-            G = self.net_processor.load_network_from_net(net_file)
+            G = self.net_processor.load_network_from_net(net_file, compact=compact_graph)
             return G
 
         self._net_mode = False
@@ -794,11 +1429,14 @@ class RoutePlanner:
             print(f"  途经点 (索引{i+1}): {self.processor._get_node_name(G, node)}")
         print(f"  终点 (索引{num_nodes-1}): {self.processor._get_node_name(G, end_node)}")
 
+        # 途经点最短路服务：距离矩阵、缺失点插入和路径展开共用同一份距离/前驱缓存
+        path_service = get_path_service(G)
+
         # 如果没有途经点，直接使用最短路径
         if len(intermediate_nodes) == 0:
             print("无途经点，直接计算起点到终点的最短路径...")
             try:
-                full_route = nx.shortest_path(G, start_node, end_node, weight='length')
+                full_route = path_service.path(start_node, end_node)
                 print(f"最短路径包含 {len(full_route)} 个节点")
                 return full_route
             except nx.NetworkXNoPath:
@@ -806,14 +1444,14 @@ class RoutePlanner:
 
         print(f"正在计算 {num_nodes}x{num_nodes} 距离矩阵...")
 
-        # 预计算关键点之间的距离矩阵（使用Dijkstra）
+        # 预计算关键点之间的距离矩阵（有界Dijkstra：搜索半径覆盖所有关键点后即停止）
+        lengths = path_service.distance_matrix(node_list, workers=self.workers)
         distance_matrix = []
-        for from_node in node_list:
+        for from_idx in range(num_nodes):
             row = []
-            lengths = nx.single_source_dijkstra_path_length(G, from_node, weight='length')
-            for to_node in node_list:
-                if to_node in lengths:
-                    row.append(int(lengths[to_node]))
+            for to_idx in range(num_nodes):
+                if np.isfinite(lengths[from_idx, to_idx]):
+                    row.append(int(lengths[from_idx, to_idx]))
                 else:
                     row.append(10000000)  # 无穷大（不可达）
             distance_matrix.append(row)
@@ -916,9 +1554,9 @@ class RoutePlanner:
 
                     # 计算插入成本
                     try:
-                        cost_before = nx.shortest_path_length(G, prev_node, next_node, weight='length')
-                        cost_after = (nx.shortest_path_length(G, prev_node, missing_node, weight='length') +
-                                     nx.shortest_path_length(G, missing_node, next_node, weight='length'))
+                        cost_before = path_service.distance(prev_node, next_node)
+                        cost_after = (path_service.distance(prev_node, missing_node) +
+                                     path_service.distance(missing_node, next_node))
                         insert_cost = cost_after - cost_before
 
                         if insert_cost < best_cost:
@@ -949,7 +1587,7 @@ class RoutePlanner:
         full_route = []
         for i in range(len(skeleton_route) - 1):
             try:
-                segment_path = nx.shortest_path(G, skeleton_route[i], skeleton_route[i+1], weight='length')
+                segment_path = get_segment_cache(G).path(skeleton_route[i], skeleton_route[i+1])
                 # 避免重复添加连接点
                 if i > 0:
                     segment_path = segment_path[1:]
@@ -970,6 +1608,7 @@ class RoutePlanner:
                 print(f"错误: 途经点 {self.processor._get_node_name(G, node)} 不在最终路径中!")
 
         print(f"OR-Tools求解成功，初始路径包含 {len(full_route)} 个节点")
+        print(f"  最短路缓存: {path_service.stats()}")
         print(f"  路径起点: {self.processor._get_node_name(G, full_route[0])}")
         print(f"  路径终点: {self.processor._get_node_name(G, full_route[-1])}")
         return full_route
@@ -987,6 +1626,10 @@ class RoutePlanner:
         print("=" * 50)
         print("智能路线规划")
         print("=" * 50)
+
+        # 固定随机种子：种群初始化、父代选择及并行子代种子均由此派生
+        if getattr(args, 'seed', None) is not None:
+            np.random.seed(args.seed)
         
         # 1. 获取地址坐标（优先使用显式经纬度，避免地理编码偏移）
         print("\\n1. 地址解析...")
@@ -1031,28 +1674,20 @@ class RoutePlanner:
             margin_km=getattr(args, 'margin_km', 1.0),  # 默认扩展1公里
             local_xml_file=getattr(args, 'local_map', None),
             data_dir=getattr(args, 'data_dir', 'data'),
-            net_file=net_file
+            net_file=net_file,
+            compact_graph=getattr(args, 'compact_graph', False)
         )
 
-        # 3. 找到对应的节点
+        # 3. 找到对应的节点（起点、终点和途经点一次批量吸附到空间索引）
+        query_coords = [(start_lat, start_lon), (end_lat, end_lon)] + list(intermediate_coords)
         if self._net_mode:
             # Net模式：使用net_processor的坐标转换
-            start_node = self.net_processor.find_nearest_node(G, start_lat, start_lon)
-            end_node = self.net_processor.find_nearest_node(G, end_lat, end_lon)
-
-            intermediate_nodes = []
-            for lat, lon in intermediate_coords:
-                node = self.net_processor.find_nearest_node(G, lat, lon)
-                intermediate_nodes.append(node)
+            matched_nodes = self.net_processor.find_nearest_nodes(G, query_coords)
         else:
             # OSM模式：使用processor的坐标匹配
-            start_node = self.processor.get_node_by_coordinates(G, start_lat, start_lon)
-            end_node = self.processor.get_node_by_coordinates(G, end_lat, end_lon)
-
-            intermediate_nodes = []
-            for lat, lon in intermediate_coords:
-                node = self.processor.get_node_by_coordinates(G, lat, lon)
-                intermediate_nodes.append(node)
+            matched_nodes = self.processor.get_nodes_by_coordinates(G, query_coords)
+        start_node, end_node = matched_nodes[0], matched_nodes[1]
+        intermediate_nodes = list(matched_nodes[2:])
         
         print(f"起始节点: {start_node}")
         print(f"目标节点: {end_node}")
@@ -1062,18 +1697,31 @@ class RoutePlanner:
         # 该函数可以定制，从而实现不限于拥堵系数的其他权重计算
         print("\\n3. 计算拥堵系数...")
         congestion_scores = self.processor.calculate_congestion_score(G)
+        if 'compact' in G.graph:
+            G.graph['compact'].set_congestion(congestion_scores)
 
         # 5. 使用OR-Tools求解初始解
         print("\\n4. 使用OR-Tools求解初始解...")
+        self.workers = max(1, getattr(args, 'workers', 1) or 1)
         initial_route = self.solve_with_ortools(start_node, end_node, intermediate_nodes, G)
 
         # 6. 使用遗传算法优化
         print("\\n5. 使用遗传算法优化...")
         target_distance = args.distance * 1000 if args.distance else None
 
+        # 多岛屿时切换为岛屿模型（每个岛屿一个完整种群，精英定期迁移）
+        num_islands = getattr(args, 'islands', 1) or 1
+        if num_islands > 1:
+            self.genetic_optimizer = IslandGeneticOptimizer(
+                num_islands=num_islands,
+                migration_interval=getattr(args, 'migration_interval', 10),
+                migration_size=getattr(args, 'migration_size', 2))
+
         # 设置遗传算法参数
         self.genetic_optimizer.generations = args.generations
         self.genetic_optimizer.record_interval = args.record_interval
+        self.genetic_optimizer.workers = self.workers
+        self.genetic_optimizer.seed = getattr(args, 'seed', None)
 
         # 提取节点坐标用于详细路径记录
         node_coordinates = {}
@@ -1108,17 +1756,10 @@ class RoutePlanner:
             # 重新加载网络以获取edge_id信息
             edge_id_to_info = {}
             try:
-                import xml.etree.ElementTree as ET
-                tree = ET.parse(net_file)
-                root = tree.getroot()
-                for edge_elem in root.findall('.//edge'):
-                    edge_id = edge_elem.get('id')
-                    function = edge_elem.get('function', '')
-                    if function == 'internal' or edge_id.startswith(':'):
-                        continue
-                    from_node = edge_elem.get('from')
-                    to_node = edge_elem.get('to')
-                    edge_id_to_info[edge_id] = {'from': from_node, 'to': to_node}
+                from common.net_cache import load_net
+                net = load_net(net_file, verbose=False)
+                for i in net.iter_edges(skip_internal=True):
+                    edge_id_to_info[net.edge_ids[i]] = {'from': net.edge_from[i], 'to': net.edge_to[i]}
 
                 # 转换为edge_id序列（使用net_processor）
                 edge_ids, _ = self.net_processor.nodes_to_edge_ids(G, optimized_route, edge_id_to_info)
@@ -1147,7 +1788,7 @@ class RoutePlanner:
             },
             'route': route_data,
             'optimization': {
-                'algorithm': 'OR-Tools + Genetic Algorithm',
+                'algorithm': 'OR-Tools + Island Genetic Algorithm' if num_islands > 1 else 'OR-Tools + Genetic Algorithm',
                 'generations': args.generations,
                 'final_fitness': optimization_history[-1]['best_fitness'] if optimization_history else 0,
                 'history': optimization_history
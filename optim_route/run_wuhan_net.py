@@ -62,11 +62,12 @@ def generate_fixed_cases():
     return [case1, case2, case3]
 
 
-def load_net_network(net_file: str):
+def load_net_network(net_file: str, compact_graph: bool = False):
     """Load Net network from file.
 
     Args:
         net_file: Net路网文件路径
+        compact_graph: 是否构建紧凑CSR表示（最短路径查询使用scipy csgraph内核）
 
     Returns:
         (NetworkX graph, NetDataProcessor) tuple
@@ -74,7 +75,7 @@ def load_net_network(net_file: str):
     from utils import NetDataProcessor
 
     net_processor = NetDataProcessor()
-    G = net_processor.load_network_from_net(net_file)
+    G = net_processor.load_network_from_net(net_file, compact=compact_graph)
     return G, net_processor
 
 
@@ -109,11 +110,10 @@ def calculate_baseline(G, start_node, end_node):
     Returns:
         dict with route, distance, edge_count, and congestion_percentage
     """
-    import networkx as nx
-    from utils import OSMDataProcessor
+    from utils import OSMDataProcessor, shortest_path
 
     # Calculate shortest path
-    route = nx.shortest_path(G, start_node, end_node, weight='length')
+    route = shortest_path(G, start_node, end_node, weight='length')
     distance = sum(G[route[i]][route[i+1]][0].get('length', 100)
                    for i in range(len(route)-1))
 
@@ -423,7 +423,9 @@ def generate_comparison_visualization(net_file: str, output_dir: str,
 
 def run_single_test(net_file: str, start_lat: float, start_lon: float,
                     end_lat: float, end_lon: float, output_dir: str,
-                    via_points=None, distance=None, generations=10):
+                    via_points=None, distance=None, generations=10,
+                    compact_graph=False, workers=1, seed=None, islands=1,
+                    migration_interval=10):
     """
     Run a single Net route planning test.
 
@@ -437,12 +439,17 @@ def run_single_test(net_file: str, start_lat: float, start_lon: float,
         via_points: 途经点列表 [(lat, lon), ...]
         distance: 目标距离约束（公里）
         generations: 遗传算法迭代次数
+        compact_graph: 是否使用紧凑CSR路网表示
+        workers: 并行进程数（途经点最短路搜索和遗传算法子代生成）
+        seed: 随机种子（None表示不固定）
+        islands: 岛屿模型的岛屿数量（>1时启用）
+        migration_interval: 岛屿间精英迁移间隔（代）
     """
     os.makedirs(output_dir, exist_ok=True)
     via_points = via_points or []
 
     print("  加载Net路网...")
-    G, net_processor = load_net_network(net_file)
+    G, net_processor = load_net_network(net_file, compact_graph=compact_graph)
 
     print("  查找起点和终点节点...")
     start_node, end_node = find_route_nodes(net_processor, G, start_lat, start_lon, end_lat, end_lon)
@@ -465,6 +472,11 @@ def run_single_test(net_file: str, start_lat: float, start_lon: float,
     route_args.generations = generations
     route_args.record_interval = generations // 2 if generations > 1 else 1
     route_args.net_file = net_file
+    route_args.compact_graph = compact_graph
+    route_args.workers = workers
+    route_args.seed = seed
+    route_args.islands = islands
+    route_args.migration_interval = migration_interval
     route_args.local_map = None
     route_args.data_dir = "data"
     route_args.margin_km = 1.0
@@ -485,8 +497,7 @@ def run_single_test(net_file: str, start_lat: float, start_lon: float,
     # Get via node IDs from via_points coordinates
     via_node_ids = []
     if via_points:
-        for lat, lon in via_points:
-            node_id = net_processor.find_nearest_node(G, lat, lon)
+        for node_id in net_processor.find_nearest_nodes(G, via_points):
             if node_id:
                 via_node_ids.append(node_id)
 
@@ -558,6 +569,16 @@ def main() -> None:
                         help='遗传算法迭代次数（默认: 100）')
     parser.add_argument("--force-recompute", action="store_true",
                         help='强制重新计算')
+    parser.add_argument("--compact-graph", action="store_true",
+                        help='使用紧凑CSR路网表示及scipy csgraph最短路内核（shape移入侧表、加速最短路径查询）')
+    parser.add_argument("--workers", type=int, default=1,
+                        help='并行进程数（途经点最短路搜索和遗传算法子代生成）')
+    parser.add_argument("--seed", type=int, default=None,
+                        help='随机种子（设置后结果可复现，与进程数无关）')
+    parser.add_argument("--islands", type=int, default=1,
+                        help='岛屿模型的岛屿数量（>1时启用，适合途经点多的长路线如case2）')
+    parser.add_argument("--migration-interval", type=int, default=10,
+                        help='岛屿间精英迁移间隔（代）')
 
     args = parser.parse_args()
 
@@ -573,7 +594,12 @@ def main() -> None:
             output_dir=output_dir,
             via_points=None,
             distance=None,
-            generations=args.generations
+            generations=args.generations,
+            compact_graph=args.compact_graph,
+            workers=args.workers,
+            seed=args.seed,
+            islands=args.islands,
+            migration_interval=args.migration_interval
         )
         return
 
@@ -634,7 +660,12 @@ def main() -> None:
                     output_dir=output_dir,
                     via_points=case['vias'],
                     distance=case.get('distance'),
-                    generations=args.generations
+                    generations=args.generations,
+                    compact_graph=args.compact_graph,
+                    workers=args.workers,
+                    seed=args.seed,
+                    islands=args.islands,
+                    migration_interval=args.migration_interval
                 )
             except RuntimeError as e:
                 print(f"  测试失败: {e}")
@@ -4,19 +4,29 @@ OSM数据处理和绿化率计算工具模块
 """
 
 import os
+import sys
+from collections import OrderedDict
 import osmnx as ox
 import networkx as nx
 import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
 import geopandas as gpd
-from shapely.geometry import Point, Polygon
 import matplotlib.pyplot as plt
 from typing import List, Tuple, Dict, Optional, Any
 import requests
 import json
 
-import xml.etree.ElementTree as ET
 import pyproj
-from shapely.geometry import Point
+from rtree import index as rtree_index
+
+# 仓库根目录（共享的路网缓存、进程池模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.net_cache import load_net
+from common.parallel import fork_map, worker_context
 
 
 # ============================================================
@@ -262,7 +272,7 @@ class OSMDataProcessor:
 
     def get_node_by_coordinates(self, G: nx.MultiDiGraph, lat: float, lon: float) -> int:
         """
-        根据坐标找到最近的节点
+        根据坐标找到最近的节点（空间索引查询，OSM节点坐标为经纬度）
 
         Args:
             G: 路网图
@@ -272,20 +282,26 @@ class OSMDataProcessor:
         Returns:
             最近的节点ID
         """
-        point = Point(float(lon), float(lat))
-        min_dist = float('inf')
-        closest_node = None
+        node, _ = get_spatial_index(G).nearest(float(lon), float(lat))
+        return node
 
-        for node in G.nodes():
-            node_data = G.nodes[node]
-            node_point = Point(float(node_data['x']), float(node_data['y']))
-            dist = point.distance(node_point)
+    def get_nodes_by_coordinates(self, G: nx.MultiDiGraph,
+                                 coords: List[Tuple[float, float]]) -> List[int]:
+        """
+        批量坐标匹配节点（一次向量化查询）
 
-            if dist < min_dist:
-                min_dist = dist
-                closest_node = node
+        Args:
+            G: 路网图
+            coords: [(lat, lon), ...] 坐标列表
 
-        return closest_node
+        Returns:
+            最近节点ID列表，与coords一一对应
+        """
+        if not coords:
+            return []
+        latlon = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        nodes, _ = get_spatial_index(G).nearest_batch(latlon[:, ::-1])
+        return nodes
 
     def _get_node_name(self, G: nx.MultiDiGraph, node: int) -> str:
         """
@@ -323,56 +339,11 @@ class OSMDataProcessor:
         Returns:
             拥堵系数字典 {(u, v): congestion_score}
         """
-        congestion_scores = {}
-
-        for u, v, data in G.edges(data=True):
-            score = None
-
-            # 优先使用 OSM highway 类型（OSM 模式）
-            # 道路等级越高，交通流量越大，拥堵系数越高
-            highway = data.get('highway')
-            if highway:
-                if 'motorway' in highway or 'trunk' in highway:
-                    score = 0.9
-                elif 'primary' in highway:
-                    score = 0.7
-                elif 'secondary' in highway:
-                    score = 0.4
-                elif 'tertiary' in highway or 'residential' in highway:
-                    score = 0.2
-                elif 'service' in highway or 'footway' in highway:
-                    score = 0.1
-                else:
-                    score = 0.5
-
-            # Net 模式：使用 speed 计算拥堵系数
-            # 速度越高，通常是主干道/高速公路（更拥堵）
-            if score is None:
-                speed = data.get('speed')
-                if speed is not None:
-                    speed = float(speed)
-                    # 速度越高，拥堵系数越高
-                    # >25 m/s (90km/h): 高速公路，高拥堵
-                    # 16-25 m/s (58-90km/h): 主干道
-                    # 10-16 m/s (36-58km/h): 次干道
-                    # 5-10 m/s (18-36km/h): 支路
-                    # <5 m/s: 服务道路/小区道路，低拥堵
-                    if speed >= 25:
-                        score = 0.85
-                    elif speed >= 16:
-                        score = 0.65
-                    elif speed >= 10:
-                        score = 0.45
-                    elif speed >= 5:
-                        score = 0.25
-                    else:
-                        score = 0.10
-
-            # 默认值
-            if score is None:
-                score = 0.5
-
-            congestion_scores[(u, v)] = min(1.0, max(0.0, score))
+        # 边属性数组每个路网只构建一次，拥堵系数按 highway 类别和 speed 阈值向量化计算
+        # （规则见 EdgeArrays：高速/主干道 = 高拥堵；Net 模式下速度越高拥堵系数越高）
+        edge_arrays = get_edge_arrays(G)
+        edge_arrays.update_congestion()
+        congestion_scores = edge_arrays.congestion_dict()
 
         return congestion_scores
 
@@ -464,12 +435,15 @@ class NetDataProcessor:
         self.net_offset = None
         self.orig_boundary = None
 
-    def load_network_from_net(self, net_file: str) -> nx.MultiDiGraph:
+    def load_network_from_net(self, net_file: str, compact: bool = False) -> nx.MultiDiGraph:
         """
         从Net .net.xml文件加载NetworkX图
 
         Args:
             net_file: Net路网文件路径（.net.xml或.sumonet.xml）
+            compact: 是否构建紧凑CSR表示（附加在 G.graph['compact']，最短路径查询
+                     使用scipy csgraph内核；边上不再保存shape列表，几何改由侧表提供。
+                     NetworkX图本身仍完整保留，遗传算法等逐边访问的代码继续使用它）
 
         Returns:
             G: nx.MultiDiGraph
@@ -481,20 +455,17 @@ class NetDataProcessor:
 
         print(f"正在读取Net路网文件: {net_file}")
 
-        # 解析XML
-        tree = ET.parse(net_file)
-        root = tree.getroot()
+        # 解析路网（命中磁盘缓存时直接加载）
+        net = load_net(net_file)
 
         # 解析location信息用于坐标转换
-        location = root.find('location')
-        if location is not None:
-            self._parse_location(location)
+        if net.location is not None:
+            self._parse_location(net.location)
         else:
             # 尝试从edge/node推断
             self.projection = None
 
         # 读取节点（可能没有显式的<node>元素，需要从edge提取）
-        nodes = {}
         node_positions = {}  # node_id -> (x, y) 从lane shape中提取
 
         # 读取边（跳过internal边）
@@ -502,44 +473,43 @@ class NetDataProcessor:
         edge_count = 0
         skipped_internal = 0
 
-        for edge_elem in root.findall('.//edge'):
-            edge_id = edge_elem.get('id')
-            function = edge_elem.get('function', '')
+        edge_ids = net.edge_ids
+        edge_from = net.edge_from
+        edge_to = net.edge_to
+        edge_function = net.edge_function
+
+        for i in range(net.num_edges):
+            edge_id = edge_ids[i]
 
             # 跳过internal边
-            if function == 'internal' or edge_id.startswith(':'):
+            if edge_function[i] == 'internal' or edge_id.startswith(':'):
                 skipped_internal += 1
                 continue
 
-            from_node = edge_elem.get('from')
-            to_node = edge_elem.get('to')
+            from_node = edge_from[i]
+            to_node = edge_to[i]
 
             # 获取第一条lane的属性作为边的属性
-            lane_elem = edge_elem.find('lane')
-            if lane_elem is None:
+            lane = net.first_lane(i)
+            if lane is None:
                 continue
 
-            length = float(lane_elem.get('length', 0))
-            speed = float(lane_elem.get('speed', 13.9))
-            shape_str = lane_elem.get('shape', '')
+            length = float(net.lane_length[lane])
+            length = 0.0 if np.isnan(length) else length
+            speed = float(net.lane_speed[lane])
+            speed = 13.9 if np.isnan(speed) else speed
 
-            # 解析shape坐标
-            shape = []
-            if shape_str:
-                for coord in shape_str.split():
-                    parts = coord.split(',')
-                    if len(parts) == 2:
-                        shape.append((float(parts[0]), float(parts[1])))
+            # shape坐标
+            shape = net.lane_shape(lane)
 
-            # 提取起点坐标（shape的第一个点）
-            if shape and len(shape) >= 1:
+            # 提取起点坐标（shape的第一个点）与终点坐标（shape的最后一个点）
+            if shape:
                 node_positions[from_node] = shape[0]
-            # 提取终点坐标（shape的最后一个点）
-            if shape and len(shape) >= 1:
                 node_positions[to_node] = shape[-1]
 
             # 获取priority（用于绿化评分）
-            priority = int(edge_elem.get('priority', 2))
+            priority = net.edge_priority[i]
+            priority = 2 if np.isnan(priority) else int(priority)
 
             # 存储边信息
             edge_info = {
@@ -577,10 +547,17 @@ class NetDataProcessor:
         print(f"  提取到 {len(node_positions)} 个节点坐标")
         print(f"  NetworkX图: {len(G.nodes)} 节点, {len(G.edges)} 边")
 
+        if compact:
+            # shape移入紧凑表示的侧表，释放每条边上的坐标列表
+            G.graph['compact'] = CompactGraph.from_networkx(G)
+            for _, _, data in G.edges(data=True):
+                data.pop('shape', None)
+            print(f"  紧凑CSR表示: {G.graph['compact'].num_nodes} 节点, {G.graph['compact'].num_edges} 边")
+
         return G
 
     def _parse_location(self, location_elem):
-        """解析location元素获取投影参数"""
+        """解析location元素（或其属性字典）获取投影参数"""
         self.net_offset = location_elem.get('netOffset', '0,0')
         self.orig_boundary = location_elem.get('origBoundary', '')
         self.conv_boundary = location_elem.get('convBoundary', '')
@@ -693,7 +670,7 @@ class NetDataProcessor:
 
     def find_nearest_node(self, G: nx.MultiDiGraph, lat: float, lon: float) -> str:
         """
-        找到最近的节点（使用经纬度）
+        找到最近的节点（经纬度转投影XY后在空间索引中查询，距离单位为米）
 
         Args:
             G: 路网图
@@ -703,24 +680,47 @@ class NetDataProcessor:
         Returns:
             最近节点的ID
         """
-        min_dist = float('inf')
-        closest_node = None
+        x, y = self.latlon_to_xy(lat, lon)
+        node, _ = get_spatial_index(G).nearest(x, y)
+        return node
 
-        for node in G.nodes():
-            node_data = G.nodes[node]
-            node_x = node_data.get('x', 0)
-            node_y = node_data.get('y', 0)
+    def find_k_nearest_nodes(self, G: nx.MultiDiGraph, lat: float, lon: float,
+                             k: int = 5) -> List[Tuple[str, float]]:
+        """
+        找到距离最近的k个节点
 
-            # 将节点XY坐标转换为经纬度
-            node_lat, node_lon = self.xy_to_latlon(node_x, node_y)
+        Args:
+            G: 路网图
+            lat: 纬度
+            lon: 经度
+            k: 返回的节点数量
 
-            # 计算距离（使用简单的欧氏距离近似）
-            dist = np.sqrt((lat - node_lat) ** 2 + (lon - node_lon) ** 2)
-            if dist < min_dist:
-                min_dist = dist
-                closest_node = node
+        Returns:
+            [(节点ID, 距离米), ...]，按距离升序
+        """
+        x, y = self.latlon_to_xy(lat, lon)
+        return get_spatial_index(G).k_nearest(x, y, k)
+
+    def find_nearest_nodes(self, G: nx.MultiDiGraph,
+                           coords: List[Tuple[float, float]]) -> List[str]:
+        """
+        批量坐标匹配节点（坐标转换与索引查询均为向量化的一次调用）
 
-        return closest_node
+        Args:
+            G: 路网图
+            coords: [(lat, lon), ...] 坐标列表
+
+        Returns:
+            最近节点ID列表，与coords一一对应
+        """
+        if not coords:
+            return []
+        latlon = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        xs, ys = self.latlon_to_xy(latlon[:, 0], latlon[:, 1])
+        points = np.column_stack([np.broadcast_to(xs, len(latlon)),
+                                  np.broadcast_to(ys, len(latlon))])
+        nodes, _ = get_spatial_index(G).nearest_batch(points)
+        return nodes
 
     def nodes_to_edge_ids(self, G: nx.MultiDiGraph, node_path: List[str],
                           edge_id_to_info: Dict[str, Dict]) -> Tuple[List[str], List[List[Tuple]]]:
@@ -761,6 +761,8 @@ class NetDataProcessor:
                     edge_data = G[from_node][to_node][0]
                     edge_id = edge_data.get('edge_id')
                     geometry = edge_data.get('shape', [])
+                    if not geometry and 'compact' in G.graph:
+                        geometry = G.graph['compact'].edge_shape(from_node, to_node)
                     if edge_id:
                         edge_ids.append(edge_id)
                         edge_geometries.append(geometry)
@@ -790,6 +792,8 @@ class NetDataProcessor:
             try:
                 edge_data = G[from_node][to_node][0]
                 shape = edge_data.get('shape', [])
+                if not shape and 'compact' in G.graph:
+                    shape = G.graph['compact'].edge_shape(from_node, to_node)
 
                 if shape and len(shape) >= 2:
                     edge_geometries.append(shape)
@@ -804,6 +808,869 @@ class NetDataProcessor:
         return edge_geometries
 
 
+# ============================================================
+# 边属性数组（拥堵评分 / 适应度评估使用）
+# ============================================================
+
+class EdgeArrays:
+    """
+    按边下标对齐的连续边属性数组
+
+    每个相邻节点对 (u, v) 对应一个边下标 edge_idx，edge_index 提供
+    (u, v) -> edge_idx 的快速映射。长度取第一条平行边（与 G[u][v][0] 一致），
+    拥堵相关属性（highway/speed）取最后一条平行边（与逐边覆盖的字典结果一致）。
+    拥堵系数由 highway 类别和 speed 数组向量化计算。
+    """
+
+    # OSM highway 类型 → 拥堵系数（按顺序匹配，道路等级越高越拥堵）
+    HIGHWAY_CLASSES = (
+        (('motorway', 'trunk'), 0.9),
+        (('primary',), 0.7),
+        (('secondary',), 0.4),
+        (('tertiary', 'residential'), 0.2),
+        (('service', 'footway'), 0.1),
+    )
+    # 有highway但不属于以上类别
+    HIGHWAY_OTHER_SCORE = 0.5
+    # Net 模式 speed 阈值（米/秒，从高到低）及对应拥堵系数，最后一项为低于最小阈值时的系数
+    SPEED_THRESHOLDS = (25, 16, 10, 5)
+    SPEED_SCORES = (0.85, 0.65, 0.45, 0.25, 0.10)
+    # highway 和 speed 均缺失时的默认值
+    DEFAULT_SCORE = 0.5
+
+    def __init__(self, G: nx.MultiDiGraph):
+        """
+        遍历一次图的边，生成属性数组
+
+        Args:
+            G: 路网图
+        """
+        self.pairs = []
+        self.edge_index = {}
+        length, speed, highway_class = [], [], []
+        num_edges = 0
+
+        for u, v, data in G.edges(data=True):
+            num_edges += 1
+            idx = self.edge_index.get((u, v))
+            if idx is None:
+                idx = len(self.pairs)
+                self.edge_index[(u, v)] = idx
+                self.pairs.append((u, v))
+                edge_length = data.get('length')
+                length.append(float(edge_length) if edge_length is not None else np.nan)
+                speed.append(np.nan)
+                highway_class.append(-1)
+
+            edge_speed = data.get('speed')
+            speed[idx] = float(edge_speed) if edge_speed is not None else np.nan
+            highway_class[idx] = self._highway_class(data.get('highway'))
+
+        self.num_graph_edges = num_edges
+        self.length = np.array(length, dtype=np.float64)
+        self.speed = np.array(speed, dtype=np.float64)
+        self.highway_class = np.array(highway_class, dtype=np.int8)
+        self.congestion = self.compute_congestion()
+
+    @classmethod
+    def _highway_class(cls, highway) -> int:
+        """highway 属性 → 类别编号（-1 表示缺失，len(HIGHWAY_CLASSES) 表示其他）"""
+        if not highway:
+            return -1
+        for i, (names, _) in enumerate(cls.HIGHWAY_CLASSES):
+            if any(name in highway for name in names):
+                return i
+        return len(cls.HIGHWAY_CLASSES)
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def compute_congestion(self) -> np.ndarray:
+        """
+        向量化计算拥堵系数：优先按 highway 类别，其次按 speed 阈值，否则取默认值
+
+        Returns:
+            拥堵系数数组（按边下标对齐）
+        """
+        speed = self.speed
+        speed_score = np.select([speed >= t for t in self.SPEED_THRESHOLDS],
+                                self.SPEED_SCORES[:-1], default=self.SPEED_SCORES[-1])
+        speed_score = np.where(np.isnan(speed), self.DEFAULT_SCORE, speed_score)
+
+        highway_scores = np.array([score for _, score in self.HIGHWAY_CLASSES] + [self.HIGHWAY_OTHER_SCORE])
+        has_highway = self.highway_class >= 0
+        score = np.where(has_highway, highway_scores[np.maximum(self.highway_class, 0)], speed_score)
+        return np.clip(score, 0.0, 1.0)
+
+    def update_congestion(self) -> np.ndarray:
+        """重新计算并保存拥堵系数数组"""
+        self.congestion = self.compute_congestion()
+        return self.congestion
+
+    def congestion_dict(self) -> Dict[Tuple, float]:
+        """拥堵系数字典 {(u, v): score}"""
+        return dict(zip(self.pairs, self.congestion.tolist()))
+
+    def lookup(self, u, v) -> Optional[int]:
+        """(u, v) → 边下标，不存在时返回None"""
+        return self.edge_index.get((u, v))
+
+
+def get_edge_arrays(G: nx.MultiDiGraph) -> EdgeArrays:
+    """
+    获取路网的边属性数组（首次调用时构建并缓存到 G.graph['edge_arrays']）
+
+    Args:
+        G: 路网图
+
+    Returns:
+        EdgeArrays实例
+    """
+    edge_arrays = G.graph.get('edge_arrays')
+    if edge_arrays is None or edge_arrays.num_graph_edges != G.number_of_edges():
+        edge_arrays = EdgeArrays(G)
+        G.graph['edge_arrays'] = edge_arrays
+    return edge_arrays
+
+
+# ============================================================
+# 路网节点空间索引
+# ============================================================
+
+class SpatialIndex:
+    """
+    路网节点空间索引（R-tree）
+
+    按节点的 x/y 属性建立索引：Net模式下为投影XY坐标（米），
+    OSM模式下为经纬度（x=lon, y=lat）。查询点需使用相同坐标系。
+    每个路网只构建一次，缓存在 G.graph['spatial_index'] 上，
+    最近邻/k近邻查询为 O(log n)，批量查询一次调用完成。
+    """
+
+    def __init__(self, node_ids: List, node_xy: np.ndarray):
+        """
+        Args:
+            node_ids: 节点ID列表
+            node_xy: (N, 2) 节点坐标数组
+        """
+        self.node_ids = list(node_ids)
+        self.node_xy = np.asarray(node_xy, dtype=np.float64).reshape(-1, 2)
+
+        props = rtree_index.Property()
+        props.dimension = 2
+        if self.node_ids:
+            # 流式批量装载比逐个insert快得多
+            stream = ((i, (x, y, x, y), None)
+                      for i, (x, y) in enumerate(self.node_xy.tolist()))
+            self._tree = rtree_index.Index(stream, properties=props)
+        else:
+            self._tree = rtree_index.Index(properties=props)
+
+    @classmethod
+    def from_graph(cls, G: nx.MultiDiGraph) -> 'SpatialIndex':
+        """
+        从NetworkX图的节点 x/y 属性构建索引
+
+        Args:
+            G: 路网图
+
+        Returns:
+            SpatialIndex实例
+        """
+        node_ids = list(G.nodes())
+        node_xy = np.array([(float(G.nodes[n].get('x', 0)), float(G.nodes[n].get('y', 0)))
+                            for n in node_ids], dtype=np.float64).reshape(-1, 2)
+        return cls(node_ids, node_xy)
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    def query(self, points: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批量k近邻查询
+
+        Args:
+            points: (M, 2) 查询点坐标
+            k: 每个查询点返回的近邻数量
+
+        Returns:
+            (indices, distances)，形状均为 (M, k)，按距离升序；
+            indices 为节点在 node_ids 中的下标
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        k = min(int(k), len(self))
+        if k <= 0 or len(points) == 0:
+            return (np.empty((len(points), 0), dtype=np.int64),
+                    np.empty((len(points), 0), dtype=np.float64))
+
+        # strict=True：距离相同的候选也只返回k个
+        ids, counts = self._tree.nearest_v(points, points, num_results=k, strict=True)
+        if not np.all(counts == k):
+            raise RuntimeError(f"空间索引查询结果数量异常: 期望每点{k}个")
+        indices = ids.astype(np.int64).reshape(len(points), k)
+
+        diff = self.node_xy[indices] - points[:, None, :]
+        distances = np.hypot(diff[..., 0], diff[..., 1])
+        order = np.argsort(distances, axis=1, kind='stable')
+        return (np.take_along_axis(indices, order, axis=1),
+                np.take_along_axis(distances, order, axis=1))
+
+    def nearest(self, x: float, y: float) -> Tuple[Any, float]:
+        """
+        最近节点查询
+
+        Args:
+            x: 查询点X坐标
+            y: 查询点Y坐标
+
+        Returns:
+            (节点ID, 距离)；索引为空时返回 (None, inf)
+        """
+        if not self.node_ids:
+            return None, float('inf')
+        indices, distances = self.query([[x, y]], k=1)
+        return self.node_ids[indices[0, 0]], float(distances[0, 0])
+
+    def k_nearest(self, x: float, y: float, k: int) -> List[Tuple[Any, float]]:
+        """
+        k近邻节点查询
+
+        Args:
+            x: 查询点X坐标
+            y: 查询点Y坐标
+            k: 返回的节点数量
+
+        Returns:
+            [(节点ID, 距离), ...]，按距离升序
+        """
+        indices, distances = self.query([[x, y]], k=k)
+        return [(self.node_ids[i], float(d)) for i, d in zip(indices[0], distances[0])]
+
+    def nearest_batch(self, points: np.ndarray) -> Tuple[List, np.ndarray]:
+        """
+        批量最近节点查询
+
+        Args:
+            points: (M, 2) 查询点坐标
+
+        Returns:
+            (节点ID列表, 距离数组)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not self.node_ids:
+            return [None] * len(points), np.full(len(points), np.inf)
+        indices, distances = self.query(points, k=1)
+        return [self.node_ids[i] for i in indices[:, 0]], distances[:, 0]
+
+
+def get_spatial_index(G: nx.MultiDiGraph) -> SpatialIndex:
+    """
+    获取路网的空间索引（首次调用时构建并缓存到 G.graph['spatial_index']）
+
+    Args:
+        G: 路网图
+
+    Returns:
+        SpatialIndex实例
+    """
+    index = G.graph.get('spatial_index')
+    if index is None or len(index) != G.number_of_nodes():
+        index = SpatialIndex.from_graph(G)
+        G.graph['spatial_index'] = index
+    return index
+
+
+# ============================================================
+# 紧凑CSR路网表示（可选后端）
+# ============================================================
+
+class CompactGraph:
+    """
+    紧凑路网表示
+
+    节点映射为连续整数编号，邻接关系以CSR数组（indptr/indices）存储，
+    边的长度/速度/拥堵系数为float32数组，shape几何放在独立的侧表中
+    （扁平坐标数组 + 偏移量），不再为每条边保存Python坐标列表。
+
+    附加在 G.graph['compact'] 上时，模块级的 shortest_path 等函数会自动
+    使用 scipy.sparse.csgraph 的Dijkstra（C实现，直接运行在CSR数组上），调用方无需修改代码。
+    NetworkX图及其边属性仍然保留（只有shape列表移入侧表），紧凑表示是额外的查询结构，
+    主要作用是加速最短路径计算，而不是减少整体内存。
+    """
+
+    # 支持的权重类型
+    WEIGHTS = ('length', 'travel_time')
+
+    def __init__(self, node_ids: List, node_xy: np.ndarray,
+                 src: np.ndarray, dst: np.ndarray,
+                 length: np.ndarray, speed: np.ndarray,
+                 congestion: Optional[np.ndarray] = None,
+                 edge_ids: Optional[List[str]] = None,
+                 shapes: Optional[List[List[Tuple[float, float]]]] = None):
+        """
+        根据边列表构建CSR结构
+
+        Args:
+            node_ids: 原始节点ID列表（下标即整数编号）
+            node_xy: 节点坐标数组 (N, 2)
+            src: 边起点整数编号数组
+            dst: 边终点整数编号数组
+            length: 边长度数组（米）
+            speed: 边限速数组（米/秒）
+            congestion: 边拥堵系数数组（可选，默认0.5）
+            edge_ids: 边ID列表（可选）
+            shapes: 边shape坐标列表（可选，存入侧表）
+        """
+        self.node_ids = list(node_ids)
+        self.node_index = {node: i for i, node in enumerate(self.node_ids)}
+        self.node_xy = np.asarray(node_xy, dtype=np.float64).reshape(-1, 2)
+
+        num_nodes = len(self.node_ids)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+
+        # 按起点稳定排序，得到CSR顺序
+        order = np.argsort(src, kind='stable')
+        self.indices = dst[order].astype(np.int32)
+        self.src = src[order].astype(np.int32)
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=self.indptr[1:])
+
+        self.length = np.asarray(length, dtype=np.float32)[order]
+        self.speed = np.asarray(speed, dtype=np.float32)[order]
+        if congestion is None:
+            self.congestion = np.full(len(order), 0.5, dtype=np.float32)
+        else:
+            self.congestion = np.asarray(congestion, dtype=np.float32)[order]
+
+        self.edge_ids = [edge_ids[i] for i in order] if edge_ids is not None else None
+
+        # shape侧表：第 i 条边的坐标为 shape_coords[shape_offsets[i]:shape_offsets[i+1]]
+        self.shape_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+        if shapes is not None:
+            ordered = [shapes[i] or [] for i in order]
+            np.cumsum([len(s) for s in ordered], out=self.shape_offsets[1:])
+            flat = [pt for s in ordered for pt in s]
+            self.shape_coords = np.asarray(flat, dtype=np.float64).reshape(-1, 2)
+        else:
+            self.shape_coords = np.zeros((0, 2), dtype=np.float64)
+
+        # csgraph使用的稀疏邻接矩阵（按权重类型惰性生成）
+        self._matrices = {}
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @classmethod
+    def from_networkx(cls, G: nx.MultiDiGraph, congestion_scores: Optional[Dict] = None,
+                      geometry: bool = True) -> 'CompactGraph':
+        """
+        从NetworkX图构建紧凑表示
+
+        Args:
+            G: 路网图（节点需有 x/y 属性）
+            congestion_scores: 拥堵系数字典 {(u, v): score}（可选）
+            geometry: 是否保存边ID和shape侧表（只做最短路计算时可关闭，仅保留数值数组）
+
+        Returns:
+            CompactGraph
+        """
+        node_ids = list(G.nodes())
+        node_index = {node: i for i, node in enumerate(node_ids)}
+        node_xy = [(float(G.nodes[n].get('x', 0)), float(G.nodes[n].get('y', 0))) for n in node_ids]
+
+        src, dst, length, speed, congestion, edge_ids, shapes = [], [], [], [], [], [], []
+        for u, v, data in G.edges(data=True):
+            src.append(node_index[u])
+            dst.append(node_index[v])
+            # 与NetworkX的默认权重保持一致：缺失length时按1计
+            length.append(float(data.get('length', 1)))
+            speed.append(float(data.get('speed', 13.9)))
+            congestion.append(congestion_scores.get((u, v), 0.5) if congestion_scores else 0.5)
+            if geometry:
+                edge_ids.append(data.get('edge_id'))
+                shapes.append(data.get('shape'))
+
+        return cls(node_ids, node_xy, src, dst, length, speed, congestion=congestion,
+                   edge_ids=edge_ids if geometry else None, shapes=shapes if geometry else None)
+
+    def set_congestion(self, congestion_scores: Dict):
+        """按 {(u, v): score} 字典更新拥堵系数数组"""
+        node_ids = self.node_ids
+        self.congestion = np.array([
+            congestion_scores.get((node_ids[u], node_ids[v]), 0.5)
+            for u, v in zip(self.src.tolist(), self.indices.tolist())
+        ], dtype=np.float32)
+
+    def edge_shape(self, u, v) -> List[Tuple[float, float]]:
+        """获取 u→v 第一条边的shape坐标（来自侧表）"""
+        ui = self.node_index.get(u)
+        vi = self.node_index.get(v)
+        if ui is None or vi is None:
+            return []
+        for pos in range(self.indptr[ui], self.indptr[ui + 1]):
+            if self.indices[pos] == vi:
+                start, end = self.shape_offsets[pos], self.shape_offsets[pos + 1]
+                return [tuple(pt) for pt in self.shape_coords[start:end].tolist()]
+        return []
+
+    def _weights(self, weight: str) -> np.ndarray:
+        """获取权重数组"""
+        if weight == 'length':
+            return self.length
+        if weight == 'travel_time':
+            return self.length / np.maximum(self.speed, np.float32(0.1))
+        raise ValueError(f"不支持的权重类型: {weight}")
+
+    def csgraph(self, weight: str = 'length') -> csr_matrix:
+        """
+        scipy稀疏邻接矩阵（N x N），平行边只保留权重最小的一条
+
+        与CSR数组共用同一份边数据，只按权重类型缓存一次；权重为0的边保留为显式元素。
+        """
+        matrix = self._matrices.get(weight)
+        if matrix is None:
+            weights = self._weights(weight).astype(np.float64)
+            # 按 (起点, 终点, 权重) 排序，每个 (起点, 终点) 取第一条即最短的平行边
+            order = np.lexsort((weights, self.indices, self.src))
+            src, dst = self.src[order], self.indices[order]
+            keep = np.ones(len(order), dtype=bool)
+            keep[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+            matrix = csr_matrix((weights[order][keep], (src[keep], dst[keep])),
+                                shape=(self.num_nodes, self.num_nodes))
+            self._matrices[weight] = matrix
+        return matrix
+
+    def dijkstra(self, sources, weight: str = 'length',
+                 cutoff: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Dijkstra内核（整数节点编号，scipy.sparse.csgraph）
+
+        Args:
+            sources: 起点整数编号，或编号序列（一次计算多个源点）
+            weight: 权重类型
+            cutoff: 最大搜索距离（可选，超出的节点视为不可达）
+
+        Returns:
+            (距离数组, 前驱数组)：单个源点时shape为 (N,)，多个源点时为 (len(sources), N)；
+            不可达距离为inf，无前驱为-1
+        """
+        dist, pred = csgraph_dijkstra(self.csgraph(weight), directed=True, indices=sources,
+                                      return_predecessors=True,
+                                      limit=np.inf if cutoff is None else cutoff)
+        pred[pred < 0] = -1
+        return dist, pred
+
+    @staticmethod
+    def _trace_path(pred: np.ndarray, target: int) -> List[int]:
+        """沿前驱数组回溯路径（整数编号）"""
+        path = [target]
+        node = int(pred[target])
+        while node != -1:
+            path.append(node)
+            node = int(pred[node])
+        path.reverse()
+        return path
+
+    def shortest_path(self, source, target, weight: str = 'length') -> List:
+        """
+        计算两节点间最短路径（原始节点ID）
+
+        Raises:
+            nx.NodeNotFound: 节点不在图中
+            nx.NetworkXNoPath: 不可达
+        """
+        si, ti = self._index_of(source), self._index_of(target)
+        dist, pred = self.dijkstra(si, weight=weight)
+        if np.isinf(dist[ti]):
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return [self.node_ids[i] for i in self._trace_path(pred, ti)]
+
+    def shortest_path_length(self, source, target, weight: str = 'length') -> float:
+        """计算两节点间最短路径长度（原始节点ID），不可达时抛出 nx.NetworkXNoPath"""
+        si, ti = self._index_of(source), self._index_of(target)
+        dist, _ = self.dijkstra(si, weight=weight)
+        if np.isinf(dist[ti]):
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return float(dist[ti])
+
+    def single_source_path_length(self, source, weight: str = 'length') -> Dict:
+        """计算单源最短路径长度字典 {节点ID: 距离}"""
+        dist, _ = self.dijkstra(self._index_of(source), weight=weight)
+        node_ids = self.node_ids
+        reached = np.flatnonzero(np.isfinite(dist))
+        return {node_ids[i]: d for i, d in zip(reached.tolist(), dist[reached].tolist())}
+
+    def _index_of(self, node) -> int:
+        index = self.node_index.get(node)
+        if index is None:
+            raise nx.NodeNotFound(f"Node {node} not found in graph")
+        return index
+
+
+def _compact_for(G, weight) -> Optional[CompactGraph]:
+    """如果图上附加了紧凑表示且支持该权重，返回它"""
+    compact = getattr(G, 'graph', {}).get('compact')
+    if compact is not None and weight in CompactGraph.WEIGHTS:
+        return compact
+    return None
+
+
+def shortest_path(G: nx.MultiDiGraph, source, target, weight: str = 'length') -> List:
+    """最短路径：图上附加了 CompactGraph 时使用scipy csgraph内核，否则使用NetworkX"""
+    compact = _compact_for(G, weight)
+    if compact is not None:
+        return compact.shortest_path(source, target, weight=weight)
+    return nx.shortest_path(G, source, target, weight=weight)
+
+
+def shortest_path_length(G: nx.MultiDiGraph, source, target, weight: str = 'length') -> float:
+    """最短路径长度：图上附加了 CompactGraph 时使用scipy csgraph内核，否则使用NetworkX"""
+    compact = _compact_for(G, weight)
+    if compact is not None:
+        return compact.shortest_path_length(source, target, weight=weight)
+    return nx.shortest_path_length(G, source, target, weight=weight)
+
+
+def single_source_dijkstra_path_length(G: nx.MultiDiGraph, source, weight: str = 'length') -> Dict:
+    """单源最短路径长度：图上附加了 CompactGraph 时使用scipy csgraph内核，否则使用NetworkX"""
+    compact = _compact_for(G, weight)
+    if compact is not None:
+        return compact.single_source_path_length(source, weight=weight)
+    return nx.single_source_dijkstra_path_length(G, source, weight=weight)
+
+
+# ============================================================
+# 途经点最短路服务（有界csgraph Dijkstra + 距离/前驱缓存）
+# ============================================================
+
+def _bounded_dijkstra(matrix: csr_matrix, sources, targets, limit: float, max_limit: float,
+                      predecessors: bool = False) -> Tuple[np.ndarray, Optional[np.ndarray], float]:
+    """
+    有界Dijkstra：以 limit 截断csgraph搜索，目标点未全部确定时把 limit 扩大一倍重新搜索
+
+    截断半径内的节点距离和前驱都是精确的；limit 超过全部边权之和后不再截断，
+    此时仍为inf的目标点确实不可达。
+
+    Args:
+        matrix: 稀疏邻接矩阵
+        sources: 源点整数编号（单个或序列）
+        targets: 目标点整数编号数组
+        limit: 初始搜索半径
+        max_limit: 不再截断的半径上限（全部边权之和）
+        predecessors: 是否返回前驱数组
+
+    Returns:
+        (距离数组, 前驱数组或None, 最终搜索半径)
+    """
+    while True:
+        if limit >= max_limit:
+            limit = np.inf
+        result = csgraph_dijkstra(matrix, directed=True, indices=sources,
+                                  return_predecessors=predecessors, limit=limit)
+        dist, pred = result if predecessors else (result, None)
+        if np.isinf(limit) or np.isfinite(dist[..., targets]).all():
+            return dist, pred, limit
+        limit *= 2
+
+
+def _target_distance_worker(task: Tuple[List[int], float]) -> np.ndarray:
+    """进程池任务：一批源点到目标点的最短距离（稀疏矩阵和目标点由fork继承，只返回目标列）"""
+    sources, limit = task
+    matrix, target_idx, max_limit = worker_context()
+    dist, _, _ = _bounded_dijkstra(matrix, sources, target_idx, limit, max_limit)
+    return dist[:, target_idx]
+
+
+class WaypointPathService:
+    """
+    途经点间最短距离/路径服务
+
+    距离由 scipy.sparse.csgraph 按源点批量计算，搜索以半径截断：初始半径由源点到目标点的
+    直线距离估计，目标点未全部确定时半径加倍，因此只展开覆盖所有途经点的邻域，
+    不遍历整个路网；只保留到目标点的距离。
+    需要路径时再对该源点做一次同样有界的搜索并缓存前驱数组（按最近使用淘汰），
+    同一源点在搜索半径内的其他路径直接沿前驱回溯。
+    OR-Tools距离矩阵、缺失途经点插入和遗传算法的 create_individual
+    共用同一个实例（通过 get_path_service 缓存在 G.graph 上）。
+    """
+
+    # 缓存的源点前驱/距离数组数量上限（每个约 12 字节 x 节点数，按最近使用淘汰）
+    MAX_CACHED_SOURCES = 64
+    # 批量计算距离时每次Dijkstra调用的源点数（限制 源点数 x 节点数 的临时距离矩阵）
+    BATCH_SOURCES = 32
+
+    def __init__(self, G: nx.MultiDiGraph, weight: str = 'length',
+                 max_cached_sources: int = MAX_CACHED_SOURCES):
+        """
+        Args:
+            G: 路网图（附加了 CompactGraph 时直接复用；否则只构建不含几何的数值CSR数组）
+            weight: 权重类型（'length' 或 'travel_time'）
+            max_cached_sources: 缓存的源点前驱/距离数组数量上限
+        """
+        compact = _compact_for(G, weight)
+        if compact is None:
+            compact = CompactGraph.from_networkx(G, geometry=False)
+        self.compact = compact
+        self.weight = weight
+        self.max_cached_sources = max_cached_sources
+        self._matrix = compact.csgraph(weight)
+        self._trees = OrderedDict()   # 源点 -> (距离数组, 前驱数组, 搜索半径)
+        self._distances = {}          # 源点 -> {目标点: 距离}，不可达为inf
+
+        # 初始搜索半径 = 直线距离 x 每单位坐标距离的典型权重（按各边 权重/端点直线距离 的中位数估计，
+        # 与坐标系是米还是经纬度无关）；估计偏小时由 _bounded_dijkstra 加倍，超过全部边权之和时不截断
+        weights = compact._weights(weight).astype(np.float64)
+        span = np.linalg.norm(compact.node_xy[compact.src] - compact.node_xy[compact.indices], axis=1)
+        positive = span > 0
+        self._weight_per_unit = float(np.median(weights[positive] / span[positive])) if positive.any() else 0.0
+        self._min_limit = float(weights.max()) if len(weights) else 0.0
+        self._max_limit = float(weights.sum())
+
+        # 统计信息
+        self.searches = 0
+        self.cache_hits = 0
+
+    def _initial_limit(self, sources, targets) -> float:
+        """源点集合到目标点集合的初始搜索半径（最远直线距离换算成权重，略放大以减少加倍重搜）"""
+        xy = self.compact.node_xy
+        src_xy = xy[np.atleast_1d(sources)]
+        dst_xy = xy[np.atleast_1d(targets)]
+        gap = np.sqrt(((src_xy[:, None, :] - dst_xy[None, :, :]) ** 2).sum(axis=-1)).max()
+        return max(1.25 * float(gap) * self._weight_per_unit, self._min_limit)
+
+    def _tree(self, source: int, target: int) -> Tuple[np.ndarray, np.ndarray]:
+        """获取覆盖 target 的源点距离和前驱数组（已缓存的搜索半径不够时重新搜索），并维护LRU顺序"""
+        tree = self._trees.get(source)
+        if tree is not None and (np.isfinite(tree[0][target]) or np.isinf(tree[2])):
+            self._trees.move_to_end(source)
+            self.cache_hits += 1
+            return tree[0], tree[1]
+
+        targets = np.array([target], dtype=np.int64)
+        dist, pred, limit = _bounded_dijkstra(self._matrix, source, targets,
+                                              self._initial_limit(source, targets),
+                                              self._max_limit, predecessors=True)
+        pred[pred < 0] = -1
+        self._trees[source] = (dist, pred.astype(np.int32), limit)
+        self._trees.move_to_end(source)
+        self.searches += 1
+        if len(self._trees) > self.max_cached_sources:
+            self._trees.popitem(last=False)
+        return self._trees[source][0], self._trees[source][1]
+
+    def _distance(self, source: int, target: int) -> float:
+        """源点到目标点的距离（整数编号，不可达为inf）"""
+        known = self._distances.setdefault(source, {})
+        d = known.get(target)
+        if d is not None:
+            self.cache_hits += 1
+            return d
+        d = float(self._tree(source, target)[0][target])
+        known[target] = d
+        return d
+
+    def precompute(self, sources: List, targets: List, workers: int = 1):
+        """
+        批量计算多个源点到目标点集合的距离（有界搜索，只保存目标点的距离，不保存前驱数组）
+
+        Args:
+            sources: 源点ID列表
+            targets: 目标点ID列表
+            workers: 并行进程数（>1 且系统支持fork时各批源点分发到进程池）
+        """
+        compact = self.compact
+        target_idx = np.array([compact._index_of(t) for t in targets], dtype=np.int64)
+        missing = [s for s in dict.fromkeys(compact._index_of(s) for s in sources)
+                   if not all(t in self._distances.get(s, ()) for t in target_idx.tolist())]
+        if not missing:
+            return
+
+        batches = [missing[i:i + self.BATCH_SOURCES] for i in range(0, len(missing), self.BATCH_SOURCES)]
+        tasks = [(batch, self._initial_limit(batch, target_idx)) for batch in batches]
+        results = fork_map(_target_distance_worker, tasks, workers=workers, chunksize=1,
+                           context=(self._matrix, target_idx, self._max_limit))
+        targets_list = target_idx.tolist()
+        for batch, dist in zip(batches, results):
+            for s, row in zip(batch, dist.tolist()):
+                self._distances.setdefault(s, {}).update(zip(targets_list, row))
+        self.searches += len(missing)
+
+    def distance(self, source, target) -> float:
+        """
+        最短路径长度
+
+        Raises:
+            nx.NodeNotFound: 节点不在图中
+            nx.NetworkXNoPath: 不可达
+        """
+        d = self._distance(self.compact._index_of(source), self.compact._index_of(target))
+        if np.isinf(d):
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return d
+
+    def path(self, source, target) -> List:
+        """
+        最短路径节点列表（沿缓存的前驱数组回溯，搜索半径不覆盖目标时重新做有界搜索）
+
+        Raises:
+            nx.NodeNotFound: 节点不在图中
+            nx.NetworkXNoPath: 不可达
+        """
+        si, ti = self.compact._index_of(source), self.compact._index_of(target)
+        dist, pred = self._tree(si, ti)
+        if np.isinf(dist[ti]):
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        node_ids = self.compact.node_ids
+        return [node_ids[i] for i in CompactGraph._trace_path(pred, ti)]
+
+    def distance_matrix(self, nodes: List, workers: int = 1) -> np.ndarray:
+        """
+        节点两两之间的最短距离矩阵
+
+        Args:
+            nodes: 节点ID列表
+            workers: 并行进程数
+
+        Returns:
+            (n, n) 距离矩阵，不可达为 inf
+        """
+        self.precompute(nodes, nodes, workers=workers)
+        node_index = [self.compact._index_of(n) for n in nodes]
+        return np.array([[self._distances[si][ti] for ti in node_index] for si in node_index],
+                        dtype=np.float64).reshape(len(nodes), len(nodes))
+
+    def stats(self) -> Dict[str, int]:
+        """缓存统计"""
+        return {'searches': self.searches, 'cache_hits': self.cache_hits,
+                'cached_sources': len(self._trees)}
+
+
+def get_path_service(G: nx.MultiDiGraph, weight: str = 'length') -> WaypointPathService:
+    """
+    获取路网的途经点最短路服务（首次调用时创建并缓存到 G.graph['path_service']）
+
+    Args:
+        G: 路网图
+        weight: 权重类型
+
+    Returns:
+        WaypointPathService实例
+    """
+    services = G.graph.setdefault('path_service', {})
+    service = services.get(weight)
+    if service is None:
+        service = WaypointPathService(G, weight=weight)
+        services[weight] = service
+    return service
+
+
+class SegmentPathCache:
+    """
+    途经点间路径段的LRU缓存
+
+    以 (起点, 终点, 权重类型) 为键缓存最短路径节点序列（不可达结果也缓存），
+    同时限制条目数和缓存的节点总数，超出时淘汰最久未使用的条目。
+    未命中时由 WaypointPathService 计算。
+    """
+
+    # 默认上限：条目数 / 缓存节点总数（约等于内存占用）
+    MAX_ENTRIES = 50000
+    MAX_NODES = 5000000
+
+    def __init__(self, G: nx.MultiDiGraph, max_entries: int = MAX_ENTRIES, max_nodes: int = MAX_NODES):
+        """
+        Args:
+            G: 路网图
+            max_entries: 最大条目数
+            max_nodes: 缓存路径的节点总数上限
+        """
+        self.G = G
+        self.max_entries = max_entries
+        self.max_nodes = max_nodes
+        self._entries = OrderedDict()
+        self._num_nodes = 0
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, source, target, weight: str = 'length') -> List:
+        """
+        获取路径段（返回新列表，调用方可直接修改）
+
+        Raises:
+            nx.NodeNotFound: 节点不在图中
+            nx.NetworkXNoPath: 不可达
+        """
+        key = (source, target, weight)
+        entry = self._entries.get(key)
+        if entry is not None or key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            try:
+                entry = tuple(get_path_service(self.G, weight).path(source, target))
+            except nx.NetworkXNoPath:
+                entry = None
+            self._store(key, entry)
+
+        if entry is None:
+            raise nx.NetworkXNoPath(f"Node {target} not reachable from {source}")
+        return list(entry)
+
+    def _store(self, key: Tuple, entry: Optional[Tuple]):
+        """写入条目并按上限淘汰最久未使用的条目"""
+        self._entries[key] = entry
+        self._num_nodes += len(entry) if entry else 0
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries
+                                          or self._num_nodes > self.max_nodes):
+            _, old = self._entries.popitem(last=False)
+            self._num_nodes -= len(old) if old else 0
+            self.evictions += 1
+
+    def clear(self):
+        """清空缓存（统计信息保留）"""
+        self._entries.clear()
+        self._num_nodes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self._entries),
+            'cached_nodes': self._num_nodes
+        }
+
+
+def get_segment_cache(G: nx.MultiDiGraph) -> SegmentPathCache:
+    """
+    获取路网的路径段缓存（首次调用时创建并缓存到 G.graph['segment_cache']）
+
+    Args:
+        G: 路网图
+
+    Returns:
+        SegmentPathCache实例
+    """
+    cache = G.graph.get('segment_cache')
+    if cache is None:
+        cache = SegmentPathCache(G)
+        G.graph['segment_cache'] = cache
+    return cache
+
+
 # ============================================================
 # 路径评估指标计算函数
 # ============================================================
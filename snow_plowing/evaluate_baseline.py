@@ -4,13 +4,21 @@ Baseline扫雪策略SUMO评测脚本
 评测所有道路0时刻就清扫完成的baseline场景
 """
 
+import os
+import sys
 import json
-import traci
 import matplotlib.pyplot as plt
 import numpy as np
 from collections import defaultdict
 from pathlib import Path
 
+# 仓库根目录（共享的仿真后端模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.sim_backend import traci, select_backend
+
 
 def load_config(config_path='config.json'):
     """加载配置文件"""
@@ -191,6 +199,9 @@ if __name__ == "__main__":
     
     CLEANED_PARAMS = config['road_parameters']['cleaned']
     UNCLEAN_PARAMS = config['road_parameters']['unclean']
+
+    # 仿真后端（traci/libsumo），未配置时读取环境变量 SUMO_BACKEND
+    select_backend(config['sumo_config'].get('backend'))
     
     OUTPUT_DIR = Path(config['output']['base_dir'])
     OUTPUT_DIR.mkdir(exist_ok=True)
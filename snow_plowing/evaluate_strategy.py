@@ -3,19 +3,36 @@
 基于策略生成的时间步记录，在SUMO环境中评测不同时间点的交通指标
 """
 
+import os
+import sys
 import json
-import traci
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
 from collections import defaultdict
 
 
+# 仓库根目录（共享的仿真后端模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.sim_backend import select_backend
+from snow_simulation import SNOW_MODES, run_snow_hours, save_warmup_state
+
+
 class SnowplowStrategyEvaluator:
     """扫雪策略评估器"""
     
-    def __init__(self, config_path='config.json'):
-        """初始化评估器"""
+    def __init__(self, config_path='config.json', snow_mode=None, workers=None):
+        """
+        初始化评估器
+
+        Args:
+            config_path: 配置文件路径
+            snow_mode: 积雪模拟方式 vehicle/network，None时读取配置（默认vehicle）
+            workers: 并行仿真进程数，None时读取配置（默认1，串行）
+        """
         print("="*80)
         print("扫雪策略SUMO评估器".center(80))
         print("="*80)
@@ -39,6 +56,22 @@ class SnowplowStrategyEvaluator:
         # 道路参数
         self.cleaned_params = self.config['road_parameters']['cleaned']
         self.unclean_params = self.config['road_parameters']['unclean']
+
+        # 积雪模拟方式：vehicle逐车设置参数，network生成各时刻的路网变体
+        self.snow_mode = snow_mode or self.config['sumo_config'].get('snow_mode', 'vehicle')
+        if self.snow_mode not in SNOW_MODES:
+            raise ValueError(f"未知的积雪模拟方式: {self.snow_mode}（可选: {', '.join(SNOW_MODES)}）")
+        self.net_file = self.config['network']['net_file']
+        self.snow_net_dir = Path(self.config['output']['base_dir']) / "snow_nets"
+
+        # 并行仿真进程数：每个评估时刻一个SUMO实例
+        self.workers = workers or self.config['sumo_config'].get('workers', 1)
+
+        # 预热步数：所有场景共享的预热段只仿真一次，保存状态后各场景从该状态开始
+        self.warmup_steps = self.config['sumo_config'].get('warmup_steps', 0)
+
+        # 仿真后端（traci/libsumo），未配置时读取环境变量 SUMO_BACKEND
+        select_backend(self.config['sumo_config'].get('backend'))
         
         # 记录文件
         records_file = Path(self.config['output']['base_dir']) / self.config['output']['strategy_record']
@@ -47,6 +80,9 @@ class SnowplowStrategyEvaluator:
         print(f"配置文件: {self.sumo_config}")
         print(f"仿真步数: {self.simulation_steps}")
         print(f"评估时间点: {self.evaluation_hours}")
+        print(f"积雪模拟方式: {self.snow_mode}")
+        print(f"并行进程数: {self.workers}")
+        print(f"预热步数: {self.warmup_steps}")
     
     def load_time_step_records(self, json_path):
         """加载时间步清扫记录"""
@@ -82,75 +118,67 @@ class SnowplowStrategyEvaluator:
         print("\n开始SUMO评估...")
         print("-"*80)
         
-        results = {}
+        # 共享预热段（warmup_steps > 0 时）
+        state_file = None
+        if self.warmup_steps > 0:
+            output_dir = Path(self.config['output']['base_dir'])
+            output_dir.mkdir(parents=True, exist_ok=True)
+            state_file = save_warmup_state(self.sumo_config, self.warmup_steps,
+                                           output_dir / "snow_warmup_state.xml")
+        
+        tasks = []
+        scenarios = {}
         
         for hour in self.evaluation_hours:
-            print(f"\n{'='*60}")
-            print(f"评估第 {hour} 小时的场景...")
-            print(f"{'='*60}")
-            
             # 获取该时间点已清扫的道路
             time_minutes = hour * 60
             cleaned_edges = self.get_cleaned_edges_at_time(time_minutes)
-            print(f"已清扫道路数量: {len(cleaned_edges)}")
-            
-            # 启动SUMO
-            traci.start(["sumo", "-c", self.sumo_config, "--start",
-                        "--no-warnings", "true"])
+            print(f"第 {hour} 小时: 已清扫道路数量 {len(cleaned_edges)}")
             
-            # 运行仿真
-            for step in range(self.simulation_steps):
-                traci.simulationStep()
-                
-                current_vehicles = traci.vehicle.getIDList()
-                
-                # 为每辆车设置参数
-                for veh_id in current_vehicles:
-                    current_edge = traci.vehicle.getRoadID(veh_id)
-                    
-                    # 根据道路是否已清扫设置参数
-                    if current_edge in cleaned_edges:
-                        params = self.cleaned_params
-                    else:
-                        params = self.unclean_params
-                    
-                    traci.vehicle.setAcceleration(veh_id, params["accel"], 1)
-                    traci.vehicle.setDecel(veh_id, params["decel"])
-                    traci.vehicle.setMaxSpeed(veh_id, params["max_speed"])
-                    traci.vehicle.setMinGap(veh_id, params["min_gap"])
-                
-                # 每50步打印进度
-                if (step + 1) % 50 == 0:
-                    print(f"  仿真进度: {step + 1}/{self.simulation_steps} 步, "
-                          f"当前车辆数: {len(current_vehicles)}")
-            
-            # 统计最终结果
-            current_vehicles = traci.vehicle.getIDList()
-            num_vehicles = len(current_vehicles)
-            
-            if num_vehicles > 0:
-                total_speed = sum(traci.vehicle.getSpeed(veh) for veh in current_vehicles)
-                global_avg_speed = total_speed / num_vehicles
-            else:
-                global_avg_speed = 0
+            scenarios[hour] = len(cleaned_edges)
+            # vehicle: 订阅式仿真，只在车辆进出已清扫道路时重新设置参数
+            # network: 在积雪路网变体上仿真，无逐步控制调用
+            tasks.append((hour, {
+                "sumo_config": self.sumo_config,
+                "cleaned_edges": cleaned_edges,
+                "cleaned_params": self.cleaned_params,
+                "unclean_params": self.unclean_params,
+                "simulation_steps": self.simulation_steps,
+                "snow_mode": self.snow_mode,
+                "net_file": self.net_file,
+                "snow_net_file": self.snow_net_dir / f"net_h{hour}.net.xml",
+                "label": f"[第{hour}小时] ",
+                "state_file": state_file
+            }))
+        
+        if self.snow_mode == "network":
+            self.snow_net_dir.mkdir(parents=True, exist_ok=True)
+        # 各时刻相互独立，workers > 1 时并行运行
+        sim_results = run_snow_hours(tasks, workers=self.workers)
+        
+        results = {}
+        for hour, num_cleaned_edges in scenarios.items():
+            sim_result = sim_results[hour]
+            num_vehicles = sim_result["num_vehicles"]
+            global_avg_speed = sim_result["global_avg_speed_ms"]
             
-            print(f"\n  仿真完成 - 第{self.simulation_steps}步统计:")
+            print(f"\n  第{hour}小时 仿真完成 - 第{self.simulation_steps}步统计:")
             print(f"    车辆数: {num_vehicles}")
             print(f"    全局平均速度: {global_avg_speed:.2f} m/s "
                   f"({global_avg_speed * 3.6:.2f} km/h)")
-            
-            # 关闭SUMO
-            traci.close()
+            print(f"    车辆参数设置次数: {sim_result['param_updates']}")
             
             # 保存结果
             results[f"hour_{hour}"] = {
                 "time_hours": hour,
-                "time_minutes": time_minutes,
-                "num_cleaned_edges": len(cleaned_edges),
+                "time_minutes": hour * 60,
+                "num_cleaned_edges": num_cleaned_edges,
                 "simulation_steps": self.simulation_steps,
                 "num_vehicles": num_vehicles,
                 "global_avg_speed_ms": global_avg_speed,
-                "global_avg_speed_kmh": global_avg_speed * 3.6
+                "global_avg_speed_kmh": global_avg_speed * 3.6,
+                "snow_mode": self.snow_mode,
+                "param_updates": sim_result["param_updates"]
             }
         
         return results
@@ -247,9 +275,14 @@ def main():
     parser = argparse.ArgumentParser(description='扫雪策略SUMO评估器')
     parser.add_argument('-c', '--config', default='config.json',
                        help='配置文件路径 (默认: config.json)')
+    parser.add_argument('--snow-mode', choices=SNOW_MODES, default=None,
+                       help='积雪模拟方式: vehicle逐车设置参数, network生成路网变体 (默认: 配置文件)')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='并行仿真进程数，每个评估时刻一个SUMO实例 (默认: 配置文件, 1)')
     args = parser.parse_args()
     
-    evaluator = SnowplowStrategyEvaluator(args.config)
+    evaluator = SnowplowStrategyEvaluator(args.config, snow_mode=args.snow_mode,
+                                          workers=args.workers)
     evaluator.run()
 
 
@@ -41,6 +41,8 @@ def main():
                        help='策略名称 (默认: greedy)')
     parser.add_argument('--seed', type=int, default=None,
                        help='随机种子（仅用于random策略）')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='评估时的并行仿真进程数 (默认: 配置文件)')
     
     # 操作模式
     parser.add_argument('--full', action='store_true',
@@ -104,7 +106,7 @@ def main():
             return
         
         from evaluate_strategies import StrategyEvaluator
-        evaluator = StrategyEvaluator(args.config)
+        evaluator = StrategyEvaluator(args.config, workers=args.workers)
         evaluator.run(strategy_name=args.strategy)
     
     # 对比策略
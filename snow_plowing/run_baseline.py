@@ -18,7 +18,12 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("请设置SUMO_HOME环境变量")
 
-import traci
+# 仓库根目录（共享的仿真后端模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.sim_backend import traci, select_backend
 
 
 def load_config(config_path='config.json'):
@@ -52,6 +57,9 @@ def evaluate_baseline(config, output_dir=None):
     
     output_dir.mkdir(parents=True, exist_ok=True)
     print(f"\n输出目录: {output_dir}")
+
+    # 仿真后端（traci/libsumo），未配置时读取环境变量 SUMO_BACKEND
+    select_backend(config['sumo_config'].get('backend'))
     
     print(f"\n策略信息:")
     print(f"  场景: 无积雪（所有道路已清扫）")
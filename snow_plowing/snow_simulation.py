@@ -0,0 +1,340 @@
+"""
+积雪场景SUMO仿真
+两种积雪模拟方式:
+- vehicle: 基于订阅的评估循环，车辆出发时订阅所在道路和速度，
+           只在车辆在已清扫/未清扫道路之间切换时重新设置车辆参数
+- network: 按小时生成路网变体，未清扫道路的车道限速改为积雪参数，
+           仿真过程中没有任何TraCI控制调用
+"""
+
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+# 仓库根目录（共享的仿真后端模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.sim_backend import traci
+from common.parallel import effective_workers, fork_map
+
+# 积雪模拟方式
+SNOW_MODES = ("vehicle", "network")
+
+
+def apply_road_params(veh_id, params, accel_duration):
+    """
+    设置车辆在当前道路状态下的驾驶参数（只需在道路状态变化时设置）
+
+    加速度沿用原评估循环的 setAcceleration 语义：原来每步调用 setAcceleration(veh, accel, 1)，
+    这里在道路状态变化时调用一次，持续时间覆盖剩余仿真时长；车辆进出已清扫道路时
+    再次调用会覆盖上一次的设置，效果与逐步设置相同。
+
+    Args:
+        veh_id: 车辆ID
+        params: 道路参数 {"accel", "decel", "max_speed", "min_gap"}
+        accel_duration: 加速度设置的持续时间（秒），取剩余仿真时长
+    """
+    traci.vehicle.setAcceleration(veh_id, params["accel"], accel_duration)
+    traci.vehicle.setDecel(veh_id, params["decel"])
+    traci.vehicle.setMaxSpeed(veh_id, params["max_speed"])
+    traci.vehicle.setMinGap(veh_id, params["min_gap"])
+
+
+def _load_state_args(state_file):
+    """从预热状态启动SUMO的命令行参数"""
+    if state_file is None:
+        return []
+    return ["--load-state", str(state_file)]
+
+
+def save_warmup_state(sumo_config, warmup_steps, state_file):
+    """
+    运行共享的预热段并保存SUMO状态
+
+    各评估时刻的预热段完全相同（不施加积雪参数），只仿真一次，
+    之后每个场景通过 --load-state 从该状态开始。
+
+    Args:
+        sumo_config: SUMO配置文件
+        warmup_steps: 预热步数
+        state_file: 状态文件输出路径
+
+    Returns:
+        str: 状态文件路径
+    """
+    traci.start(["sumo", "-c", sumo_config, "--no-warnings", "true",
+                 "--save-state.rng", "true"])
+
+    for _ in range(warmup_steps):
+        traci.simulationStep()
+
+    traci.simulation.saveState(str(state_file))
+    traci.close()
+
+    print(f"预热状态已保存: {warmup_steps} 步 -> {state_file}")
+    return str(state_file)
+
+
+def run_snow_scenario(sumo_config, cleaned_edges, cleaned_params, unclean_params,
+                      simulation_steps, progress_interval=50, label="", state_file=None):
+    """
+    运行一个积雪场景的仿真
+
+    每步只有一次 simulationStep 和一次批量订阅结果读取；新出发的车辆订阅
+    VAR_ROAD_ID/VAR_SPEED，车辆参数只在道路状态（已清扫/未清扫）变化时设置
+    （加速度以覆盖剩余仿真时长的 setAcceleration 设置，见 apply_road_params()），
+    每步的TraCI调用量由 O(车辆数) 降为 O(道路状态切换数)。
+
+    Args:
+        sumo_config: SUMO配置文件
+        cleaned_edges: 已清扫道路集合
+        cleaned_params: 已清扫道路的车辆参数
+        unclean_params: 未清扫道路的车辆参数
+        simulation_steps: 仿真步数
+        progress_interval: 进度打印间隔（步）
+        label: 进度输出前缀（并行评估时区分场景）
+        state_file: 预热状态文件（save_warmup_state()生成），从该状态开始仿真
+
+    Returns:
+        dict: num_vehicles / global_avg_speed_ms（最后一步统计）和 param_updates（参数设置次数）
+    """
+    tc = traci.constants
+    vehicle_vars = [tc.VAR_ROAD_ID, tc.VAR_SPEED]
+
+    traci.start(["sumo", "-c", sumo_config, "--start",
+                "--no-warnings", "true"] + _load_state_args(state_file))
+    traci.simulation.subscribe([tc.VAR_DEPARTED_VEHICLES_IDS])
+    step_length = traci.simulation.getDeltaT()
+
+    # 从预热状态开始时，路网中已有的车辆不会再出现在出发列表中
+    for veh_id in traci.vehicle.getIDList():
+        traci.vehicle.subscribe(veh_id, vehicle_vars)
+
+    road_state = {}  # 车辆ID -> 当前是否在已清扫道路上
+    param_updates = 0
+    vehicles = {}
+
+    for step in range(simulation_steps):
+        traci.simulationStep()
+
+        # 新出发的车辆：订阅所在道路和速度
+        for veh_id in traci.simulation.getSubscriptionResults()[tc.VAR_DEPARTED_VEHICLES_IDS]:
+            traci.vehicle.subscribe(veh_id, vehicle_vars)
+
+        vehicles = traci.vehicle.getAllSubscriptionResults()
+
+        remaining_time = (simulation_steps - step) * step_length
+        for veh_id, values in vehicles.items():
+            cleaned = values[tc.VAR_ROAD_ID] in cleaned_edges
+            if road_state.get(veh_id) is not cleaned:
+                road_state[veh_id] = cleaned
+                apply_road_params(veh_id, cleaned_params if cleaned else unclean_params, remaining_time)
+                param_updates += 1
+
+        # 清理已到达车辆的状态
+        if len(road_state) > 2 * len(vehicles) + 1000:
+            road_state = {veh_id: road_state[veh_id] for veh_id in vehicles if veh_id in road_state}
+
+        if (step + 1) % progress_interval == 0:
+            print(f"  {label}仿真进度: {step + 1}/{simulation_steps} 步, "
+                  f"当前车辆数: {len(vehicles)}, 累计参数设置: {param_updates}")
+
+    speeds = [values[tc.VAR_SPEED] for values in vehicles.values()]
+    num_vehicles = len(speeds)
+    global_avg_speed = sum(speeds) / num_vehicles if num_vehicles > 0 else 0
+
+    traci.close()
+
+    return {
+        "num_vehicles": num_vehicles,
+        "global_avg_speed_ms": global_avg_speed,
+        "param_updates": param_updates
+    }
+
+
+def write_snow_network(original_net_file, output_net_file, cleaned_edges,
+                       cleaned_params, unclean_params):
+    """
+    生成某一时刻的积雪路网变体
+    参考run_baseline.modify_network_for_baseline()，按道路清扫状态改写车道限速
+
+    车道限速取 min(原限速, 对应道路参数的max_speed)，与vehicle模式下
+    setMaxSpeed对车辆速度的上限作用一致。SUMO的车道只有限速属性，
+    accel/decel/min_gap 无法按道路设置，network模式下这三项不生效。
+
+    与 common/net_cache 相同，用 iterparse 单次遍历原始路网，每个 <net> 的直接子元素
+    改写后立即写出并释放，峰值内存不随路网大小增长为整棵DOM。
+
+    Args:
+        original_net_file: 原始路网文件
+        output_net_file: 输出路网文件
+        cleaned_edges: 已清扫道路集合
+        cleaned_params: 已清扫道路的车辆参数
+        unclean_params: 未清扫道路的车辆参数
+
+    Returns:
+        int: 设为积雪限速的道路数量
+    """
+    num_unclean = 0
+    tmp_file = f"{output_net_file}.tmp"
+    with open(tmp_file, "w", encoding="utf-8") as out:
+        out.write("<?xml version='1.0' encoding='utf-8'?>\n")
+
+        # 流式改写：<net> 的直接子元素读完即改写，攒够一批后一次序列化写出并释放
+        batch = ET.Element('batch')
+
+        def flush(last=False):
+            if len(batch):
+                if last:
+                    batch[-1].tail = "\n"
+                text = ET.tostring(batch, encoding='unicode')
+                out.write(text[len("<batch>"):-len("</batch>")])
+                batch.clear()
+
+        root = None
+        depth = 0
+        for event, elem in ET.iterparse(original_net_file, events=('start', 'end')):
+            if event == 'start':
+                if root is None:
+                    root = elem
+                    start_tag = ET.tostring(ET.Element(elem.tag, dict(elem.attrib)),
+                                            encoding='unicode', short_empty_elements=False)
+                    out.write(start_tag[:-len(f"</{elem.tag}>")] + "\n    ")
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth != 1:
+                continue
+
+            edge_id = elem.get('id', '')
+            if elem.tag == 'edge' and ':' not in edge_id:  # 跳过交叉口内部边
+                cleaned = edge_id in cleaned_edges
+                max_speed = cleaned_params['max_speed'] if cleaned else unclean_params['max_speed']
+                if not cleaned:
+                    num_unclean += 1
+
+                for lane in elem.findall('lane'):
+                    lane_speed = float(lane.get('speed', max_speed))
+                    lane.set('speed', f"{min(lane_speed, max_speed):.2f}")
+
+            elem.tail = "\n    "
+            batch.append(elem)
+            root.clear()
+            if len(batch) >= 1000:
+                flush()
+
+        flush(last=True)
+        out.write(f"</{root.tag}>\n")
+
+    os.replace(tmp_file, output_net_file)
+    return num_unclean
+
+
+def run_snow_network_scenario(sumo_config, net_file, simulation_steps, progress_interval=50,
+                              label="", state_file=None):
+    """
+    在积雪路网变体上运行仿真（无逐步控制调用）
+
+    Args:
+        sumo_config: SUMO配置文件
+        net_file: write_snow_network() 生成的路网文件
+        simulation_steps: 仿真步数
+        progress_interval: 进度打印间隔（步）
+        label: 进度输出前缀（并行评估时区分场景）
+        state_file: 预热状态文件（save_warmup_state()生成），从该状态开始仿真
+
+    Returns:
+        dict: 与run_snow_scenario()相同的统计字段，param_updates恒为0
+    """
+    traci.start(["sumo", "-c", sumo_config, "--net-file", str(net_file),
+                "--start", "--no-warnings", "true"] + _load_state_args(state_file))
+
+    for step in range(simulation_steps):
+        traci.simulationStep()
+
+        if (step + 1) % progress_interval == 0:
+            print(f"  {label}仿真进度: {step + 1}/{simulation_steps} 步, "
+                  f"当前车辆数: {traci.vehicle.getIDCount()}")
+
+    # 只在最后一步统计
+    current_vehicles = traci.vehicle.getIDList()
+    num_vehicles = len(current_vehicles)
+
+    if num_vehicles > 0:
+        total_speed = sum(traci.vehicle.getSpeed(veh) for veh in current_vehicles)
+        global_avg_speed = total_speed / num_vehicles
+    else:
+        global_avg_speed = 0
+
+    traci.close()
+
+    return {
+        "num_vehicles": num_vehicles,
+        "global_avg_speed_ms": global_avg_speed,
+        "param_updates": 0
+    }
+
+
+def run_snow_hour(sumo_config, cleaned_edges, cleaned_params, unclean_params,
+                  simulation_steps, snow_mode="vehicle", net_file=None, snow_net_file=None,
+                  label="", state_file=None):
+    """
+    按积雪模拟方式运行某一评估时刻的仿真
+
+    Args:
+        sumo_config: SUMO配置文件
+        cleaned_edges: 已清扫道路集合
+        cleaned_params: 已清扫道路的车辆参数
+        unclean_params: 未清扫道路的车辆参数
+        simulation_steps: 仿真步数
+        snow_mode: 'vehicle'（订阅式逐车设置）或 'network'（路网变体）
+        net_file: 原始路网文件（network模式需要）
+        snow_net_file: 积雪路网变体输出路径（network模式需要）
+        label: 进度输出前缀（并行评估时区分场景）
+        state_file: 预热状态文件，None时从0时刻开始
+
+    Returns:
+        dict: 仿真统计（见run_snow_scenario()）
+    """
+    if snow_mode not in SNOW_MODES:
+        raise ValueError(f"未知的积雪模拟方式: {snow_mode}（可选: {', '.join(SNOW_MODES)}）")
+
+    if snow_mode == "network":
+        num_unclean = write_snow_network(net_file, snow_net_file, cleaned_edges,
+                                         cleaned_params, unclean_params)
+        print(f"  {label}积雪路网: {snow_net_file}（未清扫道路 {num_unclean} 条）")
+        return run_snow_network_scenario(sumo_config, snow_net_file, simulation_steps,
+                                         label=label, state_file=state_file)
+
+    return run_snow_scenario(sumo_config, cleaned_edges, cleaned_params,
+                             unclean_params, simulation_steps, label=label,
+                             state_file=state_file)
+
+
+def _snow_hour_worker(task):
+    """进程池任务：运行一个 (策略, 时刻) 场景"""
+    key, kwargs = task
+    return key, run_snow_hour(**kwargs)
+
+
+def run_snow_hours(tasks, workers=1):
+    """
+    运行多个相互独立的评估场景
+
+    每个场景启动自己的SUMO实例；workers > 1 且系统支持fork时分发到进程池，
+    每个子进程各自持有一个TraCI/libsumo连接，总耗时约为最慢的单个场景。
+
+    Args:
+        tasks: [(场景键, run_snow_hour()的参数字典)]
+        workers: 并行进程数
+
+    Returns:
+        dict: 场景键 -> 仿真统计
+    """
+    workers = effective_workers(workers, len(tasks), "警告: 当前系统不支持fork，评估场景串行运行")
+    if workers > 1:
+        print(f"并行评估: {len(tasks)} 个场景, {workers} 个进程")
+    return dict(fork_map(_snow_hour_worker, tasks, workers=workers, chunksize=1))
@@ -4,6 +4,8 @@
 每个区域配备一辆扫雪车，基于交通流量选择最优清扫路径
 """
 
+import os
+import sys
 import xml.etree.ElementTree as ET
 import json
 import math
@@ -12,6 +14,13 @@ import networkx as nx
 from collections import defaultdict
 from pathlib import Path
 
+# 仓库根目录（共享的路网缓存模块 common/）
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.net_cache import load_net
+
 
 class SnowplowStrategyGenerator:
     """扫雪策略生成器"""
@@ -53,24 +62,23 @@ class SnowplowStrategyGenerator:
     def load_network(self):
         """加载路网并分配区域"""
         print("\n[1/5] 加载路网...")
-        tree = ET.parse(self.net_file)
-        root = tree.getroot()
+        net = load_net(self.net_file)
+        edge_ids = net.edge_ids
         
         # 提取边信息并分配区域
-        for edge in root.findall('edge'):
-            edge_id = edge.get('id')
+        for i in range(net.num_edges):
+            edge_id = edge_ids[i]
             if edge_id.startswith(':'):
                 continue
             
-            # 获取形状坐标
-            shape_attr = edge.get('shape')
-            if shape_attr is None:
-                lanes = edge.findall('lane')
-                if lanes:
-                    shape_attr = lanes[0].get('shape')
+            # 获取形状坐标（edge未设置shape时使用第一条lane的shape）
+            coords = net.edge_shape(i)
+            if not coords:
+                lane = net.first_lane(i)
+                if lane is not None:
+                    coords = net.lane_shape(lane)
             
-            if shape_attr:
-                coords = [tuple(map(float, point.split(','))) for point in shape_attr.split()]
+            if coords:
                 center_x = sum(coord[0] for coord in coords) / len(coords)
                 center_y = sum(coord[1] for coord in coords) / len(coords)
                 center_point = (center_x, center_y)
@@ -134,38 +142,26 @@ class SnowplowStrategyGenerator:
         print(f"  总流量: {total_flow} vehicles")
     
     def build_graph(self):
-        """构建网络图"""
+        """构建网络图（单次遍历边：节点、边属性和节点位置）"""
         print("\n[3/5] 构建网络图...")
-        tree = ET.parse(self.net_file)
-        root = tree.getroot()
+        net = load_net(self.net_file, verbose=False)
+        edge_ids, edge_from, edge_to = net.edge_ids, net.edge_from, net.edge_to
         
-        # 添加所有节点
-        all_nodes = set()
-        for edge in root.findall('edge'):
-            edge_id = edge.get('id')
+        for i in range(net.num_edges):
+            edge_id = edge_ids[i]
             if edge_id.startswith(':'):
                 continue
-            from_node = edge.get('from')
-            to_node = edge.get('to')
+            from_node = edge_from[i]
+            to_node = edge_to[i]
+            
             if from_node:
-                all_nodes.add(from_node)
+                self.G.add_node(from_node)
             if to_node:
-                all_nodes.add(to_node)
-        
-        for node in all_nodes:
-            self.G.add_node(node)
-        
-        # 添加所有边
-        for edge in root.findall('edge'):
-            edge_id = edge.get('id')
-            if edge_id.startswith(':'):
-                continue
-            from_node = edge.get('from')
-            to_node = edge.get('to')
+                self.G.add_node(to_node)
             
+            lanes = net.edge_lanes(i)
             if from_node and to_node:
-                lanes = edge.findall('lane')
-                edge_length = float(lanes[0].get('length')) if lanes else 0
+                edge_length = float(net.lane_length[lanes.start]) if lanes else 0
                 lane_count = len(lanes) if lanes else 1
                 
                 self.G.add_edge(from_node, to_node,
@@ -173,24 +169,15 @@ class SnowplowStrategyGenerator:
                               length=edge_length,
                               lane_count=lane_count,
                               total_length=edge_length * lane_count)
-        
-        # 提取节点位置
-        for edge in root.findall('edge'):
-            edge_id = edge.get('id')
-            if edge_id.startswith(':'):
-                continue
-            lanes = edge.findall('lane')
+            
+            # 节点位置：取第一条lane shape的首尾点（先出现者优先）
             if lanes:
-                shape_attr = lanes[0].get('shape')
-                if shape_attr:
-                    coords = [tuple(map(float, p.split(','))) for p in shape_attr.split()]
-                    if len(coords) >= 2:
-                        from_node = edge.get("from")
-                        to_node = edge.get("to")
-                        if from_node in self.G.nodes and from_node not in self.node_positions:
-                            self.node_positions[from_node] = coords[0]
-                        if to_node in self.G.nodes and to_node not in self.node_positions:
-                            self.node_positions[to_node] = coords[-1]
+                coords = net.lane_shape(lanes.start)
+                if len(coords) >= 2:
+                    if from_node in self.G.nodes and from_node not in self.node_positions:
+                        self.node_positions[from_node] = coords[0]
+                    if to_node in self.G.nodes and to_node not in self.node_positions:
+                        self.node_positions[to_node] = coords[-1]
         
         print(f"  节点数: {len(self.G.nodes())}")
         print(f"  边数: {len(self.G.edges())}")
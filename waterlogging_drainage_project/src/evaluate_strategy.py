@@ -16,9 +16,16 @@ if 'SUMO_HOME' in os.environ:
 else:
     sys.exit("Please set SUMO_HOME environment variable")
 
-import traci
 import sumolib
 
+# Repository root (shared simulation backend in common/)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.sim_backend import traci, select_backend
+from common.parallel import effective_workers, fork_map, worker_context
+
 
 def load_config(config_path='config.json'):
     """Load configuration"""
@@ -52,13 +59,86 @@ def get_group_lanes(net_file, flood_points):
     return group_lanes
 
 
-def evaluate_strategy(config, strategy_data, output_dir=None):
+def evaluate_strategy(config, strategy_data, output_dir=None, workers=None):
     """
     Static evaluation: Test each drainage completion state independently
     Evaluate after completing each batch (not continuous time tracking)
     """
+    return evaluate_strategies(config, [strategy_data], output_dir, workers)[0]
+
+
+def _drainage_state_key(drained_groups):
+    """Order-independent key of a drainage state (the set of drained groups)"""
+    return tuple(sorted(drained_groups))
+
+
+def build_scenario_grid(strategies_data, evaluation_delays):
+    """
+    Expand (strategy x batch state x delay) into unique simulation jobs
+    
+    Identical drainage states shared across strategies (batch 0 = all flooded,
+    the final all-drained state, or any equal prefix of batches) map to one job.
+    Returns: list of unique jobs (state_key, delay_steps)
+    """
+    jobs = []
+    seen = set()
+    for strategy_data in strategies_data:
+        batches = strategy_data['batches']
+        for batch_idx in range(len(batches) + 1):
+            drained_groups = [g for batch in batches[:batch_idx] for g in batch]
+            state_key = _drainage_state_key(drained_groups)
+            for delay_steps in evaluation_delays:
+                job = (state_key, delay_steps)
+                if job not in seen:
+                    seen.add(job)
+                    jobs.append(job)
+    return jobs
+
+
+def _scenario_worker(job):
+    """Process pool task: run one (drainage state, delay) scenario"""
+    state_key, delay_steps = job
+    ctx = worker_context()
+    warmup_step = ctx['start_step'] + delay_steps
+    metrics = run_sumo_with_drainage_state(
+        ctx['sumo_config'],
+        ctx['group_lanes'],
+        ctx['flood_points'],
+        list(state_key),
+        ctx['flooded_speed'],
+        ctx['normal_speed'],
+        warmup_step,
+        ctx['simulation_steps'],
+        ctx['measurement_window'],
+        state_file=ctx['warm_start_states'].get(warmup_step)
+    )
+    return job, metrics
+
+
+def run_scenario_grid(jobs, context, workers=1):
+    """
+    Run scenario jobs, on a fork process pool of SUMO instances when workers > 1
+    The shared scenario context (config, lanes, warm start states) is inherited by the workers
+    Returns: {(state_key, delay_steps): (throughput, queue_length, avg_speed)}
+    """
+    workers = effective_workers(workers, len(jobs),
+                                "Warning: fork is not available on this platform, running scenarios serially")
+    if workers > 1:
+        print(f"\nRunning {len(jobs)} scenarios on {workers} processes")
+    return dict(fork_map(_scenario_worker, jobs, workers=workers, context=context, chunksize=1))
+
+
+def evaluate_strategies(config, strategies_data, output_dir=None, workers=None):
+    """
+    Static evaluation of several strategies on one deduplicated scenario grid
+    
+    Every (drainage state, delay) combination is an independent SUMO run. States
+    shared across strategies are simulated once, and jobs run on a process pool
+    (sumo_config.workers). Each strategy still gets its own evaluation_<name>.json.
+    Returns: list of evaluation results, in the order of strategies_data
+    """
     print("="*80)
-    print(f"Static Evaluation: {strategy_data['strategy_name']}".center(80))
+    print(f"Static Evaluation: {', '.join(s['strategy_name'] for s in strategies_data)}".center(80))
     print("="*80)
     
     # Create output directory
@@ -70,11 +150,13 @@ def evaluate_strategy(config, strategy_data, output_dir=None):
     
     output_dir.mkdir(parents=True, exist_ok=True)
     print(f"\nOutput directory: {output_dir}")
+
+    # Simulation backend (traci/libsumo); falls back to the SUMO_BACKEND env var
+    select_backend(config['sumo_config'].get('backend'))
     
     # Get configuration
     flood_points = config['waterlogging_points']
     drainage_params = config['drainage_parameters']
-    batches = strategy_data['batches']
     
     flooded_speed = drainage_params['flooded_speed']
     normal_speed = drainage_params['normal_speed']
@@ -83,90 +165,116 @@ def evaluate_strategy(config, strategy_data, output_dir=None):
     # Convert edges to lanes
     group_lanes = get_group_lanes(config['network']['net_file'], flood_points)
     
-    print(f"\nStrategy: {strategy_data['strategy_name']}")
-    print(f"Batches: {batches}")
-    print(f"Total batches: {len(batches)}")
+    for strategy_data in strategies_data:
+        print(f"\nStrategy: {strategy_data['strategy_name']}")
+        print(f"Batches: {strategy_data['batches']}")
+        print(f"Total batches: {len(strategy_data['batches'])}")
     
     # Get evaluation delays
     evaluation_delays = config['sumo_config'].get('evaluation_delays', [0])
+    measurement_window = config['sumo_config'].get('measurement_window', 50)
+    if workers is None:
+        workers = config['sumo_config'].get('workers', 1)
     
-    # Evaluation results
-    evaluation_results = {
-        "strategy_name": strategy_data['strategy_name'],
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "config": {
-            "flooded_speed": flooded_speed,
-            "normal_speed": normal_speed,
-            "evaluation_delays": evaluation_delays
-        },
-        "batch_results": []
+    # Warm start: the all-flooded prefix (start_step + delay) is identical for every
+    # drainage state, so simulate it once per delay and load the saved state
+    warm_start_states = {}
+    if config['sumo_config'].get('warm_start', False):
+        warm_start_states = save_warmup_states(
+            config['sumo_config']['config_file'],
+            group_lanes,
+            flooded_speed,
+            [start_step + delay_steps for delay_steps in evaluation_delays],
+            output_dir / "warmup_states"
+        )
+    
+    # Expand the scenario grid and drop duplicate drainage states
+    jobs = build_scenario_grid(strategies_data, evaluation_delays)
+    total_runs = sum(len(s['batches']) + 1 for s in strategies_data) * len(evaluation_delays)
+    print(f"\nScenario grid: {total_runs} runs, {len(jobs)} unique (drainage state, delay) jobs")
+    
+    scenario_context = {
+        "sumo_config": config['sumo_config']['config_file'],
+        "group_lanes": group_lanes,
+        "flood_points": flood_points,
+        "flooded_speed": flooded_speed,
+        "normal_speed": normal_speed,
+        "start_step": start_step,
+        "simulation_steps": config['sumo_config']['simulation_steps'],
+        "measurement_window": measurement_window,
+        "warm_start_states": warm_start_states
     }
+    scenario_metrics = run_scenario_grid(jobs, scenario_context, workers)
     
-    # Evaluate each drainage state (after completing each batch)
-    for batch_idx in range(len(batches) + 1):
-        print(f"\n[Evaluation] After completing {batch_idx} batches...")
-        print("-" * 60)
-        
-        # Determine which groups are drained
-        drained_groups = []
-        for i in range(batch_idx):
-            drained_groups.extend(batches[i])
-        
-        print(f"  Drained groups: {drained_groups if drained_groups else 'None (all flooded)'}")
-        print(f"  Still flooded: {[g for g in flood_points.keys() if g not in drained_groups]}")
+    all_results = []
+    for strategy_data in strategies_data:
+        batches = strategy_data['batches']
         
-        # Evaluate at different time delays to see propagation effect
-        delay_results = []
-        measurement_window = config['sumo_config'].get('measurement_window', 50)
+        # Evaluation results
+        evaluation_results = {
+            "strategy_name": strategy_data['strategy_name'],
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "config": {
+                "flooded_speed": flooded_speed,
+                "normal_speed": normal_speed,
+                "evaluation_delays": evaluation_delays
+            },
+            "batch_results": []
+        }
         
-        for delay_steps in evaluation_delays:
-            print(f"\n  [Time delay: {delay_steps} steps after drainage]")
+        # Each drainage state (after completing each batch)
+        for batch_idx in range(len(batches) + 1):
+            print(f"\n[Evaluation] {strategy_data['strategy_name']}: after completing {batch_idx} batches...")
+            print("-" * 60)
             
-            # Run SUMO simulation for this drainage state
-            throughput_rate, queue_length, avg_speed = run_sumo_with_drainage_state(
-                config['sumo_config']['config_file'],
-                group_lanes,
-                flood_points,
-                drained_groups,
-                flooded_speed,
-                normal_speed,
-                start_step + delay_steps,
-                config['sumo_config']['simulation_steps'],
-                measurement_window
-            )
+            # Determine which groups are drained
+            drained_groups = []
+            for i in range(batch_idx):
+                drained_groups.extend(batches[i])
             
-            print(f"    Cumulative throughput: {throughput_rate} vehicles (in {measurement_window}s window)")
-            print(f"    Queue length: {queue_length:.1f} vehicles")
-            print(f"    Avg speed: {avg_speed:.2f} m/s")
+            print(f"  Drained groups: {drained_groups if drained_groups else 'None (all flooded)'}")
+            print(f"  Still flooded: {[g for g in flood_points.keys() if g not in drained_groups]}")
             
-            delay_results.append({
-                "delay_steps": delay_steps,
-                "cumulative_throughput": int(throughput_rate),
-                "queue_length": round(queue_length, 2),
-                "avg_speed": round(avg_speed, 3)
+            # Measurements at different time delays to see propagation effect
+            delay_results = []
+            state_key = _drainage_state_key(drained_groups)
+            
+            for delay_steps in evaluation_delays:
+                print(f"\n  [Time delay: {delay_steps} steps after drainage]")
+                
+                throughput_rate, queue_length, avg_speed = scenario_metrics[(state_key, delay_steps)]
+                
+                print(f"    Cumulative throughput: {throughput_rate} vehicles (in {measurement_window}s window)")
+                print(f"    Queue length: {queue_length:.1f} vehicles")
+                print(f"    Avg speed: {avg_speed:.2f} m/s")
+                
+                delay_results.append({
+                    "delay_steps": delay_steps,
+                    "cumulative_throughput": int(throughput_rate),
+                    "queue_length": round(queue_length, 2),
+                    "avg_speed": round(avg_speed, 3)
+                })
+            
+            evaluation_results['batch_results'].append({
+                "batch_index": batch_idx,
+                "drained_batches": batches[:batch_idx] if batch_idx > 0 else [],
+                "drained_groups": drained_groups,
+                "num_drained": len(drained_groups),
+                "delay_measurements": delay_results
             })
         
-        evaluation_results['batch_results'].append({
-            "batch_index": batch_idx,
-            "drained_batches": batches[:batch_idx] if batch_idx > 0 else [],
-            "drained_groups": drained_groups,
-            "num_drained": len(drained_groups),
-            "delay_measurements": delay_results
-        })
-    
-    # Save evaluation results
-    result_file = output_dir / f"evaluation_{strategy_data['strategy_name']}.json"
-    with open(result_file, 'w', encoding='utf-8') as f:
-        json.dump(evaluation_results, f, ensure_ascii=False, indent=2)
-    
-    print("\n" + "="*80)
-    print("Evaluation completed!".center(80))
-    print(f"Results saved: {result_file}".center(80))
-    print("="*80)
-    print("\n" + "="*80)
-    print("Evaluation completed!".center(80))
-    print(f"Results saved: {result_file}".center(80))
-    print("="*80)
+        # Save evaluation results
+        result_file = output_dir / f"evaluation_{strategy_data['strategy_name']}.json"
+        with open(result_file, 'w', encoding='utf-8') as f:
+            json.dump(evaluation_results, f, ensure_ascii=False, indent=2)
+        
+        print("\n" + "="*80)
+        print("Evaluation completed!".center(80))
+        print(f"Results saved: {result_file}".center(80))
+        print("="*80)
+        
+        all_results.append(evaluation_results)
+    
     print(f"\n[Metrics Explanation]")
     print(f"  Cumulative Throughput: Total vehicles LEAVING entire waterlogging region (higher = better)")
     print(f"  Counted only when vehicle exits all waterlogging lanes (not internal lane changes)")
@@ -174,18 +282,84 @@ def evaluate_strategy(config, strategy_data, output_dir=None):
     print(f"  Queue Length: Average vehicles stuck in waterlogging areas (lower = better)")
     print(f"  Avg Speed: Speed in waterlogging areas (higher = better)\n")
     
-    return evaluation_results
+    return all_results
+
+
+def set_lane_speeds(group_lanes, drained_groups, flooded_speed, normal_speed):
+    """
+    Apply a drainage state as lane speed limits
+    Called once per state change instead of setting every vehicle's speed every step
+    """
+    for group, lanes in group_lanes.items():
+        target_speed = normal_speed if group in drained_groups else flooded_speed
+        for lane in lanes:
+            traci.lane.setMaxSpeed(lane, target_speed)
+
+
+def subscribe_region_lanes(group_lanes):
+    """Subscribe every waterlogging lane to its vehicle IDs, vehicle count and mean speed"""
+    tc = traci.constants
+    lane_vars = [tc.LAST_STEP_VEHICLE_ID_LIST, tc.LAST_STEP_VEHICLE_NUMBER, tc.LAST_STEP_MEAN_SPEED]
+    for lanes in group_lanes.values():
+        for lane in lanes:
+            traci.lane.subscribe(lane, lane_vars)
+
+
+def save_warmup_states(sumo_config, group_lanes, flooded_speed, warmup_steps, state_dir):
+    """
+    Simulate the shared all-flooded prefix once and save a SUMO state at each warm-up length
+    
+    Warm-up lengths are visited in increasing order within a single run, so the total
+    cost is max(warmup_steps) steps instead of one full prefix per scenario.
+    Returns: {warmup_step: state_file}
+    """
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    
+    sumo_cmd = [
+        'sumo',
+        '-c', sumo_config,
+        '--no-warnings', 'true',
+        '--no-step-log', 'true',
+        '--duration-log.disable', 'true',
+        '--save-state.rng', 'true'
+    ]
+    
+    traci.start(sumo_cmd)
+    
+    # All flooded during warm-up
+    set_lane_speeds(group_lanes, [], flooded_speed, flooded_speed)
+    
+    states = {}
+    step = 0
+    for target_step in sorted(set(warmup_steps)):
+        while step < target_step:
+            traci.simulationStep()
+            step += 1
+        
+        state_file = state_dir / f"warmup_{target_step}.xml"
+        traci.simulation.saveState(str(state_file))
+        states[target_step] = str(state_file)
+        print(f"  Warm-up state saved: step {target_step} -> {state_file}")
+    
+    traci.close()
+    return states
 
 
 def run_sumo_with_drainage_state(sumo_config, group_lanes, flood_points, 
                                  drained_groups, flooded_speed, normal_speed,
-                                 start_step, num_steps, measurement_window=None):
+                                 start_step, num_steps, measurement_window=None,
+                                 state_file=None):
     """
     Run SUMO simulation with specific drainage state
     Returns: (throughput_rate, queue_length, avg_speed) for ALL waterlogging areas
     - throughput_rate: vehicles/second in the measurement window (default: use first 50 steps)
     - queue_length: average number of vehicles in waterlogging areas
     - avg_speed: average speed in waterlogging areas
+    If state_file is given (see save_warmup_states), the simulation starts from that
+    saved state and the start_step warm-up is skipped.
+    Drainage states are applied as lane speed limits and the region is measured through
+    lane subscriptions: per step only simulationStep + one subscription read.
     """
     if measurement_window is None:
         measurement_window = min(50, num_steps)
@@ -197,84 +371,70 @@ def run_sumo_with_drainage_state(sumo_config, group_lanes, flood_points,
         '--no-step-log', 'true',
         '--duration-log.disable', 'true'
     ]
+    if state_file is not None:
+        sumo_cmd += ['--load-state', str(state_file)]
     
     traci.start(sumo_cmd)
     
+    tc = traci.constants
+    subscribe_region_lanes(group_lanes)
+    
     # Track vehicles in waterlogging REGION (not per-lane)
     prev_vehicles_in_region = set()  # Vehicles currently in ANY waterlogging lane
     
     total_throughput = 0
     total_queue_length = 0
     queue_samples = 0
-    all_speeds = []
+    total_speed = 0.0  # Sum of vehicle speeds over all samples (mean speed x vehicle count)
+    speed_samples = 0
+    
+    # Initial steps (all flooded), already contained in a loaded warm-up state
+    if state_file is None:
+        set_lane_speeds(group_lanes, [], flooded_speed, flooded_speed)
+        for step in range(start_step):
+            traci.simulationStep()
     
-    # Initial steps (all flooded)
-    for step in range(start_step):
+    # Set speed based on drainage state (lane speed limits, once)
+    set_lane_speeds(group_lanes, drained_groups, flooded_speed, normal_speed)
+    
+    # Only the measurement window contributes to the results, so the
+    # simulation stops as soon as it has been collected
+    for step in range(min(num_steps, measurement_window)):
         traci.simulationStep()
         
-        for group, lanes in group_lanes.items():
-            for lane in lanes:
-                try:
-                    for veh_id in traci.lane.getLastStepVehicleIDs(lane):
-                        traci.vehicle.setSpeed(veh_id, flooded_speed)
-                except:
-                    continue
-    
-    # Main simulation steps
-    for step in range(num_steps):
-        traci.simulationStep()
+        # One subscription read per step for all waterlogging lanes
+        lane_results = traci.lane.getAllSubscriptionResults()
         
-        # Set speed based on drainage state
-        for group, lanes in group_lanes.items():
-            target_speed = normal_speed if group in drained_groups else flooded_speed
-            
-            for lane in lanes:
-                try:
-                    # Set vehicle speed
-                    for veh_id in traci.lane.getLastStepVehicleIDs(lane):
-                        traci.vehicle.setSpeed(veh_id, target_speed)
-                except:
-                    continue
+        # Collect all vehicles currently in waterlogging region
+        current_vehicles_in_region = set()
+        step_queue = 0
         
-        # Only collect statistics in measurement window
-        if step < measurement_window:
-            # Collect all vehicles currently in waterlogging region
-            current_vehicles_in_region = set()
-            step_queue = 0
-            
-            for group in flood_points.keys():
-                for lane in group_lanes[group]:
-                    try:
-                        lane_vehs = set(traci.lane.getLastStepVehicleIDs(lane))
-                        current_vehicles_in_region.update(lane_vehs)
-                        
-                        # Queue length: current vehicles in lane
-                        step_queue += len(lane_vehs)
-                        
-                        # Speed: collect from all vehicles
-                        for veh_id in lane_vehs:
-                            try:
-                                speed = traci.vehicle.getSpeed(veh_id)
-                                all_speeds.append(speed)
-                            except:
-                                continue
-                    except:
-                        continue
+        for lane, values in lane_results.items():
+            lane_count = values[tc.LAST_STEP_VEHICLE_NUMBER]
+            current_vehicles_in_region.update(values[tc.LAST_STEP_VEHICLE_ID_LIST])
             
-            # Throughput: vehicles that LEFT the entire waterlogging region
-            # (were in region last step, but not in region now)
-            vehicles_left_region = prev_vehicles_in_region - current_vehicles_in_region
-            total_throughput += len(vehicles_left_region)
+            # Queue length: current vehicles in lane
+            step_queue += lane_count
             
-            prev_vehicles_in_region = current_vehicles_in_region
-            total_queue_length += step_queue
-            queue_samples += 1
+            # Speed: lane mean speed weighted by its vehicle count
+            if lane_count > 0:
+                total_speed += values[tc.LAST_STEP_MEAN_SPEED] * lane_count
+                speed_samples += lane_count
+        
+        # Throughput: vehicles that LEFT the entire waterlogging region
+        # (were in region last step, but not in region now)
+        vehicles_left_region = prev_vehicles_in_region - current_vehicles_in_region
+        total_throughput += len(vehicles_left_region)
+        
+        prev_vehicles_in_region = current_vehicles_in_region
+        total_queue_length += step_queue
+        queue_samples += 1
     
     traci.close()
     
     # Calculate averages
     avg_queue = total_queue_length / queue_samples if queue_samples > 0 else 0
-    avg_speed = sum(all_speeds) / len(all_speeds) if all_speeds else 0
+    avg_speed = total_speed / speed_samples if speed_samples > 0 else 0
     # Return cumulative throughput (total vehicles that left the region)
     
     return total_throughput, avg_queue, avg_speed
@@ -284,19 +444,21 @@ def main():
     parser = argparse.ArgumentParser(description='Evaluate drainage strategy in SUMO')
     parser.add_argument('-c', '--config', default='config.json',
                        help='Configuration file path')
-    parser.add_argument('-s', '--strategy', required=True,
-                       help='Strategy JSON file path')
+    parser.add_argument('-s', '--strategy', required=True, nargs='+',
+                       help='Strategy JSON file path(s); several strategies share one scenario grid')
     parser.add_argument('-o', '--output', default=None,
                        help='Output directory')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Parallel SUMO instances (default: sumo_config.workers, 1)')
     
     args = parser.parse_args()
     
-    # Load configuration and strategy
+    # Load configuration and strategies
     config = load_config(args.config)
-    strategy_data = load_strategy(args.strategy)
+    strategies_data = [load_strategy(path) for path in args.strategy]
     
     # Run evaluation
-    results = evaluate_strategy(config, strategy_data, args.output)
+    results = evaluate_strategies(config, strategies_data, args.output, args.workers)
     
     return results
 
@@ -30,7 +30,7 @@ def main():
     start_time = datetime.now()
     
     # Step 1: Generate strategies
-    print("\n[Step 1/4] Generating strategies...")
+    print("\n[Step 1/3] Generating strategies...")
     run_command("python generate_strategy.py", "Strategy Generation")
     
     # Find the latest strategy folder
@@ -48,22 +48,16 @@ def main():
     
     print(f"\n  Using strategies from: {strategy_path}")
     
-    # Step 2: Evaluate best strategy
-    print("\n[Step 2/4] Evaluating BEST strategy (high to low traffic flow)...")
+    # Step 2: Evaluate best and worst strategies on one scenario grid
+    # (shared drainage states are simulated once, scenarios run in parallel)
+    print("\n[Step 2/3] Evaluating BEST and WORST strategies (high/low traffic flow first)...")
     run_command(
-        f"python evaluate_strategy.py -s {best_strategy} -o {strategy_path}",
-        "Best Strategy Evaluation"
+        f"python evaluate_strategy.py -s {best_strategy} {worst_strategy} -o {strategy_path}",
+        "Strategy Evaluation"
     )
     
-    # Step 3: Evaluate worst strategy
-    print("\n[Step 3/4] Evaluating WORST strategy (low to high traffic flow)...")
-    run_command(
-        f"python evaluate_strategy.py -s {worst_strategy} -o {strategy_path}",
-        "Worst Strategy Evaluation"
-    )
-    
-    # Step 4: Compare strategies
-    print("\n[Step 4/4] Comparing strategies...")
+    # Step 3: Compare strategies
+    print("\n[Step 3/3] Comparing strategies...")
     eval_best = os.path.join(strategy_path, "evaluation_best.json")
     eval_worst = os.path.join(strategy_path, "evaluation_worst.json")
     
@@ -2,59 +2,54 @@
 Visualize waterlogging points on the road network map
 """
 
-import xml.etree.ElementTree as ET
+import os
+import sys
 import matplotlib.pyplot as plt
 import json
 from matplotlib.patches import Rectangle
 from matplotlib.collections import LineCollection
 import numpy as np
 
+# Repository root (shared parsed-net cache in common/)
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from common.net_cache import load_net
+
 def load_config(config_file='config.json'):
     """Load configuration file"""
     with open(config_file, 'r', encoding='utf-8') as f:
         return json.load(f)
 
 def load_network(net_file):
-    """Load SUMO network and extract edge coordinates"""
-    tree = ET.parse(net_file)
-    root = tree.getroot()
+    """Load SUMO network and extract edge coordinates (parsed net is cached on disk)"""
+    net = load_net(net_file)
     
     edges = {}
     junctions = {}
     
     # Load junctions
-    for junction in root.findall('junction'):
-        junc_id = junction.get('id')
-        x = float(junction.get('x'))
-        y = float(junction.get('y'))
+    for junc_id, (x, y) in zip(net.junction_ids, net.junction_xy.tolist()):
         junctions[junc_id] = (x, y)
     
     # Load edges and lanes
-    for edge in root.findall('edge'):
-        edge_id = edge.get('id')
-        from_junc = edge.get('from')
-        to_junc = edge.get('to')
-        
+    edge_ids, edge_from, edge_to, lane_ids = net.edge_ids, net.edge_from, net.edge_to, net.lane_ids
+    for i in range(net.num_edges):
         # Get lane coordinates
         lanes = []
-        for lane in edge.findall('lane'):
-            lane_id = lane.get('id')
-            shape = lane.get('shape')
-            if shape:
-                # Parse shape coordinates
-                coords = []
-                for point in shape.split():
-                    x, y = point.split(',')
-                    coords.append((float(x), float(y)))
+        for j in net.edge_lanes(i):
+            coords = net.lane_shape(j)
+            if coords:
                 lanes.append({
-                    'id': lane_id,
+                    'id': lane_ids[j],
                     'coords': coords
                 })
         
         if lanes:
-            edges[edge_id] = {
-                'from': from_junc,
-                'to': to_junc,
+            edges[edge_ids[i]] = {
+                'from': edge_from[i] or None,
+                'to': edge_to[i] or None,
                 'lanes': lanes
             }
     